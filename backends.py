@@ -0,0 +1,302 @@
+"""LLM 백엔드 (services.ask_gemini 뒤에서 실제 생성을 담당)
+
+- GeminiBackend: 실제 Gemini API (기본값)
+- FakeBackend: 네트워크 없이 결정적인 응답 + 설정 가능한 지연시간 분포 (프로파일링용)
+- CassetteBackend: 실제 세션의 프롬프트→응답을 JSONL 파일에 녹화하고 그대로 재생
+
+응답 객체는 google-genai 응답과 같은 속성(text, usage_metadata, candidates[0].finish_reason)만 사용
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+from types import SimpleNamespace
+from typing import AsyncIterator, Protocol
+
+
+class LLMBackend(Protocol):
+    name: str
+
+    async def generate(self, model: str, prompt: str, config: dict):
+        """응답 1건 생성"""
+
+    def generate_stream(self, model: str, prompt: str, config: dict) -> AsyncIterator:
+        """응답 조각(chunk)을 차례로 yield하는 async iterator"""
+
+    async def aclose(self):
+        """커넥션 등 정리"""
+
+
+class CassetteMissError(Exception):
+    """재생 모드에서 녹화되지 않은 프롬프트가 요청됨"""
+
+
+def make_response(text: str, prompt_tokens: int = 0, output_tokens: int = 0, finish_reason: str = "STOP"):
+    """google-genai 응답과 같은 모양의 가짜 응답"""
+    return SimpleNamespace(
+        text=text,
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+        ),
+        candidates=[SimpleNamespace(finish_reason=finish_reason)],
+    )
+
+
+def _finish_reason(response) -> str:
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return str(getattr(reason, "name", reason) or "STOP")
+
+
+# ========== 실제 Gemini ==========
+class GeminiBackend:
+    """google-genai 비동기 클라이언트 호출 (client_getter는 services의 클라이언트 관리자)"""
+
+    name = "gemini"
+
+    def __init__(self, client_getter):
+        self._get_client = client_getter
+
+    async def generate(self, model: str, prompt: str, config: dict):
+        client = await self._get_client()
+        return await client.models.generate_content(
+            model=model,
+            contents={'text': prompt},
+            config=config,
+        )
+
+    async def generate_stream(self, model: str, prompt: str, config: dict):
+        client = await self._get_client()
+        stream = await client.models.generate_content_stream(
+            model=model,
+            contents={'text': prompt},
+            config=config,
+        )
+        async for chunk in stream:
+            yield chunk
+
+    async def aclose(self):
+        pass
+
+
+# ========== 가짜 백엔드 (오프라인 프로파일링) ==========
+_SCHEMA_BLOCK = re.compile(r"\{\{.*\}\}", re.S)
+
+
+def _last_json_line(prompt: str) -> dict:
+    """str.format으로 채운 프롬프트(중괄호가 한 겹)의 마지막 JSON 예시 줄"""
+    decoder = json.JSONDecoder()
+    found = {}
+    for match in re.finditer(r"^\{", prompt, re.M):
+        try:
+            value, _ = decoder.raw_decode(prompt, match.start())
+        except ValueError:
+            continue
+        if isinstance(value, dict):
+            found = value
+    return found
+
+
+def schema_example(prompt: str) -> dict:
+    """프롬프트 끝의 출력 형식 예시({{...}})를 JSON으로 바꿔 응답 모양을 흉내냄"""
+    match = None
+    for match in _SCHEMA_BLOCK.finditer(prompt):
+        pass
+    if match is None:
+        return _last_json_line(prompt)
+    block = match.group(0).replace("{{", "{").replace("}}", "}")
+    block = re.sub(r",\s*\.\.\.\s*(?=[\]}])", "", block)
+    # 예시 JSON 뒤의 설명 문장이 같이 잡힌 경우 마지막 닫는 괄호까지만 사용
+    block = block[: block.rfind("}") + 1]
+    try:
+        value = json.loads(block)
+    except json.JSONDecodeError:
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+class FakeBackend:
+    """
+    결정적인 가짜 응답
+    - 응답: responder(prompt) 결과 (기본은 프롬프트의 출력 형식 예시)
+    - 지연시간: 로그정규분포 (중앙값 latency_ms, 퍼짐 sigma), 프롬프트+seed로 시드를 정해 매번 같은 값
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 800, sigma: float = 0.5, seed: int = 0, responder=None):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.seed = seed
+        self.responder = responder or schema_example
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def latency(self, prompt: str) -> float:
+        """이 프롬프트에 대한 지연시간(초)"""
+        if self.latency_ms <= 0:
+            return 0.0
+        rng = self._rng(prompt)
+        return self.latency_ms / 1000.0 * math.exp(rng.gauss(0.0, self.sigma))
+
+    def _response(self, prompt: str):
+        text = json.dumps(self.responder(prompt), ensure_ascii=False)
+        return make_response(text, len(prompt) // 4 + 1, len(text) // 4 + 1)
+
+    async def generate(self, model: str, prompt: str, config: dict):
+        await asyncio.sleep(self.latency(prompt))
+        return self._response(prompt)
+
+    async def generate_stream(self, model: str, prompt: str, config: dict):
+        response = self._response(prompt)
+        text = response.text
+        step = max(1, len(text) // 8)
+        delay = self.latency(prompt) / max(1, math.ceil(len(text) / step))
+        for i in range(0, len(text), step):
+            await asyncio.sleep(delay)
+            last = i + step >= len(text)
+            yield make_response(
+                text[i:i + step],
+                response.usage_metadata.prompt_token_count if last else 0,
+                response.usage_metadata.candidates_token_count if last else 0,
+            )
+
+    async def aclose(self):
+        pass
+
+
+# ========== 녹화/재생 (cassette) ==========
+class CassetteBackend:
+    """
+    JSONL 파일 한 줄 = 녹화된 호출 1건 {"key", "model", "prompt", "text", "usage", "finish_reason"}
+    - mode="record": inner 백엔드(실제 Gemini)를 호출하고 결과를 파일에 추가
+    - mode="replay": 파일에서만 응답 (없으면 CassetteMissError), 녹화된 지연 없이 즉시 반환
+    키는 (model, 생성 옵션, prompt) 해시
+    """
+
+    def __init__(self, path: str, mode: str = "replay", inner: LLMBackend = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"알 수 없는 cassette 모드: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("녹화 모드에는 실제 호출을 담당할 inner 백엔드가 필요합니다.")
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.name = mode
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, config: dict) -> str:
+        # 캐시 참조명(cached_content)은 세션마다 달라지므로 키에서 제외
+        stable = {k: v for k, v in sorted(config.items()) if k != "cached_content"}
+        payload = json.dumps([model, stable, prompt], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            entries = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        entries[entry["key"]] = entry
+            self._entries = entries
+        return self._entries
+
+    def _replay(self, model: str, prompt: str, config: dict) -> dict:
+        entry = self._load().get(self.make_key(model, prompt, config))
+        if entry is None:
+            self.misses += 1
+            raise CassetteMissError(f"녹화되지 않은 요청입니다 (model={model}, prompt={prompt[:60]!r})")
+        self.hits += 1
+        return entry
+
+    def _save(self, model: str, prompt: str, config: dict, text: str, usage, finish_reason: str):
+        """녹화 1건 추가 (파일 쓰기이므로 이벤트 루프 밖 스레드에서 호출)"""
+        entry = {
+            "key": self.make_key(model, prompt, config),
+            "model": model,
+            "prompt": prompt,
+            "text": text,
+            "usage": {
+                "prompt_token_count": getattr(usage, "prompt_token_count", 0) or 0,
+                "candidates_token_count": getattr(usage, "candidates_token_count", 0) or 0,
+            },
+            "finish_reason": finish_reason,
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._load()[entry["key"]] = entry
+            self.recorded += 1
+
+    @staticmethod
+    def _to_response(entry: dict):
+        usage = entry.get("usage") or {}
+        return make_response(
+            entry.get("text", ""),
+            usage.get("prompt_token_count", 0),
+            usage.get("candidates_token_count", 0),
+            entry.get("finish_reason", "STOP"),
+        )
+
+    async def generate(self, model: str, prompt: str, config: dict):
+        if self.mode == "replay":
+            return self._to_response(self._replay(model, prompt, config))
+        response = await self.inner.generate(model, prompt, config)
+        await asyncio.to_thread(
+            self._save,
+            model, prompt, config,
+            getattr(response, "text", "") or "",
+            getattr(response, "usage_metadata", None),
+            _finish_reason(response),
+        )
+        return response
+
+    async def generate_stream(self, model: str, prompt: str, config: dict):
+        if self.mode == "replay":
+            yield self._to_response(self._replay(model, prompt, config))
+            return
+        parts = []
+        last = None
+        async for chunk in self.inner.generate_stream(model, prompt, config):
+            last = chunk
+            parts.append(getattr(chunk, "text", "") or "")
+            yield chunk
+        if last is not None:
+            await asyncio.to_thread(
+                self._save,
+                model, prompt, config, "".join(parts),
+                getattr(last, "usage_metadata", None), _finish_reason(last),
+            )
+
+    async def aclose(self):
+        if self.inner is not None:
+            await self.inner.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "entries": len(self._load()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded,
+        }
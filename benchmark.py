@@ -0,0 +1,86 @@
+"""
+분석 모드 벤치마크: 기본(fan-out) 모드 vs 빠른(fused) 모드
+실행 시간과 실제 API 호출 수/토큰 수를 비교 (캐시를 끄고 실제 Gemini API 호출)
+
+사용법:
+    python benchmark.py [--file 문단.txt] [--journal 저널약어] [--runs 3] [--backend replay]
+
+--backend replay 는 record 백엔드로 녹화해 둔 응답(data/llm_cassette.jsonl)을 재생하므로
+네트워크 없이 같은 결과로 반복 측정 가능 (fake 는 프롬프트의 출력 형식만 흉내낸 가짜 응답)
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from graph import analyze
+from services import get_route_stats, get_usage_stats, reset_usage_stats, set_llm_backend
+
+SAMPLE_TEXT = (
+    "We propose a lightweight convolutional architecture for real-time defect detection "
+    "on edge devices. Compared with existing detectors, our method significantly improves "
+    "accuracy while reducing inference latency, which clearly demonstrates its suitability "
+    "for industrial deployment."
+)
+
+
+async def _run_mode(text: str, journal_name: str, fast: bool, runs: int) -> dict:
+    latencies = []
+    reset_usage_stats()
+    for _ in range(runs):
+        start = time.perf_counter()
+        await analyze(text, journal_name, use_cache=False, fast=fast)
+        latencies.append(time.perf_counter() - start)
+    usage = get_usage_stats()
+    return {
+        "mode": "fast" if fast else "fan-out",
+        "mean_s": statistics.mean(latencies),
+        "max_s": max(latencies),
+        "calls": usage["calls"] / runs,
+        "prompt_tokens": usage["prompt_tokens"] / runs,
+        "output_tokens": usage["output_tokens"] / runs,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="fan-out vs fused 모드 지연시간/토큰 비교")
+    parser.add_argument("--file", help="분석할 문단이 담긴 텍스트 파일")
+    parser.add_argument("--journal", default="", help="등록된 저널 약어 (선택)")
+    parser.add_argument("--runs", type=int, default=3, help="모드별 반복 횟수")
+    parser.add_argument(
+        "--backend",
+        choices=["gemini", "fake", "record", "replay"],
+        help="LLM 백엔드 (생략 시 설정의 llm_backend)",
+    )
+    args = parser.parse_args()
+    if args.backend:
+        set_llm_backend(args.backend)
+
+    text = SAMPLE_TEXT
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            text = f.read().strip()
+
+    rows = []
+    for fast in (False, True):
+        rows.append(await _run_mode(text, args.journal, fast, max(1, args.runs)))
+
+    print(f"{'mode':<8} {'mean(s)':>8} {'max(s)':>8} {'calls':>6} {'in_tok':>8} {'out_tok':>8}")
+    for r in rows:
+        print(
+            f"{r['mode']:<8} {r['mean_s']:>8.2f} {r['max_s']:>8.2f} {r['calls']:>6.1f} "
+            f"{r['prompt_tokens']:>8.0f} {r['output_tokens']:>8.0f}"
+        )
+
+    # 경로(노드@모델)별 지연시간 — 설정 model_routes 조정용
+    print()
+    print(f"{'route':<40} {'calls':>6} {'p50(s)':>8} {'p95(s)':>8} {'escal':>6} {'fallbk':>6}")
+    for route, r in sorted(get_route_stats().items()):
+        print(
+            f"{route:<40} {r['calls']:>6} {r.get('p50_s', 0):>8.2f} {r.get('p95_s', 0):>8.2f} "
+            f"{r.get('escalated', 0):>6} {r.get('fallback', 0):>6}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
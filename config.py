@@ -7,14 +7,41 @@ load_dotenv()
 # API 설정
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = "gemini-2.5-flash-lite"  # 2.5 Flash Lite
+GEMINI_FLASH_MODEL = "gemini-2.5-flash"  # 승격 1단계
 GEMINI_PRO_MODEL = "gemini-2.5-pro"  # 저널 등록 시 사용
+
+# 모델 등급 (설정 model_routes의 값) - 순서대로 빠름 → 강함, 승격은 한 단계 위, 시간 초과 대체는 한 단계 아래
+MODEL_TIERS = {"lite": GEMINI_MODEL, "flash": GEMINI_FLASH_MODEL, "pro": GEMINI_PRO_MODEL}
+MODEL_TIER_ORDER = ["lite", "flash", "pro"]
 SEMANTIC_SCHOLAR_API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY", "")  # 선택적
 
 # 파일 경로
 DATA_DIR = "data"
-JOURNALS_FILE = f"{DATA_DIR}/journals.json"
+JOURNALS_FILE = f"{DATA_DIR}/journals.json"  # 예전 단일 파일 형식 (처음 실행 시 카탈로그로 옮김)
+JOURNALS_DIR = f"{DATA_DIR}/journals"  # 저널 카탈로그: 색인 + 저널별 레코드 파일
+JOURNAL_INDEX_FILE = f"{JOURNALS_DIR}/index.json"
 SETTINGS_FILE = f"{DATA_DIR}/settings.json"
-HISTORY_FILE = f"{DATA_DIR}/history.json"
+LOCK_FILE = f"{DATA_DIR}/.lock"  # data/ 쓰기용 프로세스 간 잠금 파일
+HISTORY_FILE = f"{DATA_DIR}/history.json"  # 예전 히스토리 형식 (처음 실행 시 SQLite로 옮김)
+HISTORY_DB_FILE = f"{DATA_DIR}/history.sqlite3"  # 분석 히스토리 (전문 검색, 압축된 결과)
+LLM_CACHE_FILE = f"{DATA_DIR}/llm_cache.sqlite3"
+LLM_CASSETTE_FILE = f"{DATA_DIR}/llm_cassette.jsonl"  # record/replay 백엔드 녹화 파일
+SS_CACHE_FILE = f"{DATA_DIR}/ss_cache.sqlite3"  # Semantic Scholar 검색/논문 캐시
+REFERENCE_INDEX_FILE = f"{DATA_DIR}/ref_index.sqlite3"  # 로컬 참고문헌 라이브러리 색인 (refindex.py)
+
+# 노드별 생성 프로필 (출력 상한, temperature) - 출력 토큰이 곧 생성 시간이므로 노드 출력 크기에 맞춤
+NODE_GENERATION_PROFILES = {
+    "search_query": {"max_output_tokens": 64, "temperature": 0.0},
+    "claim": {"max_output_tokens": 1024, "temperature": 0.1},
+    "reviewer": {"max_output_tokens": 1536, "temperature": 0.2},
+    "journal": {"max_output_tokens": 2048, "temperature": 0.2},
+    "prior_work": {"max_output_tokens": 2048, "temperature": 0.2},
+    "translation": {"max_output_tokens": 2048, "temperature": 0.1},
+    "paraphrase": {"max_output_tokens": 3072, "temperature": 0.4},
+    "expand": {"max_output_tokens": 3072, "temperature": 0.4},
+    "fused": {"max_output_tokens": 8192, "temperature": 0.2},
+    "register_journal": {"max_output_tokens": 8192, "temperature": 0.3},
+}
 
 # 기본 설정 (함수로 만들어서 동적으로 로드)
 def get_default_settings():
@@ -23,8 +50,69 @@ def get_default_settings():
         "gemini_api_key": GEMINI_API_KEY or "",  # .env 우선, 없으면 빈 문자열
         "ss_api_key": SEMANTIC_SCHOLAR_API_KEY,  # .env에서 로드하거나 빈 문자열
         "enable_references": False,   # 참고문헌 기능 ON/OFF
+        "fast_mode": False,           # 빠른 모드 (통합 요청)
         "ss_min_citations": 30,
         "ss_result_limit": 3,
+        "llm_backend": "gemini",      # gemini / fake(오프라인 가짜 응답) / record(실제 호출 녹화) / replay(녹화 재생)
+        "fake_latency_ms": 800,       # fake 백엔드 지연시간 중앙값 (로그정규분포)
+        "fake_latency_sigma": 0.5,    # fake 백엔드 지연시간 퍼짐 (0이면 고정)
+        "fake_seed": 0,
+        "gemini_max_concurrency": 8,  # Gemini 동시 호출 상한 (커넥션 풀 크기)
+        "gemini_rpm": 0,              # Gemini 분당 요청 수 제한 (0이면 무제한, 429 응답 시 자동 감속)
+        "gemini_tpm": 0,              # Gemini 분당 입력 토큰 제한 (0이면 무제한)
+        "ss_rpm": 60,                 # Semantic Scholar 분당 요청 수 제한
+        "ss_max_concurrency": 2,      # Semantic Scholar 동시 호출 상한
+        "ss_max_connections": 4,      # Semantic Scholar 공용 커넥션 풀 크기
+        "ss_keepalive_expiry": 60,    # 유휴 커넥션 유지 시간 (초)
+        "ss_http2": False,            # HTTP/2 사용 (h2 패키지 필요, 없으면 HTTP/1.1)
+        "ss_cache_enabled": True,     # Semantic Scholar 검색/논문 디스크 캐시
+        "ss_cache_ttl_hours": 168,    # 지나면 캐시로 응답하면서 백그라운드 갱신 (0이면 만료 없음)
+        "ss_cache_max_queries": 1000,
+        "reference_query_mode": "local",  # 참고문헌 검색어: local(키워드 추출, 즉시) / llm(Gemini 요청, 품질 우선)
+        "reference_query_max_words": 6,   # local 검색어 최대 단어 수
+        "reference_query_variants": 3,    # 동시에 검색할 검색어 변형 수
+        "ss_search_deadline_seconds": 6,  # 참고문헌 검색 전체 마감 시간 (늦은 검색어 결과는 버림)
+        "ss_relevance_weight": 0.6,       # 합친 결과 정렬 시 관련도 비중 (나머지는 인용수)
+        "reference_sources": "both",      # 참고문헌 출처: api(Semantic Scholar) / local(로컬 색인) / both
+        "reference_libraries": [],        # 로컬 색인 대상 .bib/.ris/.jsonl 파일 또는 폴더 (시작 시 바뀐 파일만 갱신)
+        "hedge_enabled": False,       # 느린 Gemini 호출에 중복 요청(헤징) 사용
+        "hedge_percentile": 95,       # 노드별 지연시간 p값을 넘으면 헤지 요청 발사
+        "hedge_max_ratio": 0.1,       # 전체 호출 대비 헤지 요청 비율 상한
+        "prefix_cache_backend": "off",  # 저널 프로필 프리픽스 캐시: off / gemini / fake(오프라인 검증)
+        "prefix_cache_ttl_minutes": 60,
+        "prefix_cache_min_tokens": 1024,  # 이보다 짧은 컨텍스트는 캐시하지 않음 (Gemini 최소 캐시 크기)
+        # 노드별 입력 토큰 예산 (초과 시 Aims & Scope, 선행연구 목록 등 부가 컨텍스트부터 축소, 0이면 제한 없음)
+        "input_token_budgets": {"journal": 2500, "expand": 2500, "prior_work": 2000, "fused": 3000},
+        "compact_schemas": True,      # 기본 프롬프트의 JSON 출력 키를 짧게 받아서 복원 (출력 토큰 절감)
+        # 노드별 모델 등급 (config.MODEL_TIERS), 없는 노드는 default
+        "model_routes": {
+            "default": "lite",
+            "paraphrase": "lite",
+            "claim": "lite",
+            "journal": "lite",
+            "expand": "lite",
+            "reviewer": "lite",
+            "prior_work": "lite",
+            "search_query": "lite",
+            "translation": "lite",
+            "fused": "lite",
+            "register_journal": "pro",
+        },
+        "model_escalation": True,     # 파싱 실패/낮은 신뢰도 결과만 한 단계 강한 모델로 재생성
+        "model_fallback_timeout_seconds": 90,  # 이 시간을 넘기면 한 단계 빠른 모델로 대체 (출력 4096토큰 기준, 더 긴 노드는 비례, 0이면 끔)
+        "breaker_enabled": True,      # 제공자/엔드포인트별 회로 차단기 (장애 중에는 바로 건너뜀)
+        "breaker_failure_rate": 0.5,  # 최근 호출 중 실패 비율이 이 이상이면 차단
+        "breaker_min_calls": 4,       # 실패율을 판단할 최소 호출 수
+        "breaker_window": 20,         # 실패율 계산에 쓰는 최근 호출 수
+        "breaker_cooldown_seconds": 30,  # 차단 후 시험 요청까지 대기 시간
+        "structured_output": True,    # 노드별 응답 스키마를 Gemini structured output으로 전달
+        "stream_partial_results": True,  # 패러프레이징 스타일을 완성되는 대로 화면에 표시 (스트리밍 호출)
+        "parse_retry_attempts": 1,    # JSON 복구까지 실패한 노드를 다시 요청하는 횟수 (호출당)
+        "parse_retry_budget": 3,      # 분석 1회 전체의 재요청 상한
+        "llm_cache_enabled": True,    # Gemini 응답 디스크 캐시
+        "llm_cache_max_entries": 2000,
+        "llm_cache_ttl_hours": 0,     # 0이면 만료 없음
+        "history_max_items": 1000,    # 보관할 분석 히스토리 수 (0이면 무제한)
     }
 
 DEFAULT_SETTINGS = get_default_settings()
@@ -50,3 +138,40 @@ VAGUE_WORDS = {
     "많은": "개수 명시",
 }
 
+
+# 참고문헌 검색어 추출 (keywords.py) - 검색어에서 뺄 일반어/학술 상투어
+KEYWORD_STOPWORDS = {
+    # 영어 일반 불용어
+    "a", "about", "above", "after", "again", "against", "all", "also", "am", "an", "and", "any", "are", "as",
+    "at", "be", "because", "been", "before", "being", "below", "between", "both", "but", "by", "can", "could",
+    "did", "do", "does", "doing", "down", "during", "each", "either", "few", "for", "from", "further", "had",
+    "has", "have", "having", "he", "her", "here", "hers", "him", "his", "how", "however", "i", "if", "in",
+    "into", "is", "it", "its", "itself", "just", "may", "might", "more", "most", "much", "must", "my", "no",
+    "nor", "not", "of", "off", "on", "once", "one", "only", "or", "other", "our", "ours", "out", "over", "own",
+    "same", "she", "should", "so", "some", "such", "than", "that", "the", "their", "them", "then", "there",
+    "these", "they", "this", "those", "through", "thus", "to", "too", "two", "under", "until", "up", "upon",
+    "very", "via", "was", "we", "were", "what", "when", "where", "whether", "which", "while", "who", "whom",
+    "why", "will", "with", "within", "without", "would", "yet", "you", "your",
+    # 학술 상투어 (주제와 무관하게 자주 등장)
+    "approach", "approaches", "based", "clearly", "compared", "comparison", "demonstrate", "demonstrates",
+    "effective", "existing", "experiment", "experiments", "findings", "furthermore", "improve", "improved",
+    "improves", "improving", "moreover", "method", "methods", "new", "novel", "paper", "present", "presents",
+    "previous", "propose", "proposed", "proposes", "result", "results", "research", "show", "shows", "shown",
+    "significant", "significantly", "state-of-the-art", "studies", "study", "suggest", "suggests", "therefore",
+    "use", "used", "uses", "using", "work", "works", "well", "first", "best", "better", "high", "low",
+    "various", "several", "many", "et", "al",
+    # 한국어 일반어/학술 상투어 (조사 제거 후 비교)
+    "그", "이", "저", "및", "등", "또한", "또는", "그리고", "하지만", "그러나", "따라서", "즉", "위해", "통해",
+    "대한", "대해", "있다", "없다", "한다", "된다", "이다", "것", "수", "때", "중", "더", "매우", "가장",
+    "본", "연구", "논문", "제안", "제안한", "제안하는", "방법", "기법", "결과", "기존", "비교", "실험",
+    "향상", "개선", "우수한", "상당한", "보인다", "보였다", "나타났다", "확인", "사용", "활용", "이용",
+    "위한", "대한", "분석", "효과", "줄이", "높이", "낮추",
+}
+
+# 한국어 어절 끝에서 떼어낼 조사/어미 (긴 것부터 검사)
+KOREAN_SUFFIXES = (
+    "에서는", "으로는", "에게서", "이라는", "하였다", "하였으며", "되었다", "에서", "으로", "에게", "까지", "부터",
+    "보다", "처럼", "이며", "하여", "하는", "하고", "하기", "했다", "한다", "된다", "되는", "적인", "적으로",
+    "시켰다", "었다", "면서",
+    "은", "는", "이", "가", "을", "를", "의", "에", "로", "와", "과", "도", "만", "들", "한", "된",
+)
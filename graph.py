@@ -1,5 +1,7 @@
 """LangGraph 워크플로우"""
 from typing import TypedDict, Optional
+import asyncio
+import contextlib
 import logging
 from langgraph.graph import StateGraph, END
 from nodes import (
@@ -12,15 +14,19 @@ from nodes import (
     detect_vague,
     analyze_prior_work,
     translate_to_korean,
+    fused_analysis,
+    input_trims_var,
+    partial_results_var,
 )
 from storage import get_journal, get_settings
+from services import cache_enabled_var, output_truncations_var, reask_budget_var, skipped_calls_var
 
 
 class State(TypedDict):
     # 입력
     text: str
     journal_name: Optional[str]
-    # 내부 데이터
+    # 내부 데이터 (분석 시작 시 한 번 읽은 저널 스냅샷: Aims & Scope, 맞춤 프롬프트)
     journal_data: Optional[dict]
     # 결과
     paraphrases: list
@@ -37,26 +43,31 @@ class State(TypedDict):
     translation: Optional[str]
     translation_skipped_korean: Optional[bool]
     translation_error: Optional[bool]
+    # 입력 토큰 예산 때문에 잘라낸 컨텍스트 내역 (노드, 필드, 원래/유지 토큰 수)
+    input_trims: list
+    # max_output_tokens에 걸려 출력이 잘린 노드
+    output_truncations: list
 
 
 async def load_journal(state: State) -> dict:
-    """저널 데이터 로드"""
+    """
+    저널 데이터(맞춤 프롬프트 포함) 로드 - 분석당 한 번만 읽고, 모든 노드는 State의 journal_data를 사용
+    분석 도중 저널 파일이 바뀌어도 한 분석 안에서는 같은 스냅샷을 씀
+    """
     if state.get("journal_name"):
-        data = get_journal(state["journal_name"])
+        data = await asyncio.to_thread(get_journal, state["journal_name"])
         return {"journal_data": data}
     return {"journal_data": None}
 
 
 async def run_paraphrase(state: State) -> dict:
-    j_name = state.get("journal_name", "") or ""
-    result = await paraphrase(state["text"], j_name)
+    result = await paraphrase(state["text"], state.get("journal_data"))
     # result는 이제 {"section": ..., "styles": [...]} 형태
     return {"paraphrases": result}
 
 
 async def run_claim_check(state: State) -> dict:
-    j_name = state.get("journal_name", "") or ""
-    result = await check_claim(state["text"], j_name)
+    result = await check_claim(state["text"], state.get("journal_data"))
     return {"claim": result, "claim_section": result.get("section")}
 
 
@@ -70,13 +81,12 @@ async def run_journal_match(state: State) -> dict:
 
 async def run_expand(state: State) -> dict:
     """주장 확장: claim 결과를 활용하여 더 정확한 확장 제안"""
-    j_name = state.get("journal_name", "") or ""
     # claim 결과에서 추출한 주장을 활용 (quality 향상)
     claim_data = state.get("claim", {})
     claim_text = claim_data.get("claim", "")
     
     # claim이 있으면 사용, 없으면 원문에서 추출하도록 프롬프트에 전달
-    result = await expand_claim(state["text"], claim_text, j_name)
+    result = await expand_claim(state["text"], claim_text, state.get("journal_data"))
     return {"expansions": result}
 
 
@@ -89,8 +99,7 @@ async def run_references(state: State) -> dict:
 
 
 async def run_reviewer(state: State) -> dict:
-    j_name = state.get("journal_name", "") or ""
-    result = await generate_reviewer_questions(state["text"], j_name)
+    result = await generate_reviewer_questions(state["text"], state.get("journal_data"))
     # result는 이제 {"section": ..., "questions": [...], "positive_feedback": ...} 형태
     # questions만 추출하여 반환 (하위 호환성)
     questions = result.get("questions", []) if isinstance(result, dict) else result
@@ -111,8 +120,7 @@ async def run_prior_work(state: State) -> dict:
     refs = state.get("references", [])
     if not refs:
         return {"prior_work_analysis": {}}
-    j_name = state.get("journal_name", "") or ""
-    result = await analyze_prior_work(state["text"], refs, j_name)
+    result = await analyze_prior_work(state["text"], refs, state.get("journal_data"))
     return {"prior_work_analysis": result}
 
 
@@ -142,6 +150,11 @@ async def run_translation(state: State) -> dict:
             return {"translation": None, "translation_error": True}
 
 
+async def run_fused(state: State) -> dict:
+    """빠른 모드: 패러프레이징/주장 체크/리뷰어/번역/저널 적합도를 한 번의 요청으로 처리"""
+    return await fused_analysis(state["text"], state.get("journal_data"))
+
+
 def create_graph():
     g = StateGraph(State)
 
@@ -191,16 +204,114 @@ def create_graph():
     return g.compile()
 
 
+def create_fast_graph():
+    """빠른 모드 그래프: 통합 요청(fused) 1회 + 그 결과를 쓰는 주장 확장, 참고문헌 체인"""
+    g = StateGraph(State)
+
+    g.add_node("load_journal", load_journal)
+    g.add_node("fused", run_fused)
+    g.add_node("expand", run_expand)
+    g.add_node("refs", run_references)
+    g.add_node("vague", run_vague)
+    g.add_node("prior_work", run_prior_work)
+
+    g.set_entry_point("load_journal")
+    g.add_edge("load_journal", "fused")
+    g.add_edge("load_journal", "refs")
+    g.add_edge("load_journal", "vague")
+
+    # fused 결과의 claim을 활용하여 확장
+    g.add_edge("fused", "expand")
+    g.add_edge("refs", "prior_work")
+
+    g.add_edge("expand", END)
+    g.add_edge("vague", END)
+    g.add_edge("prior_work", END)
+
+    return g.compile()
+
+
 # 싱글톤
 graph = create_graph()
+fast_graph = create_fast_graph()
+
+
+@contextlib.contextmanager
+def _run_context(use_cache: bool):
+    """분석 1회 동안 노드 태스크로 전파되는 실행 컨텍스트 (캐시 사용 여부, 재요청 예산, 진단 기록)"""
+    diagnostics = {"input_trims": [], "output_truncations": [], "skipped": []}
+    tokens = [
+        (cache_enabled_var, cache_enabled_var.set(use_cache)),
+        (reask_budget_var, reask_budget_var.set([get_settings().get("parse_retry_budget", 3)])),
+        (input_trims_var, input_trims_var.set(diagnostics["input_trims"])),
+        (output_truncations_var, output_truncations_var.set(diagnostics["output_truncations"])),
+        (skipped_calls_var, skipped_calls_var.set(diagnostics["skipped"])),
+    ]
+    try:
+        yield diagnostics
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+async def analyze(text: str, journal_name: str = "", use_cache: bool = True, fast: bool = False) -> dict:
+    """메인 분석 함수
+
+    use_cache=False 이면 캐시를 무시하고 새로 생성
+    fast=True 이면 여러 분석 노드를 한 번의 Gemini 요청으로 처리하는 빠른 모드 사용
+    """
+    with _run_context(use_cache) as diagnostics:
+        result = await (fast_graph if fast else graph).ainvoke(
+            {
+                "text": text,
+                "journal_name": journal_name or None,
+            }
+        )
+    result.update(diagnostics)
+    return result
 
 
-async def analyze(text: str, journal_name: str = "") -> dict:
-    """메인 분석 함수"""
-    result = await graph.ainvoke(
-        {
-            "text": text,
-            "journal_name": journal_name or None,
-        }
-    )
-    return result
+async def analyze_stream(text: str, journal_name: str = "", use_cache: bool = True, fast: bool = False):
+    """
+    점진적 분석: 노드가 끝날 때마다 (노드 이름, 상태 변경분)을 yield
+    UI는 가장 먼저 끝난 노드의 결과부터 바로 그릴 수 있음
+    노드가 스트리밍으로 받는 중에 완성된 항목은 ("partial", {"node", "path", "value"})로 먼저 전달
+    (설정 stream_partial_results, 현재는 패러프레이징 스타일)
+    """
+    queue = asyncio.Queue()
+    done = object()
+
+    def _partial(node: str, path: tuple, value):
+        queue.put_nowait(("partial", {"node": node, "path": path, "value": value}))
+
+    async def _pump():
+        try:
+            async for update in (fast_graph if fast else graph).astream(
+                {
+                    "text": text,
+                    "journal_name": journal_name or None,
+                },
+                stream_mode="updates",
+            ):
+                for node, delta in update.items():
+                    queue.put_nowait((node, delta or {}))
+        finally:
+            queue.put_nowait(done)
+
+    with _run_context(use_cache) as diagnostics:
+        sink = _partial if get_settings().get("stream_partial_results", True) else None
+        token = partial_results_var.set(sink)
+        try:
+            # 노드 태스크가 콜백을 물려받도록 컨텍스트 설정 후 태스크 생성
+            task = asyncio.create_task(_pump())
+        finally:
+            partial_results_var.reset(token)
+        try:
+            while (item := await queue.get()) is not done:
+                yield item
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+        # 마지막에 입력 축소/출력 잘림/회로 차단으로 건너뛴 내역을 별도 항목으로 전달
+        yield "diagnostics", diagnostics
@@ -0,0 +1,155 @@
+"""LLM 응답용 관대한 JSON 파서 (한 번의 순회로 흔한 손상을 복구)
+
+복구 대상:
+- 마크다운 코드블록/앞뒤 설명 문장
+- 닫는 괄호 앞의 trailing comma
+- 문자열 안의 이스케이프되지 않은 따옴표, 줄바꿈
+- 출력 상한에 걸려 잘린 문자열/배열/객체 (열린 괄호를 역순으로 닫음)
+"""
+import json
+
+_CLOSERS = {"{": "}", "[": "]"}
+_LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+
+
+def _next_significant(text: str, i: int) -> str:
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return text[i] if i < len(text) else ""
+
+
+def _last_significant(out: list) -> str:
+    for piece in reversed(out):
+        if not piece.isspace():
+            return piece[-1]
+    return ""
+
+
+def _drop_trailing(out: list):
+    """끝의 공백, 쉼표, 값 없는 키("key":)를 제거"""
+    while out:
+        tail = out[-1]
+        if tail.isspace() or tail == ",":
+            out.pop()
+        elif tail == ":":
+            out.pop()
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1].startswith('"'):
+                out.pop()
+        else:
+            break
+
+
+def _drop_partial_literal(out: list):
+    """잘린 숫자/리터럴(예: 12.  tru  fals)은 값 전체를 버림"""
+    j = len(out)
+    while j > 0 and len(out[j - 1]) == 1 and out[j - 1] in _LITERAL_CHARS:
+        j -= 1
+    literal = "".join(out[j:])
+    if not literal:
+        return
+    try:
+        json.loads(literal)
+    except ValueError:
+        del out[j:]
+
+
+def repair_json(text: str) -> str:
+    """손상된 JSON 텍스트를 json.loads 가능한 형태로 복구 (가능한 범위까지)"""
+    start = text.find("{")
+    if start >= 0:
+        # 코드블록, 'Here is the JSON:' 같은 머리말 제거
+        text = text[start:]
+    out = []          # 출력 조각 (문자열은 한 조각, 그 외는 한 글자씩)
+    stack = []
+    pending_key = None  # 아직 ':'가 오지 않은 객체 키의 out 위치
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            is_key = bool(stack) and stack[-1] == "{" and _last_significant(out) in ("{", ",")
+            buf = ['"']
+            i += 1
+            closed = False
+            while i < n:
+                c = text[i]
+                if c == "\\" and i + 1 < n:
+                    buf.append(text[i:i + 2])
+                    i += 2
+                    continue
+                if c == '"':
+                    # 뒤에 구분자가 오면 닫는 따옴표, 아니면 본문 속 따옴표로 보고 이스케이프
+                    if _next_significant(text, i + 1) in (",", "}", "]", ":", ""):
+                        buf.append('"')
+                        i += 1
+                        closed = True
+                        break
+                    buf.append('\\"')
+                elif c == "\n":
+                    buf.append("\\n")
+                elif c == "\r":
+                    buf.append("\\r")
+                elif c == "\t":
+                    buf.append("\\t")
+                elif c != "\\":
+                    buf.append(c)
+                i += 1
+            if not closed:
+                buf.append('"')
+            if is_key:
+                pending_key = len(out)
+            out.append("".join(buf))
+            continue
+
+        if ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            # 짝이 맞지 않는 닫는 괄호는 버림
+            if stack and _CLOSERS[stack[-1]] == ch:
+                stack.pop()
+                out.append(ch)
+                if not stack:
+                    break
+        else:
+            if ch == ":":
+                pending_key = None
+            out.append(ch)
+        i += 1
+
+    if stack:
+        if pending_key is not None:
+            del out[pending_key:]
+        _drop_trailing(out)
+        _drop_partial_literal(out)
+        for opener in reversed(stack):
+            _drop_trailing(out)
+            out.append(_CLOSERS[opener])
+    return "".join(out)
+
+
+def parse_json_tolerant(text: str):
+    """
+    dict 응답 파싱 → (결과, 복구 여부)
+    정상 JSON이면 그대로, 아니면 repair_json 후 재시도, 그래도 실패하면 (None, False)
+    """
+    if not text:
+        return None, False
+    stripped = text.strip()
+    try:
+        value = json.loads(stripped)
+        if isinstance(value, dict):
+            return value, False
+    except ValueError:
+        pass
+    try:
+        value = json.loads(repair_json(stripped))
+    except ValueError:
+        return None, False
+    return (value, True) if isinstance(value, dict) else (None, False)
@@ -0,0 +1,109 @@
+"""참고문헌 검색어 로컬 추출 (RAKE 방식, LLM 미사용)
+
+문단을 구두점과 불용어(config.KEYWORD_STOPWORDS)에서 끊어 후보 구(phrase)를 만들고,
+단어 점수 = 등장한 구 길이의 합(degree) / 등장 횟수(frequency), 구 점수 = 단어 점수의 합으로 순위를 매김
+- 한국어 어절은 끝의 조사/어미(config.KOREAN_SUFFIXES)를 떼고 비교
+- 한국어 문단 안의 영어 용어/약어(예: "합성곱 신경망(CNN)")는 Semantic Scholar 검색에 유리하므로 우선 사용
+"""
+import re
+from collections import defaultdict
+
+from config import KEYWORD_STOPWORDS, KOREAN_SUFFIXES
+
+_CLAUSE_SPLIT = re.compile(r"[.,;:!?()\[\]{}\"“”‘’/·]|\s[-–—]\s")
+_TOKEN = re.compile(r"[A-Za-z][A-Za-z0-9]*(?:-[A-Za-z0-9]+)*|[가-힣]+|\d+(?:\.\d+)?%?")
+_HANGUL = re.compile(r"[가-힣]")
+MAX_PHRASE_WORDS = 3
+
+
+def _normalize(token: str) -> str | None:
+    """비교용 형태 (불용어/숫자/한 글자는 None → 구 경계)"""
+    if token[0].isdigit():
+        return None
+    if _HANGUL.match(token):
+        for suffix in KOREAN_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+                token = token[: -len(suffix)]
+                break
+        word = token
+    else:
+        word = token.lower()
+    if len(word) < 2 or word in KEYWORD_STOPWORDS:
+        return None
+    return word
+
+
+def _candidates(text: str) -> list:
+    """후보 구 목록 [(비교용 단어 튜플, 표시용 문자열)]"""
+    phrases = []
+    for clause in _CLAUSE_SPLIT.split(text):
+        words, shown = [], []
+        for token in _TOKEN.findall(clause):
+            word = _normalize(token)
+            if word is None or len(words) == MAX_PHRASE_WORDS:
+                if words:
+                    phrases.append((tuple(words), " ".join(shown)))
+                words, shown = [], []
+                if word is None:
+                    continue
+            words.append(word)
+            # 약어(CNN, LiDAR 등)는 대소문자 유지, 나머지는 비교용 형태 (소문자, 조사 제거)
+            shown.append(token if token.isascii() and not token.islower() and not token.istitle() else word)
+        if words:
+            phrases.append((tuple(words), " ".join(shown)))
+    return phrases
+
+
+def extract_keywords(text: str, max_words: int = 6) -> list:
+    """점수가 높은 핵심 구부터, 단어 수 합이 max_words를 넘지 않도록 반환"""
+    phrases = _candidates(text or "")
+    if not phrases:
+        return []
+
+    frequency = defaultdict(int)
+    degree = defaultdict(int)
+    for words, _ in phrases:
+        for word in words:
+            frequency[word] += 1
+            degree[word] += len(words)
+
+    scored = {}
+    for words, shown in phrases:
+        if words not in scored:
+            score = sum(degree[w] / frequency[w] for w in words)
+            # 영어 용어는 한국어 구보다 우선 (검색 대상이 주로 영어 논문)
+            english = not any(_HANGUL.match(w) for w in words)
+            scored[words] = (english, score, shown)
+
+    ranked = sorted(scored.items(), key=lambda item: (item[1][0], item[1][1]), reverse=True)
+    keywords, used, seen = [], 0, set()
+    for words, (_, _, shown) in ranked:
+        if used + len(words) > max_words or seen.issuperset(words):
+            continue
+        keywords.append(shown)
+        used += len(words)
+        seen.update(words)
+        if used >= max_words:
+            break
+    return keywords
+
+
+def keyword_query(text: str, max_words: int = 6) -> str:
+    """Semantic Scholar 검색어 (핵심 구를 공백으로 연결)"""
+    return " ".join(extract_keywords(text, max_words))
+
+
+def keyword_variants(text: str, max_words: int = 6, count: int = 3) -> list:
+    """
+    동시에 검색할 검색어 변형들
+    첫 번째는 keyword_query와 같은 넓은 검색어, 나머지는 점수 순 핵심 구 하나씩 (좁은 검색어)
+    """
+    # 첫 번째는 keyword_query 그대로 (단일 검색 경로와 캐시/합치기 키를 공유)
+    head = keyword_query(text, max_words)
+    variants = [head] if head else []
+    phrases = extract_keywords(text, max_words * count)
+    # 한 단어짜리 구는 너무 넓어서 단독 검색어로 쓰지 않음
+    for phrase in phrases:
+        if " " in phrase and phrase not in variants:
+            variants.append(phrase)
+    return variants[:count]
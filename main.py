@@ -2,6 +2,7 @@
 import sys
 import os
 import subprocess
+import asyncio
 
 # 가상환경 자동 진입 (크로스 플랫폼 지원)
 def restart_in_venv():
@@ -39,16 +40,23 @@ except Exception as e:
 
 import flet as ft
 import pyperclip
-from graph import analyze
+from graph import analyze_stream
+from services import close_clients, prewarm_gemini, invalidate_prefix_cache, refresh_reference_index
+from nodes import warm_cache_from_history
 from prompt_generator import register_journal
 from storage import (
-    get_journals,
+    get_journal,
+    list_journals,
     delete_journal,
     get_settings,
+    subscribe_settings,
     update_setting,
+    update_settings,
     save_history,
-    get_history,
-    save_history_list,
+    list_history,
+    get_history_item,
+    delete_history,
+    flush_writes,
 )
 
 
@@ -65,12 +73,31 @@ class App:
         self.result = None
         self.selected_journal = None
         self.settings = get_settings()
+        # 설정이 바뀌면(앱에서 저장했거나 파일이 외부에서 수정됨) 알림으로만 갱신
+        subscribe_settings(self._on_settings_changed)
 
         # UI State
         self.current_view = "write"  # write, history, settings
 
         self.build_ui()
         self._prompt_gemini_key_if_missing()
+        # 창을 닫을 때 커넥션 풀(Gemini, Semantic Scholar)을 정리하고 대기 중인 저장을 마친 뒤 종료
+        self.page.window.prevent_close = True
+        self.page.window.on_event = self._on_window_event
+        # Gemini 커넥션 예열 (백그라운드)
+        self.page.run_task(prewarm_gemini)
+        self.page.run_task(self._warm_response_cache)
+        # 로컬 참고문헌 라이브러리 색인 갱신 (바뀐 파일만, 백그라운드)
+        self.page.run_task(refresh_reference_index)
+
+    async def _on_window_event(self, e):
+        if e.type == ft.WindowEventType.CLOSE:
+            try:
+                await close_clients()
+                # 백그라운드 저장(설정, 저널, 히스토리)이 디스크에 반영될 때까지 대기
+                await asyncio.to_thread(flush_writes, 10)
+            finally:
+                await self.page.window.destroy()
 
     def build_ui(self):
         # ===== Navigation Rail =====
@@ -192,6 +219,20 @@ class App:
             active_color=ft.Colors.BLUE_600,
         )
 
+        self.fast_toggle = ft.Switch(
+            label="빠른 모드",
+            tooltip="여러 분석을 한 번의 요청으로 처리 (저널 맞춤 프롬프트 대신 Aims & Scope만 사용)",
+            value=self.settings.get("fast_mode", False),
+            on_change=self._on_fast_toggle,
+            active_color=ft.Colors.BLUE_600,
+        )
+
+        self.fresh_toggle = ft.Switch(
+            label="새로 생성 (캐시 무시)",
+            value=False,
+            active_color=ft.Colors.BLUE_600,
+        )
+
         # Action Buttons
         self.analyze_btn = ft.Button(
             "분석 시작",
@@ -345,6 +386,8 @@ class App:
                                 self.refresh_journal_btn,
                                 ft.Container(width=20),
                                 self.ref_toggle,
+                                self.fast_toggle,
+                                self.fresh_toggle,
                                 ft.Container(expand=True),
                                 ft.TextButton("Clear", icon=ft.Icons.CLEAR_ALL, on_click=self._clear_input, style=ft.ButtonStyle(color=ft.Colors.GREY_500)),
                                 self.analyze_btn,
@@ -380,14 +423,26 @@ class App:
             padding=30,
         )
 
+    HISTORY_PAGE_SIZE = 50
+
     def _build_history_view(self):
         self.history_list = ft.ListView(expand=True, spacing=10)
+        self.history_query = ""
+        self.history_search = ft.TextField(
+            hint_text="입력/결과 전문 검색",
+            prefix_icon=ft.Icons.SEARCH,
+            dense=True,
+            on_submit=self._on_history_search,
+        )
+        self.history_more_btn = ft.TextButton("더 보기", on_click=lambda e: self._refresh_history(append=True), visible=False)
         return ft.Container(
             content=ft.Column(
                 [
                     ft.Text("History", size=24, weight=ft.FontWeight.BOLD),
+                    self.history_search,
                     ft.Divider(),
                     self.history_list,
+                    self.history_more_btn,
                 ],
                 expand=True,
             ),
@@ -452,56 +507,41 @@ class App:
 
         try:
             j_name = self.selected_journal["name"] if self.selected_journal else ""
-            self.result = await analyze(text.strip(), j_name)
+            self.result = {"text": text.strip(), "journal_name": j_name or None}
+            self.translation_display.visible = False
 
-            # Update translation display
-            translation = self.result.get("translation")
-            translation_skipped = self.result.get("translation_skipped_korean", False)
-            translation_error = self.result.get("translation_error", False)
-            
-            if translation:
-                # 번역 성공
-                self.translation_text.value = translation
-                self.translation_status.value = "✓ 영어 입력을 한국어로 번역했습니다."
-                self.translation_status.color = ft.Colors.GREEN_600
-                self.translation_display.visible = True
-            elif translation_skipped:
-                # 한국어 입력이므로 번역 건너뜀 (정상)
-                self.translation_text.value = ""
-                self.translation_status.value = "ℹ 입력이 한국어이므로 번역을 건너뜁니다."
-                self.translation_status.color = ft.Colors.BLUE_600
-                self.translation_display.visible = True
-            elif translation_error:
-                # 번역 실패
-                self.translation_text.value = ""
-                self.translation_status.value = "⚠ 번역에 실패했습니다."
-                self.translation_status.color = ft.Colors.ORANGE_600
-                self.translation_display.visible = True
-            else:
-                # 번역 노드가 실행되지 않음 (이론적으로 발생하지 않아야 함)
-                self.translation_display.visible = False
-
-            # Update Tabs
-            self._show_paraphrases()
-            self._show_claim()
-            self._show_journal()
-            self._show_expand()
-            self._show_refs()
-            self._show_reviewer()
-            
-            # Show Results
+            # 결과 화면으로 먼저 전환하고, 노드가 끝날 때마다 해당 탭을 채움
+            self._show_pending()
             self.result_tabs_container.visible = True
             self.result_container.visible = True
-            
-            # Switch to Analysis View
             self.current_view = "analysis"
             self.rail.selected_index = 1
             self.content_area.content = self.view_analysis
-            self.page.update()
-
-            # Default to first tab
             self._switch_tab(0)
 
+            pending = set(self._TAB_RENDERERS)
+            async for node, delta in analyze_stream(
+                text.strip(),
+                j_name,
+                use_cache=not self.fresh_toggle.value,
+                fast=self.fast_toggle.value,
+            ):
+                if node == "partial":
+                    self._apply_partial(delta)
+                    self.page.update()
+                    continue
+                self.result.update(delta)
+                for renderer in self._NODE_RENDERERS.get(node, ()):
+                    getattr(self, renderer)()
+                    pending.discard(renderer)
+                self.page.update()
+
+            # 실행되지 않은 노드의 탭은 "결과 없음"으로 마무리
+            for renderer in self._TAB_RENDERERS:
+                if renderer in pending:
+                    getattr(self, renderer)()
+            self.page.update()
+
             save_history(text, self.result)
             
             # #region agent log - debug result structure
@@ -515,7 +555,18 @@ class App:
             except: pass
             # #endregion
 
-            self.status_text.value = "분석 완료"
+            notes = []
+            trims = self.result.get("input_trims") or []
+            if trims:
+                fields = ", ".join(sorted({f"{t['node']}.{t['field']}" for t in trims}))
+                notes.append(f"입력 예산 초과로 축소: {fields}")
+            truncations = self.result.get("output_truncations") or []
+            if truncations:
+                notes.append("출력 잘림: " + ", ".join(sorted({t["node"] for t in truncations})))
+            skipped = self.result.get("skipped") or []
+            if skipped:
+                notes.append("제공자 일시 중단으로 건너뜀: " + ", ".join(sorted({s["node"] for s in skipped})))
+            self.status_text.value = f"분석 완료 ({'; '.join(notes)})" if notes else "분석 완료"
             self._snack("✅ 분석이 완료되었습니다!", bgcolor=ft.Colors.GREEN)
 
         except Exception as ex:
@@ -528,9 +579,94 @@ class App:
             self.loading.visible = False
             self.page.update()
 
+    # 노드 이름 → 해당 노드 결과로 갱신할 화면
+    _NODE_RENDERERS = {
+        "paraphrase": ("_show_paraphrases",),
+        "claim": ("_show_claim",),
+        "journal": ("_show_journal",),
+        "expand": ("_show_expand",),
+        "refs": ("_show_refs",),
+        "reviewer": ("_show_reviewer",),
+        "translation": ("_show_translation",),
+        "fused": ("_show_paraphrases", "_show_claim", "_show_journal", "_show_reviewer", "_show_translation"),
+    }
+    # 스트리밍 부분 결과 (노드, 필드) → 항목을 임시로 쌓을 결과 키, 다시 그릴 화면
+    _PARTIAL_RENDERERS = {
+        ("paraphrase", "styles"): ("paraphrases", "_show_paraphrases"),
+    }
+    # 탭 순서대로의 렌더러
+    _TAB_RENDERERS = (
+        "_show_paraphrases",
+        "_show_claim",
+        "_show_journal",
+        "_show_expand",
+        "_show_refs",
+        "_show_reviewer",
+    )
+
+    def _apply_partial(self, event: dict):
+        """
+        스트리밍 중 완성된 항목을 결과에 임시로 넣고 탭을 다시 그림 (노드가 끝나면 전체 결과로 교체)
+        대체/승격으로 다시 생성되면 같은 위치의 항목을 새 값으로 덮어씀
+        """
+        field, index = event["path"][0], event["path"][1]
+        target = self._PARTIAL_RENDERERS.get((event["node"], field))
+        if not target:
+            return
+        key, renderer = target
+        items = self.result.setdefault(key, {}).setdefault(field, [])
+        items.extend([None] * (index + 1 - len(items)))
+        items[index] = event["value"]
+        getattr(self, renderer)()
+
+    def _show_pending(self):
+        """분석 진행 중 탭 자리 표시"""
+        for c in self.tab_contents:
+            c.controls.clear()
+            c.controls.append(
+                ft.Row([
+                    ft.ProgressRing(width=18, height=18, stroke_width=2, color=ft.Colors.BLUE_600),
+                    ft.Text("분석 중...", color=ft.Colors.GREY_600),
+                ], spacing=10)
+            )
+
+    def _show_translation(self):
+        translation = self.result.get("translation")
+        translation_skipped = self.result.get("translation_skipped_korean", False)
+        translation_error = self.result.get("translation_error", False)
+        
+        if translation:
+            # 번역 성공
+            self.translation_text.value = translation
+            self.translation_status.value = "✓ 영어 입력을 한국어로 번역했습니다."
+            self.translation_status.color = ft.Colors.GREEN_600
+            self.translation_display.visible = True
+        elif translation_skipped:
+            # 한국어 입력이므로 번역 건너뜀 (정상)
+            self.translation_text.value = ""
+            self.translation_status.value = "ℹ 입력이 한국어이므로 번역을 건너뜁니다."
+            self.translation_status.color = ft.Colors.BLUE_600
+            self.translation_display.visible = True
+        elif translation_error:
+            # 번역 실패
+            self.translation_text.value = ""
+            self.translation_status.value = "⚠ 번역에 실패했습니다."
+            self.translation_status.color = ft.Colors.ORANGE_600
+            self.translation_display.visible = True
+        else:
+            # 번역 노드가 실행되지 않음 (이론적으로 발생하지 않아야 함)
+            self.translation_display.visible = False
+
     def _analyze(self, e):
         self.page.run_task(self._do_analyze)
 
+    async def _warm_response_cache(self):
+        """히스토리 결과로 응답 캐시 예열 (백그라운드)"""
+        try:
+            await asyncio.to_thread(warm_cache_from_history)
+        except Exception as ex:
+            print(f"캐시 예열 오류: {ex}")
+
     def _clear_input(self, e):
         self.input.value = ""
         self.status_text.value = ""
@@ -546,7 +682,7 @@ class App:
 
     def _journal_options(self):
         opts = [ft.dropdown.Option(key="", text="선택 안함 (일반 분석)")]
-        for j in get_journals():
+        for j in list_journals():
             opts.append(ft.dropdown.Option(key=j["name"], text=j["name"]))
         return opts
     
@@ -560,8 +696,7 @@ class App:
     def _on_journal_change(self, e):
         name = e.control.value
         if name:
-            journals = get_journals()
-            self.selected_journal = next((j for j in journals if j["name"] == name), None)
+            self.selected_journal = get_journal(name)
         else:
             self.selected_journal = None
 
@@ -719,7 +854,7 @@ class App:
 
     def _build_journal_list(self):
         """저널 목록 및 삭제 버튼 생성"""
-        journals = get_journals()
+        journals = list_journals()
         
         if not journals:
              return ft.Text("등록된 저널이 없습니다.", color=ft.Colors.GREY_400)
@@ -777,6 +912,7 @@ class App:
     def _confirm_delete(self, name, dlg):
         try:
             delete_journal(name)
+            self.page.run_task(invalidate_prefix_cache, name)
             self._close_dialog(dlg)
             self._snack(f"'{name}' 저널이 삭제되었습니다.")
             
@@ -1344,7 +1480,10 @@ class App:
                     ft.Column([
                         ft.Text(r.get("title"), weight="bold", size=14, selectable=True),
                         ft.Text(f"{r.get('authors')} ({r.get('year')}) - {r.get('venue')}", size=12, color=ft.Colors.GREY_600, selectable=True),
-                        ft.Text(f"In-context Citation: {r.get('citations')} citations", size=11, color=ft.Colors.BLUE_400, selectable=True),
+                        ft.Text(
+                            f"In-context Citation: {r.get('citations')} citations" if r.get("citations") is not None else "Local library",
+                            size=11, color=ft.Colors.BLUE_400, selectable=True,
+                        ),
                         ft.Row([
                             ft.TextButton("DOI Link", on_click=lambda e, u=r.get("doi_url"): self.page.launch_url(u)) if r.get("doi_url") else ft.Container(),
                             ft.IconButton(ft.Icons.COPY, tooltip="Copy DOI", on_click=lambda e, d=doi: self._copy(d)) if doi else ft.Container(),
@@ -1426,9 +1565,14 @@ class App:
     # Settings & History Views
     # ==========================================
     
-    def _refresh_history(self):
-        self.history_list.controls.clear()
-        for idx, item in enumerate(get_history()):
+    def _refresh_history(self, append=False):
+        """히스토리 목록 한 페이지 표시 (append=True면 다음 페이지를 이어 붙임, 결과는 클릭할 때 로드)"""
+        if not append:
+            self.history_list.controls.clear()
+        offset = len(self.history_list.controls)
+        # 다음 페이지가 있는지 알기 위해 하나 더 조회
+        items = list_history(self.HISTORY_PAGE_SIZE + 1, offset, self.history_query)
+        for item in items[:self.HISTORY_PAGE_SIZE]:
             text_prev = item.get("text", "")[:80] + "..."
             self.history_list.controls.append(
                 ft.ListTile(
@@ -1436,16 +1580,33 @@ class App:
                     title=ft.Text(text_prev),
                     subtitle=ft.Text(item.get("time", "")),
                     trailing=ft.IconButton(ft.Icons.DELETE, on_click=lambda e, i=item: self._delete_history(i)),
-                    on_click=lambda e, r=item.get("result"): self._load_from_history(r)
+                    on_click=lambda e, i=item["id"]: self._open_history(i)
                 )
             )
-    
+        self.history_more_btn.visible = len(items) > self.HISTORY_PAGE_SIZE
+        if append:
+            self.page.update()
+
+    def _on_history_search(self, e):
+        self.history_query = e.control.value or ""
+        self._refresh_history()
+        self.page.update()
+
     def _delete_history(self, item):
-         history = get_history()
-         new_h = [h for h in history if h.get("time") != item.get("time")]
-         save_history_list(new_h)
-         self._refresh_history()
-         self.page.update()
+        self.page.run_task(self._do_delete_history, item["id"])
+
+    async def _do_delete_history(self, history_id):
+        # 삭제는 쓰기 스레드에서 실행되므로 끝난 뒤 목록을 다시 읽음
+        await asyncio.wrap_future(delete_history(history_id))
+        self._refresh_history()
+        self.page.update()
+
+    def _open_history(self, history_id):
+        item = get_history_item(history_id)
+        if item is None:
+            self._snack("히스토리 항목을 찾을 수 없습니다.", bgcolor=ft.Colors.RED)
+            return
+        self._load_from_history(item["result"])
 
     def _load_from_history(self, result):
         self.result = result
@@ -1475,9 +1636,7 @@ class App:
         ss_key = ft.TextField(label="Semantic Scholar API Key", value=self.settings.get("ss_api_key", ""), password=True, can_reveal_password=True, width=500)
         
         def _save(e):
-            update_setting("gemini_api_key", gemini_key.value)
-            update_setting("ss_api_key", ss_key.value)
-            self.settings = get_settings()
+            update_settings({"gemini_api_key": gemini_key.value, "ss_api_key": ss_key.value})
             self._snack("설정 저장 완료")
             
         self.settings_col.controls.extend([
@@ -1494,9 +1653,14 @@ class App:
             self.page.update()
             self._snack("Gemini API 키를 먼저 설정해주세요.", bgcolor=ft.Colors.RED)
 
+    def _on_settings_changed(self, settings: dict):
+        self.settings = settings
+
     def _on_ref_toggle(self, e):
         update_setting("enable_references", e.control.value)
-        self.settings = get_settings()
+
+    def _on_fast_toggle(self, e):
+        update_setting("fast_mode", e.control.value)
 
     def _snack(self, msg, bgcolor=ft.Colors.BLACK87):
         self.page.snack_bar = ft.SnackBar(ft.Text(msg), bgcolor=bgcolor)
@@ -1,6 +1,9 @@
 """분석 노드 함수들"""
+import contextvars
 import logging
-from services import ask_gemini, search_papers
+import math
+import re
+from services import ask_gemini, ask_gemini_stream_json, search_papers, cache_response, prefix_cache_active, estimate_tokens
 from prompts import (
     DEFAULT_PARAPHRASE_PROMPT,
     DEFAULT_CLAIM_CHECK_PROMPT,
@@ -10,18 +13,29 @@ from prompts import (
     DEFAULT_PRIOR_WORK_PROMPT,
     DEFAULT_TRANSLATION_PROMPT,
     SEARCH_QUERY_PROMPT,
+    FUSED_ANALYSIS_PROMPT,
+    FUSED_JOURNAL_CONTEXT,
+    FUSED_JOURNAL_TASK,
+    FUSED_JOURNAL_SCHEMA,
+    FUSED_TRANSLATION_TASK,
+    FUSED_TRANSLATION_SCHEMA,
+    JOURNAL_SCOPE_REFERENCE,
+    OUTPUT_SCHEMAS,
+    RESPONSE_SCHEMAS,
 )
-from prompt_generator import get_journal_prompts
+from prompt_generator import journal_prompts
+from keywords import keyword_variants
 from config import VAGUE_WORDS, OVERSTATEMENT_WORDS
-from storage import get_settings, get_journal
+from storage import get_settings, get_journal, get_history
 
 logger = logging.getLogger(__name__)
 
 
-def _get_prompt(journal_name: str, prompt_type: str, default: str) -> str:
-    """저널 맞춤 프롬프트 또는 기본 프롬프트 반환"""
-    if journal_name:
-        custom_prompts = get_journal_prompts(journal_name)
+def _get_prompt(journal_data: dict | None, prompt_type: str, default: str) -> str:
+    """저널 맞춤 프롬프트 또는 기본 프롬프트 반환 (분석 시작 시 읽은 저널 스냅샷 기준)"""
+    if journal_data:
+        journal_name = journal_data.get("name", "")
+        custom_prompts = journal_prompts(journal_data)
         if custom_prompts and prompt_type in custom_prompts:
             custom_prompt = custom_prompts[prompt_type]
             logger.debug(f"맞춤 프롬프트 사용: {journal_name} - {prompt_type}")
@@ -61,19 +75,328 @@ def _safe_format(template: str, **kwargs) -> str:
         return template
 
 
+# ========== 입력 토큰 예산 ==========
+# 분석 1회 동안 잘라낸 컨텍스트 기록 (graph.analyze가 리스트를 넣고 결과의 input_trims로 노출)
+input_trims_var = contextvars.ContextVar("input_trims", default=None)
+
+TRIM_MARKER = " …(trimmed)"
+
+
+def _input_budget(node: str) -> int:
+    budgets = get_settings().get("input_token_budgets") or {}
+    return int(budgets.get(node, budgets.get("default", 0)) or 0)
+
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    """문장/줄 단위로 앞에서부터 max_tokens 이내만 유지 (항상 같은 결과)"""
+    max_tokens -= estimate_tokens(TRIM_MARKER)
+    if max_tokens <= 0:
+        return ""
+    pieces = [p for p in re.split(r"(?<=[.!?。])\s+|\n+", text) if p.strip()]
+    kept = []
+    used = 0
+    for piece in pieces:
+        cost = estimate_tokens(piece)
+        if used + cost > max_tokens:
+            break
+        kept.append(piece)
+        used += cost
+    if not kept and pieces:
+        # 첫 문장부터 예산을 넘으면 글자 수 비율로 자름
+        first = pieces[0]
+        kept.append(first[: max(1, len(first) * max_tokens // max(estimate_tokens(first), 1))])
+    sep = "\n" if "\n" in text else " "
+    return sep.join(kept) + TRIM_MARKER
+
+
+def _fit_budget(node: str, render, context: list) -> dict:
+    """
+    render(**필드)로 만든 프롬프트가 노드 입력 예산을 넘지 않도록 선택 컨텍스트를 줄여서 반환
+    context는 [(필드명, 텍스트), ...] 로 뒤쪽일수록 우선순위가 낮아 먼저 잘림
+    원문 문단은 절대 자르지 않음. 잘라낸 내역은 input_trims_var에 기록
+    """
+    fitted = {name: value for name, value in context}
+    budget = _input_budget(node)
+    if budget <= 0:
+        return fitted
+    total = estimate_tokens(render(**fitted))
+    over = total - budget
+    if over <= 0:
+        return fitted
+    for name, value in reversed(context):
+        if over <= 0:
+            break
+        size = estimate_tokens(value)
+        if not size:
+            continue
+        # 템플릿에 같은 필드가 여러 번 들어가면 그만큼 더 줄여야 함
+        repeats = max(1, round((total - estimate_tokens(render(**{**fitted, name: ""}))) / size))
+        fitted[name] = _truncate_tokens(value, size - math.ceil(over / repeats))
+        kept_tokens = estimate_tokens(fitted[name])
+        total = estimate_tokens(render(**fitted))
+        over = total - budget
+        trim = {
+            "node": node,
+            "field": name,
+            "original_tokens": size,
+            "kept_tokens": kept_tokens,
+            "budget": budget,
+        }
+        logger.info(f"입력 예산 초과로 컨텍스트 축소: {trim}")
+        trims = input_trims_var.get()
+        if trims is not None:
+            trims.append(trim)
+    if over > 0:
+        logger.warning(f"{node}: 컨텍스트를 모두 줄여도 입력 예산 초과 ({over} 토큰)")
+    return fitted
+
+
+# ========== 출력 스키마 (짧은 키 ↔ 원래 키) ==========
+def _compact_output(template: str) -> bool:
+    """템플릿의 {output_schema} 자리에 짧은 키 형식을 넣을지 (compact_schemas 설정, 자리가 없는 맞춤 프롬프트는 원래 키)"""
+    return "{output_schema}" in template and bool(get_settings().get("compact_schemas", True))
+
+
+def _output_schema(node: str, compact: bool) -> str:
+    """기본 프롬프트의 {output_schema} 자리에 넣을 JSON 형식"""
+    return OUTPUT_SCHEMAS[node]["compact" if compact else "full"]
+
+
+def _restore_keys(result, node: str):
+    """짧은 키 응답을 기존 결과 형태로 복원 (저널 맞춤 프롬프트의 원래 키 응답은 그대로 통과)"""
+    keys = OUTPUT_SCHEMAS[node]["keys"]
+    if isinstance(result, dict):
+        return {keys.get(k, k): _restore_keys(v, node) for k, v in result.items()}
+    if isinstance(result, list):
+        return [_restore_keys(v, node) for v in result]
+    return result
+
+
+def _shorten_schema(schema: dict, short: dict) -> dict:
+    """응답 스키마의 속성 이름을 짧은 키로 변환 (short: 원래 키 → 짧은 키)"""
+    if schema.get("type") == "OBJECT":
+        return {
+            **schema,
+            "properties": {short.get(k, k): _shorten_schema(v, short) for k, v in schema["properties"].items()},
+            "required": [short.get(k, k) for k in schema.get("required", [])],
+        }
+    if schema.get("type") == "ARRAY":
+        return {**schema, "items": _shorten_schema(schema["items"], short)}
+    return schema
+
+
+def _response_schema(node: str, compact: bool) -> dict:
+    """
+    ask_gemini(schema=)로 넘길 응답 스키마
+    프롬프트 구성 함수가 짧은 키 형식을 넣었으면(compact) 짧은 키로, 원래 키를 쓰는 프롬프트면 그대로
+    """
+    schema = RESPONSE_SCHEMAS[node]
+    output = OUTPUT_SCHEMAS.get(node)
+    if compact and output:
+        short = {full: key for key, full in output["keys"].items()}
+        return _shorten_schema(schema, short)
+    return schema
+
+
+# ========== 낮은 신뢰도 판정 (모델 승격 기준) ==========
+# 복원된 결과에서 반드시 채워져 있어야 하는 필드 — 비어 있으면 ask_gemini가 한 단계 강한 모델로 다시 생성
+_REQUIRED_FIELDS = {
+    "paraphrase": "styles",
+    "claim": "claim",
+    "journal": "revised",
+    "expand": "directions",
+    "reviewer": "questions",
+    "prior_work": "differentiation",
+}
+
+
+def _confident(node: str):
+    """ask_gemini(accept=)로 넘길 판정 함수"""
+    field = _REQUIRED_FIELDS[node]
+
+    def _accept(result: dict) -> bool:
+        return bool(_restore_keys(result, node).get(field))
+
+    return _accept
+
+
+def _fused_confident(result: dict) -> bool:
+    claim = result.get("claim_check")
+    paraphrase = result.get("paraphrase")
+    if not isinstance(claim, dict) or not isinstance(paraphrase, dict):
+        return False
+    return bool(claim.get("claim")) and bool(paraphrase.get("styles"))
+
+
+# ========== 부분 결과 스트리밍 ==========
+# 분석 1회 동안 완성된 항목을 바로 전달받을 콜백 (노드, 경로, 값) — graph.analyze_stream이 설정
+partial_results_var = contextvars.ContextVar("partial_results", default=None)
+
+
+async def _ask_streaming(prompt: str, node: str, fields: tuple, schema: dict = None, accept=None, journal: dict = None) -> dict:
+    """
+    partial_results_var가 설정돼 있으면 스트리밍으로 받아 fields 배열의 항목이 닫힐 때마다 콜백에 전달
+    반환값은 ask_gemini와 같은 최종 dict (키 복원됨), 콜백이 없으면 ask_gemini 그대로
+    """
+    emit = partial_results_var.get()
+    if emit is None:
+        return _restore_keys(await ask_gemini(prompt, node=node, journal=journal, schema=schema, accept=accept), node)
+    result = {}
+    async for path, value in ask_gemini_stream_json(prompt, node=node, journal=journal, schema=schema, accept=accept):
+        if not path:
+            result = value
+        elif len(path) == 2 and path[0] in fields and isinstance(path[1], int):
+            emit(node, path, value)
+    return result
+
+
+# ========== 노드별 프롬프트 구성 ==========
+def _prefix_journal(journal_data: dict | None) -> dict | None:
+    """프리픽스 캐시가 켜져 있으면 ask_gemini(journal=)로 넘길 저널 데이터"""
+    if journal_data and prefix_cache_active():
+        return journal_data
+    return None
+
+
+def _scope(journal_data: dict) -> str:
+    """프롬프트에 넣을 Aims & Scope (프리픽스 캐시 사용 시 참조 문구로 대체)"""
+    if _prefix_journal(journal_data):
+        return JOURNAL_SCOPE_REFERENCE
+    return journal_data.get("aims_scope", "")
+
+
+def _journal_label(journal_data: dict | None) -> str:
+    return journal_data.get("name", "") if journal_data else ""
+
+
+# 프롬프트 구성 함수는 (프롬프트, 응답 스키마)를 반환 — 스키마의 키 형식은 프롬프트에 넣은 형식과 같음
+def _paraphrase_prompt(text: str, journal_data: dict = None) -> tuple[str, dict]:
+    prompt_template = _get_prompt(journal_data, "paraphrase", DEFAULT_PARAPHRASE_PROMPT)
+    compact = _compact_output(prompt_template)
+    prompt = _safe_format(prompt_template, text=text, output_schema=_output_schema("paraphrase", compact))
+    return prompt, _response_schema("paraphrase", compact)
+
+
+def _claim_prompt(text: str, journal_data: dict = None) -> tuple[str, dict]:
+    prompt_template = _get_prompt(journal_data, "claim_check", DEFAULT_CLAIM_CHECK_PROMPT)
+    compact = _compact_output(prompt_template)
+    prompt = _safe_format(prompt_template, text=text, output_schema=_output_schema("claim", compact))
+    return prompt, _response_schema("claim", compact)
+
+
+def _journal_fit_prompt(text: str, journal_data: dict) -> tuple[str, dict]:
+    prompt_template = _get_prompt(journal_data, "journal_fit", DEFAULT_JOURNAL_FIT_PROMPT)
+    journal_name = journal_data.get("full_name", journal_data.get("name", ""))
+    compact = _compact_output(prompt_template)
+
+    def _render(scope: str) -> str:
+        return _safe_format(
+            prompt_template,
+            text=text,
+            journal_name=journal_name,
+            scope=scope,
+            output_schema=_output_schema("journal", compact),
+        )
+
+    prompt = _render(**_fit_budget("journal", _render, [("scope", _scope(journal_data))]))
+    return prompt, _response_schema("journal", compact)
+
+
+def _expansion_prompt(text: str, claim: str = "", journal_data: dict = None) -> tuple[str, dict]:
+    # Hybrid Prompting: Use DEFAULT_EXPANSION_PROMPT (Static Structure) with Dynamic Context (Journal Info)
+    # We explicitly IGNORE the generated 'expansion' prompt from get_journal_prompts because the hybrid one is more robust.
+    prompt_template = DEFAULT_EXPANSION_PROMPT
+    compact = _compact_output(prompt_template)
+    
+    # Get Journal Context
+    target_journal = "General Academic Context"
+    target_scope = "Broad impact and rigorous methodology"
+    
+    if journal_data:
+        target_journal = journal_data.get("full_name", journal_data.get("name", ""))
+        target_scope = _scope(journal_data)
+
+    # claim이 제공되면 사용, 없으면 프롬프트에서 원문에서 추출하도록 안내
+    if claim and claim.strip():
+        # claim_section is minimal now because specific prompts are in the template
+        claim_section = f"[핵심 주장]\n{claim}"
+        logger.debug(f"주장 확장: 제공된 claim 사용, claim_length={len(claim)}")
+    else:
+        claim_section = "" # Template handles missing claim by asking to extract it if needed, but our new template assumes claim is passed or context is there.
+        # Actually the new template has {claim_section} placeholder.
+        # If no claim provided, we should ask it to extract.
+        claim_section = "[핵심 주장]\n(입력된 문단에서 핵심 주장을 추출하여 분석의 기반으로 삼으세요)"
+        logger.debug(f"주장 확장: 원문에서 claim 추출")
+    
+    # claim_section이 있으면 claim으로도 사용 가능하도록 전달
+    format_kwargs = {
+        "text": text, 
+        "claim_section": claim_section,
+        "journal_name": target_journal,
+        "aims_scope": target_scope,
+        "output_schema": _output_schema("expand", compact),
+    }
+    if claim and claim.strip():
+        format_kwargs["claim"] = claim
+
+
+    def _render(aims_scope: str) -> str:
+        return _safe_format(prompt_template, **{**format_kwargs, "aims_scope": aims_scope})
+
+    prompt = _render(**_fit_budget("expand", _render, [("aims_scope", target_scope)]))
+    return prompt, _response_schema("expand", compact)
+
+
+def _reviewer_prompt(text: str, journal_data: dict = None) -> tuple[str, dict]:
+    prompt_template = _get_prompt(journal_data, "reviewer", DEFAULT_REVIEWER_PROMPT)
+    compact = _compact_output(prompt_template)
+    prompt = _safe_format(prompt_template, text=text, output_schema=_output_schema("reviewer", compact))
+    return prompt, _response_schema("reviewer", compact)
+
+
+def _prior_work_prompt(text: str, references: list, journal_data: dict = None) -> tuple[str, dict]:
+    # 상위 5개까지만 사용
+    top_refs = references[:5]
+    prior_works = []
+    for r in top_refs:
+        prior_works.append(
+            f"- {r.get('title', '')} ({r.get('year', '')}) | {r.get('venue', '')} | DOI: {r.get('doi', 'N/A')}"
+        )
+
+    prior_text = "\n".join(prior_works)
+    prompt_template = _get_prompt(journal_data, "prior_work", DEFAULT_PRIOR_WORK_PROMPT)
+    compact = _compact_output(prompt_template)
+
+    def _render(prior_works: str) -> str:
+        return _safe_format(
+            prompt_template,
+            text=text,
+            prior_works=prior_works,
+            output_schema=_output_schema("prior_work", compact),
+        )
+
+    # 관련도 순으로 정렬되어 있으므로 잘릴 때는 뒤쪽(관련도 낮은) 논문부터 빠짐
+    prompt = _render(**_fit_budget("prior_work", _render, [("prior_works", prior_text)]))
+    return prompt, _response_schema("prior_work", compact)
+
+
+def _translation_prompt(text: str) -> str:
+    return _safe_format(DEFAULT_TRANSLATION_PROMPT, text=text)
+
+
 # ========== 1. 패러프레이징 (영어 출력) ==========
-async def paraphrase(text: str, journal_name: str = "") -> dict:
+async def paraphrase(text: str, journal_data: dict = None) -> dict:
+    journal_name = _journal_label(journal_data)
     try:
-        prompt_template = _get_prompt(journal_name, "paraphrase", DEFAULT_PARAPHRASE_PROMPT)
-        prompt = _safe_format(prompt_template, text=text)
+        prompt, schema = _paraphrase_prompt(text, journal_data)
         # #region agent log
         try:
             with open(r'c:\Users\khw95\OneDrive\문서\paper_assistance\paragraph-reviewer\.cursor\debug.log', 'a', encoding='utf-8') as f:
                 import json, time
-                f.write(json.dumps({"sessionId": "debug-session", "runId": "run1", "hypothesisId": "P1", "location": "nodes.py:66", "message": "paraphrase entry", "data": {"journal_name": journal_name, "text_length": len(text), "prompt_length": len(prompt), "has_text_placeholder": "{text}" in prompt_template or "{{text}}" in prompt_template}, "timestamp": time.time() * 1000}) + '\n')
+                f.write(json.dumps({"sessionId": "debug-session", "runId": "run1", "hypothesisId": "P1", "location": "nodes.py:66", "message": "paraphrase entry", "data": {"journal_name": journal_name, "text_length": len(text), "prompt_length": len(prompt), "has_text_placeholder": text in prompt}, "timestamp": time.time() * 1000}) + '\n')
         except: pass
         # #endregion
-        result = await ask_gemini(prompt)
+        result = await _ask_streaming(prompt, "paraphrase", ("styles",), schema=schema, accept=_confident("paraphrase"))
         styles = result.get("styles", [])
         # #region agent log
         try:
@@ -94,15 +417,66 @@ async def paraphrase(text: str, journal_name: str = "") -> dict:
         return {"section": None, "styles": []}
 
 
+def _finalize_claim(result, text: str, found: list) -> dict:
+    """주장 체크 응답의 필수 필드 검증 및 claim fallback 추출"""
+    if not isinstance(result, dict):
+        logger.warning(f"주장 체크 결과가 딕셔너리가 아닙니다: {type(result)}, result={result}")
+        result = {}
+    
+    # 필수 필드 검증 및 기본값 설정
+    if "claim" not in result:
+        logger.warning("주장 체크 결과에 'claim' 필드가 없습니다.")
+        result["claim"] = ""
+    if "score" not in result:
+        logger.warning("주장 체크 결과에 'score' 필드가 없습니다.")
+        result["score"] = 0
+    if "issues" not in result or not isinstance(result.get("issues"), list):
+        logger.warning("주장 체크 결과에 'issues' 필드가 없거나 리스트가 아닙니다.")
+        result["issues"] = []
+    if "suggestions" not in result or not isinstance(result.get("suggestions"), list):
+        logger.warning("주장 체크 결과에 'suggestions' 필드가 없거나 리스트가 아닙니다.")
+        result["suggestions"] = []
+    if "section" not in result:
+        logger.warning("주장 체크 결과에 'section' 필드가 없습니다.")
+        result["section"] = None
+    
+    # claim이 비어있을 때 fallback 로직
+    claim_text = result.get("claim", "").strip()
+    if not claim_text:
+        logger.warning("주장 체크 결과의 'claim' 필드가 비어있습니다. 원문에서 fallback 추출 시도.")
+        # 원문에서 첫 문장 추출 시도
+        import re
+        # 문장 끝 구분자로 분리 (., !, ?)
+        sentences = re.split(r'[.!?]+\s+', text.strip())
+        if sentences and sentences[0]:
+            # 첫 문장을 claim으로 사용 (최대 200자)
+            fallback_claim = sentences[0].strip()
+            if len(fallback_claim) > 200:
+                fallback_claim = fallback_claim[:197] + "..."
+            result["claim"] = fallback_claim
+            logger.info(f"Fallback claim 추출: {fallback_claim[:50]}...")
+        else:
+            # 문장 분리가 안되면 원문의 처음 200자를 사용
+            fallback_claim = text.strip()[:200]
+            if len(text.strip()) > 200:
+                fallback_claim += "..."
+            result["claim"] = fallback_claim
+            logger.info(f"Fallback claim (원문 일부): {fallback_claim[:50]}...")
+    
+    result["found_overstatements"] = found
+    return result
+
+
 # ========== 2. 주장 체크 (한국어) ==========
-async def check_claim(text: str, journal_name: str = "") -> dict:
+async def check_claim(text: str, journal_data: dict = None) -> dict:
+    journal_name = _journal_label(journal_data)
     found = [w for w in OVERSTATEMENT_WORDS if w.lower() in text.lower()]
 
     try:
-        prompt_template = _get_prompt(journal_name, "claim_check", DEFAULT_CLAIM_CHECK_PROMPT)
-        prompt = _safe_format(prompt_template, text=text)
+        prompt, schema = _claim_prompt(text, journal_data)
         logger.debug(f"주장 체크 프롬프트 전송: journal_name={journal_name}, text_length={len(text)}")
-        result = await ask_gemini(prompt)
+        result = await ask_gemini(prompt, node="claim", schema=schema, accept=_confident("claim"))
+        result = _restore_keys(result, "claim")
         
         # JSON 파싱 실패 에러 확인
         if isinstance(result, dict) and result.get("error") == "parse_failed":
@@ -113,51 +487,7 @@ async def check_claim(text: str, journal_name: str = "") -> dict:
             # JSON 파싱 실패 시 빈 결과로 처리하고 fallback 로직으로 진행
             result = {}
         
-        if not isinstance(result, dict):
-            logger.warning(f"주장 체크 결과가 딕셔너리가 아닙니다: {type(result)}, result={result}")
-            result = {}
-        
-        # 필수 필드 검증 및 기본값 설정
-        if "claim" not in result:
-            logger.warning("주장 체크 결과에 'claim' 필드가 없습니다.")
-            result["claim"] = ""
-        if "score" not in result:
-            logger.warning("주장 체크 결과에 'score' 필드가 없습니다.")
-            result["score"] = 0
-        if "issues" not in result or not isinstance(result.get("issues"), list):
-            logger.warning("주장 체크 결과에 'issues' 필드가 없거나 리스트가 아닙니다.")
-            result["issues"] = []
-        if "suggestions" not in result or not isinstance(result.get("suggestions"), list):
-            logger.warning("주장 체크 결과에 'suggestions' 필드가 없거나 리스트가 아닙니다.")
-            result["suggestions"] = []
-        if "section" not in result:
-            logger.warning("주장 체크 결과에 'section' 필드가 없습니다.")
-            result["section"] = None
-        
-        # claim이 비어있을 때 fallback 로직
-        claim_text = result.get("claim", "").strip()
-        if not claim_text:
-            logger.warning("주장 체크 결과의 'claim' 필드가 비어있습니다. 원문에서 fallback 추출 시도.")
-            # 원문에서 첫 문장 추출 시도
-            import re
-            # 문장 끝 구분자로 분리 (., !, ?)
-            sentences = re.split(r'[.!?]+\s+', text.strip())
-            if sentences and sentences[0]:
-                # 첫 문장을 claim으로 사용 (최대 200자)
-                fallback_claim = sentences[0].strip()
-                if len(fallback_claim) > 200:
-                    fallback_claim = fallback_claim[:197] + "..."
-                result["claim"] = fallback_claim
-                logger.info(f"Fallback claim 추출: {fallback_claim[:50]}...")
-            else:
-                # 문장 분리가 안되면 원문의 처음 200자를 사용
-                fallback_claim = text.strip()[:200]
-                if len(text.strip()) > 200:
-                    fallback_claim += "..."
-                result["claim"] = fallback_claim
-                logger.info(f"Fallback claim (원문 일부): {fallback_claim[:50]}...")
-        
-        result["found_overstatements"] = found
+        result = _finalize_claim(result, text, found)
         logger.debug(f"주장 체크 완료: claim={result.get('claim', '')[:50]}..., score={result.get('score', 0)}")
         return result
     except Exception as e:
@@ -196,20 +526,12 @@ async def match_journal(text: str, journal_data: dict) -> dict | None:
         return None
 
     try:
-        prompt_template = _get_prompt(
-            journal_data.get("name", ""),
-            "journal_fit",
-            DEFAULT_JOURNAL_FIT_PROMPT,
-        )
-
-        prompt = _safe_format(
-            prompt_template,
-            text=text,
-            journal_name=journal_data.get("full_name", journal_data.get("name", "")),
-            scope=journal_data.get("aims_scope", ""),
+        prompt, schema = _journal_fit_prompt(text, journal_data)
+        journal = _prefix_journal(journal_data)
+        result = await ask_gemini(
+            prompt, node="journal", journal=journal, schema=schema, accept=_confident("journal")
         )
-
-        result = await ask_gemini(prompt)
+        result = _restore_keys(result, "journal")
         if not isinstance(result, dict):
             logger.warning(f"저널 매칭 결과가 딕셔너리가 아닙니다: {type(result)}")
             return None
@@ -220,51 +542,20 @@ async def match_journal(text: str, journal_data: dict) -> dict | None:
 
 
 # ========== 4. 주장 확장 (한국어) ==========
-async def expand_claim(text: str, claim: str = "", journal_name: str = "") -> list:
+async def expand_claim(text: str, claim: str = "", journal_data: dict = None) -> list:
     """
     주장 확장: claim이 제공되면 사용하여 더 정확한 확장 제안 (quality 향상)
     claim이 없으면 원문에서 직접 추출
     """
+    journal_name = _journal_label(journal_data)
     try:
-        # Hybrid Prompting: Use DEFAULT_EXPANSION_PROMPT (Static Structure) with Dynamic Context (Journal Info)
-        # We explicitly IGNORE the generated 'expansion' prompt from get_journal_prompts because the hybrid one is more robust.
-        prompt_template = DEFAULT_EXPANSION_PROMPT
-        
-        # Get Journal Context
-        target_journal = "General Academic Context"
-        target_scope = "Broad impact and rigorous methodology"
-        
-        if journal_name:
-            journal_data = get_journal(journal_name)
-            if journal_data:
-                target_journal = journal_data.get("full_name", journal_name)
-                target_scope = journal_data.get("aims_scope", "")
-
-        # claim이 제공되면 사용, 없으면 프롬프트에서 원문에서 추출하도록 안내
-        if claim and claim.strip():
-            # claim_section is minimal now because specific prompts are in the template
-            claim_section = f"[핵심 주장]\n{claim}"
-            logger.debug(f"주장 확장: 제공된 claim 사용, claim_length={len(claim)}")
-        else:
-            claim_section = "" # Template handles missing claim by asking to extract it if needed, but our new template assumes claim is passed or context is there.
-            # Actually the new template has {claim_section} placeholder.
-            # If no claim provided, we should ask it to extract.
-            claim_section = "[핵심 주장]\n(입력된 문단에서 핵심 주장을 추출하여 분석의 기반으로 삼으세요)"
-            logger.debug(f"주장 확장: 원문에서 claim 추출")
-        
-        # claim_section이 있으면 claim으로도 사용 가능하도록 전달
-        format_kwargs = {
-            "text": text, 
-            "claim_section": claim_section,
-            "journal_name": target_journal,
-            "aims_scope": target_scope
-        }
-        if claim and claim.strip():
-            format_kwargs["claim"] = claim
-            
-        prompt = _safe_format(prompt_template, **format_kwargs)
+        prompt, schema = _expansion_prompt(text, claim, journal_data)
         logger.debug(f"주장 확장 프롬프트 전송: journal_name={journal_name}, text_length={len(text)}, has_claim={bool(claim)}")
-        result = await ask_gemini(prompt)
+        journal = _prefix_journal(journal_data)
+        result = await ask_gemini(
+            prompt, node="expand", journal=journal, schema=schema, accept=_confident("expand")
+        )
+        result = _restore_keys(result, "expand")
         
         if not isinstance(result, dict):
             logger.warning(f"주장 확장 결과가 딕셔너리가 아닙니다: {type(result)}, result={result}")
@@ -318,12 +609,13 @@ async def expand_claim(text: str, claim: str = "", journal_name: str = "") -> li
 
 
 # ========== 5. 리뷰어 질문 (한국어) ==========
-async def generate_reviewer_questions(text: str, journal_name: str = "") -> dict:
+async def generate_reviewer_questions(text: str, journal_data: dict = None) -> dict:
+    journal_name = _journal_label(journal_data)
     try:
-        prompt_template = _get_prompt(journal_name, "reviewer", DEFAULT_REVIEWER_PROMPT)
-        prompt = _safe_format(prompt_template, text=text)
+        prompt, schema = _reviewer_prompt(text, journal_data)
         logger.debug(f"리뷰어 질문 프롬프트 전송: journal_name={journal_name}, text_length={len(text)}")
-        result = await ask_gemini(prompt)
+        result = await ask_gemini(prompt, node="reviewer", schema=schema, accept=_confident("reviewer"))
+        result = _restore_keys(result, "reviewer")
         
         if not isinstance(result, dict):
             logger.warning(f"리뷰어 질문 결과가 딕셔너리가 아닙니다: {type(result)}, result={result}")
@@ -350,24 +642,15 @@ async def generate_reviewer_questions(text: str, journal_name: str = "") -> dict
 
 
 # ========== 6. 선행연구 비교 분석 (한국어) ==========
-async def analyze_prior_work(text: str, references: list, journal_name: str = "") -> dict:
+async def analyze_prior_work(text: str, references: list, journal_data: dict = None) -> dict:
     """참고문헌 검색 결과를 활용해 선행연구와의 겹침/차별점을 분석"""
     if not references:
         return {}
 
     try:
-        # 상위 5개까지만 사용
-        top_refs = references[:5]
-        prior_works = []
-        for r in top_refs:
-            prior_works.append(
-                f"- {r.get('title', '')} ({r.get('year', '')}) | {r.get('venue', '')} | DOI: {r.get('doi', 'N/A')}"
-            )
-
-        prior_text = "\n".join(prior_works)
-        prompt_template = _get_prompt(journal_name, "prior_work", DEFAULT_PRIOR_WORK_PROMPT)
-        prompt = _safe_format(prompt_template, text=text, prior_works=prior_text)
-        result = await ask_gemini(prompt)
+        prompt, schema = _prior_work_prompt(text, references, journal_data)
+        result = await ask_gemini(prompt, node="prior_work", schema=schema, accept=_confident("prior_work"))
+        result = _restore_keys(result, "prior_work")
         return result or {}
     except Exception as e:
         logger.error(f"선행연구 분석 오류: {e}")
@@ -381,18 +664,39 @@ async def find_references(text: str) -> list:
         return []
 
     try:
-        query_result = await ask_gemini(SEARCH_QUERY_PROMPT.format(text=text))
-        query = query_result.get("query", "")
-
-        if not query:
+        queries = await _reference_queries(text, settings)
+        if not queries:
             return []
 
-        return await search_papers(query)
+        return await search_papers(queries)
     except Exception as e:
         logger.error(f"참고문헌 검색 오류: {e}")
         return []
 
 
+async def _reference_queries(text: str, settings: dict) -> list:
+    """
+    검색어 생성: 기본은 로컬 키워드 추출 (네트워크 왕복 없음), 변형 여러 개를 동시에 검색
+    reference_query_mode="llm"이면 Gemini가 만든 영어 검색어를 맨 앞에 두고, 실패하면 로컬 추출만 사용
+    """
+    max_words = settings.get("reference_query_max_words", 6)
+    count = max(1, settings.get("reference_query_variants", 3))
+    queries = keyword_variants(text, max_words, count)
+    if settings.get("reference_query_mode", "local") == "llm":
+        try:
+            query_result = await ask_gemini(
+                SEARCH_QUERY_PROMPT.format(text=text),
+                node="search_query",
+                schema=RESPONSE_SCHEMAS["search_query"],
+            )
+            query = query_result.get("query", "")
+            if query:
+                queries = [query] + queries[: count - 1]
+        except Exception as e:
+            logger.warning(f"LLM 검색어 생성 실패, 로컬 추출 사용: {e}")
+    return queries
+
+
 # ========== 7. 모호성 체크 (로컬, LLM 미사용) ==========
 def detect_vague(text: str) -> list:
     found = []
@@ -446,9 +750,9 @@ async def translate_to_korean(text: str) -> str:
     
     # 영어인 경우에만 번역 실행
     try:
-        prompt = _safe_format(DEFAULT_TRANSLATION_PROMPT, text=text)
+        prompt = _translation_prompt(text)
         logger.debug(f"번역 프롬프트 전송: text_length={len(text)}")
-        result = await ask_gemini(prompt)
+        result = await ask_gemini(prompt, node="translation", schema=RESPONSE_SCHEMAS["translation"])
         translation = result.get("translation", "")
         if not translation:
             logger.warning("번역 결과가 비어있습니다. result={result}")
@@ -458,3 +762,220 @@ async def translate_to_korean(text: str) -> str:
     except Exception as e:
         logger.error(f"번역 오류: {e}", exc_info=True)
         return ""
+
+
+# ========== 9. 빠른 모드 (통합 요청) ==========
+def _fused_prompt(text: str, journal_data: dict = None, translate: bool = True) -> str:
+    journal_task = journal_schema = ""
+    if journal_data:
+        journal_task = FUSED_JOURNAL_TASK
+        journal_schema = FUSED_JOURNAL_SCHEMA
+
+    def _render(journal_context: str) -> str:
+        return FUSED_ANALYSIS_PROMPT.format(
+            text=text,
+            journal_context=journal_context,
+            journal_task=journal_task,
+            journal_schema=journal_schema,
+            translation_task=FUSED_TRANSLATION_TASK if translate else "",
+            translation_schema=FUSED_TRANSLATION_SCHEMA if translate else "",
+        )
+
+    if not journal_data:
+        return _render("")
+    journal_name = journal_data.get("full_name", journal_data.get("name", ""))
+
+    def _render_scope(scope: str) -> str:
+        return _render(FUSED_JOURNAL_CONTEXT.format(journal_name=journal_name, scope=scope))
+
+    return _render_scope(**_fit_budget("fused", _render_scope, [("scope", _scope(journal_data))]))
+
+
+def _fused_schema(with_journal: bool, translate: bool) -> dict:
+    """통합 분석 응답 스키마 (저널 적합도/번역은 요청한 경우에만 포함)"""
+    schema = RESPONSE_SCHEMAS["fused"]
+    extra = {}
+    if with_journal:
+        extra["journal_fit"] = RESPONSE_SCHEMAS["fused_journal_fit"]
+    if translate:
+        extra["translation"] = RESPONSE_SCHEMAS["fused_translation"]
+    if not extra:
+        return schema
+    return {
+        **schema,
+        "properties": {**schema["properties"], **extra},
+        "required": schema["required"] + list(extra),
+    }
+
+
+async def fused_analysis(text: str, journal_data: dict = None) -> dict:
+    """
+    패러프레이징/주장 체크/리뷰어 질문/번역(/저널 적합도)을 한 번의 Gemini 요청으로 처리
+    응답을 기존 State 키(paraphrases, claim, reviewer_qs, translation, ...)로 나눠 반환
+    저널 맞춤 프롬프트 대신 저널명과 Aims & Scope만 컨텍스트로 사용 (속도 우선)
+    """
+    found = [w for w in OVERSTATEMENT_WORDS if w.lower() in text.lower()]
+    lang = detect_language(text)
+    translate = lang == "english"
+
+    try:
+        prompt = _fused_prompt(text, journal_data, translate)
+        logger.debug(f"통합 분석 프롬프트 전송: text_length={len(text)}, has_journal={bool(journal_data)}")
+        result = await ask_gemini(
+            prompt,
+            node="fused",
+            journal=_prefix_journal(journal_data),
+            schema=_fused_schema(bool(journal_data), translate),
+            accept=_fused_confident,
+        )
+        if result.get("error") == "parse_failed":
+            logger.error(f"통합 분석 JSON 파싱 실패: {result.get('error_detail', '')}")
+            result = {}
+    except Exception as e:
+        logger.error(f"통합 분석 오류: {e}", exc_info=True)
+        result = {"error": str(e)}
+
+    section = result.get("section")
+
+    paraphrase_data = result.get("paraphrase") if isinstance(result.get("paraphrase"), dict) else {}
+    styles = paraphrase_data.get("styles", [])
+    if not isinstance(styles, list):
+        styles = []
+
+    claim = result.get("claim_check") if isinstance(result.get("claim_check"), dict) else {}
+    claim.setdefault("section", section)
+    claim = _finalize_claim(claim, text, found)
+    if result.get("error") and result["error"] != "parse_failed":
+        claim["error"] = result["error"]
+
+    reviewer = result.get("reviewer") if isinstance(result.get("reviewer"), dict) else {}
+    questions = reviewer.get("questions", [])
+    if not isinstance(questions, list):
+        questions = []
+
+    update = {
+        "paraphrases": {"section": section, "styles": styles},
+        "claim": claim,
+        "claim_section": claim.get("section"),
+        "reviewer_qs": questions,
+        "reviewer_section": section,
+        "positive_feedback": reviewer.get("positive_feedback") or None,
+        "journal_match": None,
+    }
+
+    if journal_data:
+        journal_fit = result.get("journal_fit")
+        if isinstance(journal_fit, dict):
+            journal_fit.setdefault("section", section)
+            update["journal_match"] = journal_fit
+
+    if lang == "korean":
+        update["translation"] = None
+        update["translation_skipped_korean"] = True
+    else:
+        translation = result.get("translation") if translate else ""
+        if translation:
+            update["translation"] = translation
+        else:
+            update["translation"] = None
+            update["translation_error"] = True
+
+    logger.debug(f"통합 분석 완료: styles={len(styles)}, questions={len(questions)}")
+    return update
+
+# ========== 응답 캐시 예열 (히스토리 기반) ==========
+# 캐시 예열에 쓰는 최근 히스토리 수 (히스토리 전체를 풀지 않도록)
+WARM_CACHE_HISTORY_ITEMS = 30
+
+
+def warm_cache_from_history(history: list = None) -> int:
+    """
+    저장된 분석 결과로 Gemini 응답 캐시를 예열
+    히스토리 result(State)에는 원문 전체와 저널명이 있으므로 노드별 프롬프트를 재구성하여
+    응답 형태로 되돌릴 수 있는 결과만 등록 (기존 캐시 항목은 덮어쓰지 않음)
+    """
+    if not get_settings().get("llm_cache_enabled", True):
+        return 0
+    if history is None:
+        history = get_history(limit=WARM_CACHE_HISTORY_ITEMS)
+
+    warmed = 0
+    for item in history:
+        result = item.get("result") if isinstance(item, dict) else None
+        if not isinstance(result, dict) or not result.get("text"):
+            continue
+        text = result["text"]
+        journal_name = result.get("journal_name") or ""
+        # 새 분석과 같은 프롬프트가 나오도록 현재 저장된 저널로 재구성 (항목당 한 번만 로드)
+        journal_data = get_journal(journal_name) if journal_name else None
+        # 저널이 삭제/변경되었으면 프롬프트를 재현할 수 없으므로 건너뜀
+        if journal_name and not journal_prompts(journal_data):
+            continue
+
+        entries = []  # (노드, (프롬프트, 응답 스키마), 응답, 프리픽스 캐시용 저널)
+        paraphrases = result.get("paraphrases")
+        if isinstance(paraphrases, dict) and paraphrases.get("styles"):
+            entries.append(("paraphrase", _paraphrase_prompt(text, journal_data), paraphrases, None))
+
+        claim = result.get("claim")
+        if isinstance(claim, dict) and not claim.get("error") and (claim.get("issues") or claim.get("suggestions")):
+            raw_claim = {k: v for k, v in claim.items() if k != "found_overstatements"}
+            entries.append(("claim", _claim_prompt(text, journal_data), raw_claim, None))
+
+        journal_match = result.get("journal_match")
+        if journal_data and isinstance(journal_match, dict) and "error" not in journal_match:
+            entries.append((
+                "journal",
+                _journal_fit_prompt(text, journal_data),
+                journal_match,
+                _prefix_journal(journal_data),
+            ))
+
+        expansions = result.get("expansions")
+        if isinstance(claim, dict) and isinstance(expansions, list) and expansions:
+            section = expansions[0].get("section") if isinstance(expansions[0], dict) else None
+            directions = [
+                {k: v for k, v in d.items() if k != "section"} for d in expansions if isinstance(d, dict)
+            ]
+            entries.append((
+                "expand",
+                _expansion_prompt(text, claim.get("claim", ""), journal_data),
+                {"section": section, "directions": directions},
+                _prefix_journal(journal_data),
+            ))
+
+        if result.get("reviewer_qs"):
+            entries.append((
+                "reviewer",
+                _reviewer_prompt(text, journal_data),
+                {
+                    "section": result.get("reviewer_section"),
+                    "questions": result["reviewer_qs"],
+                    "positive_feedback": result.get("positive_feedback") or "",
+                },
+                None,
+            ))
+
+        references = result.get("references")
+        prior_work = result.get("prior_work_analysis")
+        if references and isinstance(prior_work, dict) and prior_work and "error" not in prior_work:
+            entries.append(("prior_work", _prior_work_prompt(text, references, journal_data), prior_work, None))
+
+        if result.get("translation"):
+            entries.append((
+                "translation",
+                (_translation_prompt(text), RESPONSE_SCHEMAS["translation"]),
+                {"translation": result["translation"]},
+                None,
+            ))
+
+        for node, (prompt, schema), response, journal in entries:
+            try:
+                cache_response(prompt, response, overwrite=False, journal=journal, node=node, schema=schema)
+                warmed += 1
+            except Exception as e:
+                logger.warning(f"캐시 예열 실패: {e}")
+                return warmed
+
+    logger.debug(f"히스토리 기반 캐시 예열: {warmed}개 항목")
+    return warmed
@@ -2,10 +2,9 @@
 저널 Aims & Scope 기반 맞춤 프롬프트 자동 생성기
 """
 import re
-from services import ask_gemini
-from prompts import GENERATE_JOURNAL_PROMPTS
+from services import ask_gemini, invalidate_prefix_cache
+from prompts import GENERATE_JOURNAL_PROMPTS, RESPONSE_SCHEMAS
 from storage import save_journal, get_journal
-from config import GEMINI_MODEL
 
 
 def _normalize_placeholder(text: str) -> str:
@@ -92,11 +91,9 @@ async def generate_journal_prompts(
         custom_methodology=custom_methodology
     )
     
-    # 2. Gemini 호출 (gemini-2.5-pro 사용 권장)
+    # 2. Gemini 호출 (설정 model_routes의 register_journal 등급, 기본 pro)
     try:
-        # 모델은 config의 GEMINI_MODEL 사용 (보통 gemini-2.0-flash-exp 등)
-        # 하지만 품질이 중요하다면 2.5-pro 명시 가능하나, 여기서는 기본 설정 따름
-        result = await ask_gemini(prompt)
+        result = await ask_gemini(prompt, node="register_journal", schema=RESPONSE_SCHEMAS["register_journal"])
         
         # 필수 필드 검증
         if not result or "prompts" not in result or not result["prompts"]:
@@ -207,6 +204,9 @@ async def register_journal(
     except Exception as e:
         print(f"저널 저장 실패: {name}, 오류: {e}")
         raise Exception(f"저널 저장 중 오류 발생: {str(e)}")
+
+    # 저널 프로필이 바뀌었으므로 이전 프로필로 만든 프리픽스 캐시 폐기
+    await invalidate_prefix_cache(name)
     
     return journal_data
 
@@ -215,8 +215,11 @@ def get_journal_prompts(journal_name: str) -> dict | None:
     """저장된 저널의 맞춤 프롬프트 가져오기"""
     if not journal_name:
         return None
-    
-    journal = get_journal(journal_name)
+    return journal_prompts(get_journal(journal_name))
+
+
+def journal_prompts(journal: dict | None) -> dict | None:
+    """이미 읽어 둔 저널 데이터에서 맞춤 프롬프트 꺼내기 (없거나 비었으면 None)"""
     if journal and "prompts" in journal:
         prompts = journal["prompts"]
         if isinstance(prompts, dict) and len(prompts) > 0:
@@ -89,7 +89,7 @@ First, determine which section of an academic paper this paragraph belongs to. P
 5. **Concise**: 30% shorter, key points only.
 
 Output JSON only:
-{{"section": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "styles": [{{"name": "Assertive", "text": "...", "translation": "Korean translation of the rewritten text"}}, {{"name": "Objective", "text": "...", "translation": "..."}}, {{"name": "Connective", "text": "...", "translation": "..."}}, {{"name": "Hedged", "text": "...", "translation": "..."}}, {{"name": "Concise", "text": "...", "translation": "..."}}]}}"""
+{output_schema}"""
 
 
 DEFAULT_CLAIM_CHECK_PROMPT = """당신은 IEEE/ACM 등 주요 공학 저널의 경험이 풍부한 심사위원입니다. 다음 문단을 엄격하게 분석하세요.
@@ -127,7 +127,7 @@ DEFAULT_CLAIM_CHECK_PROMPT = """당신은 IEEE/ACM 등 주요 공학 저널의 
 
 [출력 형식]
 반드시 다음 JSON 형식으로 출력 (claim 필드는 필수이며 반드시 영어로 작성된 1문장이어야 함):
-{{"section": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "claim": "핵심 주장 1문장 (영어, 필수, 절대 비어있을 수 없음)", "score": 0, "issues": ["구체적 문제점1 (한국어)", "구체적 문제점2 (한국어)"], "suggestions": ["구체적 수정 제안1 (한국어)", "구체적 수정 제안2 (한국어)"]}}
+{output_schema}
 
 **주의**: claim 필드가 비어있으면 출력이 유효하지 않습니다. 반드시 문단의 핵심 주장을 영어로 1문장으로 추출하여 제공하세요."""
 
@@ -163,7 +163,7 @@ Aims & Scope: {scope}
 
 [출력 형식]
 반드시 다음 JSON 형식으로 출력하세요:
-{{"section": "...", "score": 8, "matches": ["구체적 일치점1 (한국어)", "구체적 일치점2 (한국어)"], "gaps": ["보완점1 (한국어)", "보완점2 (한국어)"], "revised": "저널 스타일에 완벽히 맞춘 수정본 (한국어)", "revised_en": "Revised paragraph in English (highly polished, journal-ready)"}}"""
+{output_schema}"""
 
 
 DEFAULT_EXPANSION_PROMPT = """당신은 세계적인 석학이자 연구 전략 컨설턴트입니다. 이 문단의 주장을 훨씬 더 강력하고 파급력 있게 확장할 수 있는 'Next Level' 연구 방향을 제안하세요.
@@ -206,7 +206,7 @@ Focus: {aims_scope}
 
 [출력 형식]
 반드시 다음 JSON 형식으로 출력하세요:
-{{"section": "...", "directions": [{{"type": "...", "claim": "High-level academic English claim", "pro": "...", "con": "...", "reason": "...", "experiments": ["..."]}}, ...]}}"""
+{output_schema}"""
 
 
 DEFAULT_REVIEWER_PROMPT = """당신은 IEEE/ACM 등 주요 공학 저널의 경험이 풍부한 리뷰어입니다. 다음 문단을 검토하고 저자에게 할 핵심 질문 3-5개와 긍정적인 칭찬 1개를 생성하세요.
@@ -251,7 +251,7 @@ DEFAULT_REVIEWER_PROMPT = """당신은 IEEE/ACM 등 주요 공학 저널의 경
 
 [출력 형식]
 반드시 다음 JSON 형식으로 출력 (모든 텍스트는 한국어):
-{{"section": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "questions": [{{"q": "구체적이고 실행 가능한 질문 (한국어)", "severity": "critical|major|minor", "reason": "이 severity를 선택한 구체적 이유 (한국어)"}}, ...], "positive_feedback": "긍정적인 칭찬 1개 (한국어, 잘된 점, 강점, 혁신적인 부분 등을 구체적으로 언급)"}}"""
+{output_schema}"""
 
 
 DEFAULT_PRIOR_WORK_PROMPT = """당신은 공학 논문 심사위원으로서 선행연구와의 비교 분석을 수행합니다. 다음 문단과 관련 선행연구를 비교하여 겹침, 개선점, 차별화 전략을 도출하세요.
@@ -279,9 +279,7 @@ DEFAULT_PRIOR_WORK_PROMPT = """당신은 공학 논문 심사위원으로서 선
 
 [출력 형식]
 JSON 형식으로만 출력:
-{{"overlaps": [{{"aspect": "겹치는 부분 (예: 방법론, 실험 설계 등)", "prior_work": "관련 선행연구 (저자명 또는 제목)", "detail": "어떻게 겹치는지, 왜 문제인지 상세 설명"}}],
-  "improvements": [{{"aspect": "개선점 (예: 정확도 향상, 계산 복잡도 감소 등)", "prior_work": "비교 대상 선행연구", "detail": "왜 나은지, 정량적/정성적 근거 포함"}}],
-  "differentiation": ["실행 가능한 차별화 전략1", "실행 가능한 차별화 전략2"]}}"""
+{output_schema}"""
 
 
 SEARCH_QUERY_PROMPT = """Extract 3-5 English keywords for academic paper search from this paragraph.
@@ -312,6 +310,191 @@ JSON 형식으로만 출력 (마크다운 코드블록 없이):
 {{"translation": "번역된 한국어 문단"}}"""
 
 
+# ============================================================
+# 📦 출력 스키마 (기본 프롬프트의 {output_schema} 자리)
+# ============================================================
+# full: 기존 키 그대로, compact: 짧은 키 (출력 토큰 절감, keys로 원래 키 복원)
+OUTPUT_SCHEMAS = {
+    "paraphrase": {
+        "full": '{{"section": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "styles": [{{"name": "Assertive", "text": "...", "translation": "Korean translation of the rewritten text"}}, {{"name": "Objective", "text": "...", "translation": "..."}}, {{"name": "Connective", "text": "...", "translation": "..."}}, {{"name": "Hedged", "text": "...", "translation": "..."}}, {{"name": "Concise", "text": "...", "translation": "..."}}]}}',
+        "compact": """{{"sec": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "s": [{{"n": "Assertive", "t": "...", "tr": "Korean translation of the rewritten text"}}, {{"n": "Objective", "t": "...", "tr": "..."}}, {{"n": "Connective", "t": "...", "tr": "..."}}, {{"n": "Hedged", "t": "...", "tr": "..."}}, {{"n": "Concise", "t": "...", "tr": "..."}}]}}
+(키: sec=section, s=styles, n=name, t=text, tr=translation)""",
+        "keys": {"sec": "section", "s": "styles", "n": "name", "t": "text", "tr": "translation"},
+    },
+    "claim": {
+        "full": '{{"section": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "claim": "핵심 주장 1문장 (영어, 필수, 절대 비어있을 수 없음)", "score": 0, "issues": ["구체적 문제점1 (한국어)", "구체적 문제점2 (한국어)"], "suggestions": ["구체적 수정 제안1 (한국어)", "구체적 수정 제안2 (한국어)"]}}',
+        "compact": """{{"sec": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "c": "핵심 주장 1문장 (영어, 필수, 절대 비어있을 수 없음)", "sc": 0, "is": ["구체적 문제점1 (한국어)", "구체적 문제점2 (한국어)"], "sg": ["구체적 수정 제안1 (한국어)", "구체적 수정 제안2 (한국어)"]}}
+(키: sec=section, c=claim, sc=score, is=issues, sg=suggestions)""",
+        "keys": {"sec": "section", "c": "claim", "sc": "score", "is": "issues", "sg": "suggestions"},
+    },
+    "journal": {
+        "full": '{{"section": "...", "score": 8, "matches": ["구체적 일치점1 (한국어)", "구체적 일치점2 (한국어)"], "gaps": ["보완점1 (한국어)", "보완점2 (한국어)"], "revised": "저널 스타일에 완벽히 맞춘 수정본 (한국어)", "revised_en": "Revised paragraph in English (highly polished, journal-ready)"}}',
+        "compact": """{{"sec": "...", "sc": 8, "m": ["구체적 일치점1 (한국어)", "구체적 일치점2 (한국어)"], "g": ["보완점1 (한국어)", "보완점2 (한국어)"], "rv": "저널 스타일에 완벽히 맞춘 수정본 (한국어)", "re": "Revised paragraph in English (highly polished, journal-ready)"}}
+(키: sec=section, sc=score, m=matches, g=gaps, rv=revised, re=revised_en)""",
+        "keys": {"sec": "section", "sc": "score", "m": "matches", "g": "gaps", "rv": "revised", "re": "revised_en"},
+    },
+    "expand": {
+        "full": '{{"section": "...", "directions": [{{"type": "...", "claim": "High-level academic English claim", "pro": "...", "con": "...", "reason": "...", "experiments": ["..."]}}, ...]}}',
+        "compact": """{{"sec": "...", "d": [{{"ty": "...", "c": "High-level academic English claim", "p": "...", "cn": "...", "r": "...", "x": ["..."]}}, ...]}}
+(키: sec=section, d=directions, ty=type, c=claim, p=pro, cn=con, r=reason, x=experiments)""",
+        "keys": {"sec": "section", "d": "directions", "ty": "type", "c": "claim", "p": "pro", "cn": "con", "r": "reason", "x": "experiments"},
+    },
+    "reviewer": {
+        "full": '{{"section": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "questions": [{{"q": "구체적이고 실행 가능한 질문 (한국어)", "severity": "critical|major|minor", "reason": "이 severity를 선택한 구체적 이유 (한국어)"}}, ...], "positive_feedback": "긍정적인 칭찬 1개 (한국어, 잘된 점, 강점, 혁신적인 부분 등을 구체적으로 언급)"}}',
+        "compact": """{{"sec": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "qs": [{{"q": "구체적이고 실행 가능한 질문 (한국어)", "sv": "critical|major|minor", "r": "이 severity를 선택한 구체적 이유 (한국어)"}}, ...], "pf": "긍정적인 칭찬 1개 (한국어, 잘된 점, 강점, 혁신적인 부분 등을 구체적으로 언급)"}}
+(키: sec=section, qs=questions, sv=severity, r=reason, pf=positive_feedback)""",
+        "keys": {"sec": "section", "qs": "questions", "sv": "severity", "r": "reason", "pf": "positive_feedback"},
+    },
+    "prior_work": {
+        "full": """{{"overlaps": [{{"aspect": "겹치는 부분 (예: 방법론, 실험 설계 등)", "prior_work": "관련 선행연구 (저자명 또는 제목)", "detail": "어떻게 겹치는지, 왜 문제인지 상세 설명"}}],
+  "improvements": [{{"aspect": "개선점 (예: 정확도 향상, 계산 복잡도 감소 등)", "prior_work": "비교 대상 선행연구", "detail": "왜 나은지, 정량적/정성적 근거 포함"}}],
+  "differentiation": ["실행 가능한 차별화 전략1", "실행 가능한 차별화 전략2"]}}""",
+        "compact": """{{"o": [{{"a": "겹치는 부분 (예: 방법론, 실험 설계 등)", "pw": "관련 선행연구 (저자명 또는 제목)", "dt": "어떻게 겹치는지, 왜 문제인지 상세 설명"}}],
+  "i": [{{"a": "개선점 (예: 정확도 향상, 계산 복잡도 감소 등)", "pw": "비교 대상 선행연구", "dt": "왜 나은지, 정량적/정성적 근거 포함"}}],
+  "df": ["실행 가능한 차별화 전략1", "실행 가능한 차별화 전략2"]}}
+(키: o=overlaps, i=improvements, df=differentiation, a=aspect, pw=prior_work, dt=detail)""",
+        "keys": {"o": "overlaps", "i": "improvements", "df": "differentiation", "a": "aspect", "pw": "prior_work", "dt": "detail"},
+    },
+}
+
+
+# ============================================================
+# 📐 응답 스키마 (Gemini structured output, 원래 키 기준)
+# ============================================================
+# compact_schemas가 켜져 있으면 nodes에서 OUTPUT_SCHEMAS의 짧은 키로 바꿔서 전송
+_STR = {"type": "STRING"}
+_INT = {"type": "INTEGER"}
+_STR_LIST = {"type": "ARRAY", "items": _STR}
+_SECTION = {
+    "type": "STRING",
+    "enum": ["Introduction", "Related Work", "Methodology", "Results", "Discussion", "Conclusion", "Abstract"],
+}
+
+
+def _obj(properties: dict, required: list = None) -> dict:
+    return {"type": "OBJECT", "properties": properties, "required": required or list(properties)}
+
+
+def _list_of(item: dict) -> dict:
+    return {"type": "ARRAY", "items": item}
+
+
+_STYLE = _obj({"name": _STR, "text": _STR, "translation": _STR})
+_CLAIM = _obj({"claim": _STR, "score": _INT, "issues": _STR_LIST, "suggestions": _STR_LIST})
+_QUESTION = _obj({"q": _STR, "severity": {"type": "STRING", "enum": ["critical", "major", "minor"]}, "reason": _STR})
+_JOURNAL_FIT = _obj({"score": _INT, "matches": _STR_LIST, "gaps": _STR_LIST, "revised": _STR, "revised_en": _STR})
+_COMPARISON = _obj({"aspect": _STR, "prior_work": _STR, "detail": _STR})
+
+RESPONSE_SCHEMAS = {
+    "paraphrase": _obj({"section": _SECTION, "styles": _list_of(_STYLE)}),
+    "claim": _obj({"section": _SECTION, **_CLAIM["properties"]}),
+    "journal": _obj({"section": _SECTION, **_JOURNAL_FIT["properties"]}),
+    "expand": _obj({
+        "section": _SECTION,
+        "directions": _list_of(_obj({
+            "type": _STR, "claim": _STR, "pro": _STR, "con": _STR, "reason": _STR, "experiments": _STR_LIST,
+        })),
+    }),
+    "reviewer": _obj({"section": _SECTION, "questions": _list_of(_QUESTION), "positive_feedback": _STR}),
+    "prior_work": _obj({
+        "overlaps": _list_of(_COMPARISON),
+        "improvements": _list_of(_COMPARISON),
+        "differentiation": _STR_LIST,
+    }),
+    "search_query": _obj({"query": _STR}),
+    "translation": _obj({"translation": _STR}),
+    "register_journal": _obj({
+        "journal_keywords": _STR_LIST,
+        "target_audience": _STR,
+        "preferred_style": _STR,
+        "prompts": _obj({
+            "paraphrase": _STR, "claim_check": _STR, "journal_fit": _STR, "expansion": _STR, "reviewer": _STR,
+        }),
+        "evaluation_criteria": _STR_LIST,
+    }),
+    # 빠른 모드: journal_fit / translation은 요청할 때만 nodes에서 추가
+    "fused": _obj({
+        "section": _SECTION,
+        "paraphrase": _obj({"styles": _list_of(_STYLE)}),
+        "claim_check": _CLAIM,
+        "reviewer": _obj({"questions": _list_of(_QUESTION), "positive_feedback": _STR}),
+    }),
+    "fused_journal_fit": _JOURNAL_FIT,
+    "fused_translation": _STR,
+}
+
+
+# JSON 파싱/복구에 실패한 노드만 다시 요청할 때 프롬프트 끝에 붙임
+JSON_REASK_SUFFIX = """
+
+[재요청] 이전 응답이 올바른 JSON이 아니었습니다. 설명이나 마크다운 없이, 위 출력 형식에 맞는 완전한 JSON 하나만 출력하세요."""
+
+
+# 프리픽스 캐시 사용 시 {scope} 자리에 들어가는 참조 문구 (Aims & Scope는 캐시된 저널 프로필에 있음)
+JOURNAL_SCOPE_REFERENCE = "(앞에 제공된 [Target Journal Profile]의 Aims & Scope 참고)"
+
+
+# ============================================================
+# ⚡ 빠른 모드 (여러 분석을 한 번의 요청으로 처리)
+# ============================================================
+
+FUSED_ANALYSIS_PROMPT = """당신은 IEEE/ACM 등 주요 공학 저널의 경험이 풍부한 심사위원이자 학술 작문 전문가입니다. 다음 문단 하나에 대해 아래 작업들을 모두 수행하고, 결과를 하나의 JSON으로 출력하세요.
+
+[분석할 문단]
+{text}
+{journal_context}
+[Section 파악]
+먼저 이 문단이 논문의 어느 section에 속하는지 파악하세요. 가능한 section: Introduction, Related Work, Methodology, Results, Discussion, Conclusion, Abstract
+
+[작업 1: 패러프레이징 (영어)]
+문단을 다음 5가지 학술 스타일로 영어로 재작성하고, 각 재작성본의 한국어 번역을 함께 제공하세요.
+1. **Assertive**: Strong claims. "demonstrates", "confirms", "establishes"
+2. **Objective**: Neutral, passive voice. "was observed", "was measured"
+3. **Connective**: Logical flow. "Therefore", "Consequently", "In contrast"
+4. **Hedged**: Cautious. "suggests", "may indicate", "potentially"
+5. **Concise**: 30% shorter, key points only.
+
+[작업 2: 주장 체크]
+- claim: 문단의 핵심 주장 1문장 (반드시 영어, 절대 비어있을 수 없음)
+- score: 과대해석 점수 1-10 (1-3: 적절, 4-6: 약간 과장, 7-10: 심각한 과대해석)
+- issues: 선행연구와의 겹침, 실험/방법론 한계, 논리적 결함 관점의 구체적 문제점 2-3개 (한국어)
+- suggestions: 구체적이고 실행 가능한 수정 제안 2-3개 (한국어)
+
+[작업 3: 리뷰어 질문]
+- questions: 실험 타당성, 비교 대상, 통계적 유의성, 재현 가능성, 선행연구 대비 차별화 관점의 질문 3-5개 (한국어)
+  - severity: critical(게재 불가 수준) | major(수정 가능한 큰 문제) | minor(작은 개선 사항)
+  - reason: 그 severity를 선택한 이유 (한국어)
+- positive_feedback: 잘된 점, 강점을 구체적으로 언급한 긍정적 피드백 1개 (한국어)
+{journal_task}{translation_task}
+[출력 형식]
+반드시 다음 JSON 형식으로만 출력하세요 (마크다운 코드블록 금지):
+{{"section": "Introduction|Related Work|Methodology|Results|Discussion|Conclusion|Abstract", "paraphrase": {{"styles": [{{"name": "Assertive", "text": "...", "translation": "..."}}, {{"name": "Objective", "text": "...", "translation": "..."}}, {{"name": "Connective", "text": "...", "translation": "..."}}, {{"name": "Hedged", "text": "...", "translation": "..."}}, {{"name": "Concise", "text": "...", "translation": "..."}}]}}, "claim_check": {{"claim": "Core claim in one English sentence", "score": 0, "issues": ["..."], "suggestions": ["..."]}}, "reviewer": {{"questions": [{{"q": "...", "severity": "critical|major|minor", "reason": "..."}}], "positive_feedback": "..."}}{journal_schema}{translation_schema}}}"""
+
+FUSED_JOURNAL_CONTEXT = """
+[타겟 저널 정보]
+저널명: {journal_name}
+Aims & Scope: {scope}
+"""
+
+FUSED_JOURNAL_TASK = """
+[작업 4: 저널 적합도]
+- score: 위 저널의 Aims & Scope 대비 적합도 0-10점
+- matches: Aims & Scope의 구체적인 키워드/문장과 일치하는 점 (한국어)
+- gaps: 저널 독자층이 기대하는 수준과 비교해 보완이 필요한 점 (한국어)
+- revised: 저널의 톤앤매너에 맞춘 한국어 수정본
+- revised_en: 저널에 맞춘 영어 수정본 (Formal Academic English)
+"""
+
+FUSED_JOURNAL_SCHEMA = """, "journal_fit": {"score": 0, "matches": ["..."], "gaps": ["..."], "revised": "...", "revised_en": "..."}"""
+
+FUSED_TRANSLATION_TASK = """
+[작업 5: 번역]
+- translation: 원문 전체를 자연스러운 학술 한국어로 번역 (통용되는 번역이 없는 전문 용어는 영어 원문을 괄호로 표기)
+"""
+
+FUSED_TRANSLATION_SCHEMA = ', "translation": "번역된 한국어 문단"'
+
+
 # ============================================================
 # 🗺️ 저널 등록용 Map-Reduce 프롬프트 (High Quality Profile 생성)
 # ============================================================
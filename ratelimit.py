@@ -0,0 +1,336 @@
+"""외부 API 속도 제한 및 동시성 제어 (Gemini / Semantic Scholar 공용)
+
+- TokenBucket: 분당 요청 수(RPM) / 분당 토큰 수(TPM) 제한
+- AdaptiveConcurrency: AIMD 방식 동시 호출 수 조절 (지연시간 증가, 429 응답 시 감소)
+- ProviderLimiter: 위 두 가지를 묶은 제공자별 벌크헤드 (제공자끼리 슬롯을 공유하지 않음)
+- CircuitBreaker: 제공자/엔드포인트별 회로 차단기 (장애 중에는 기다리지 않고 바로 실패)
+"""
+import asyncio
+import contextlib
+import re
+import time
+from collections import defaultdict, deque
+
+
+class RateLimitedError(Exception):
+    """제공자가 429(속도 제한)를 반환함. retry_after는 서버가 알려준 대기 시간(초)"""
+
+    def __init__(self, message: str = "rate limited", retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """회로 차단기가 열려 있어 요청을 보내지 않음. retry_in은 다음 시험 요청까지 남은 시간(초)"""
+
+    def __init__(self, breaker: str, retry_in: float):
+        super().__init__(f"{breaker}: 제공자 일시 사용 불가 ({retry_in:.1f}초 후 재시도)")
+        self.breaker = breaker
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value) -> float | None:
+    """Retry-After 헤더("12", "1.5") 또는 Gemini RetryInfo("23s")를 초 단위로 변환"""
+    if value is None:
+        return None
+    match = re.search(r"(\d+(?:\.\d+)?)", str(value))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """분당 rate_per_minute 만큼 연속적으로 채워지는 버킷 (0 이하면 무제한)"""
+
+    def __init__(self, rate_per_minute: float = 0):
+        self.rate_per_minute = 0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+        self.configure(rate_per_minute)
+
+    def configure(self, rate_per_minute: float):
+        rate_per_minute = max(0, rate_per_minute or 0)
+        if rate_per_minute != self.rate_per_minute:
+            self.rate_per_minute = rate_per_minute
+            self.tokens = float(rate_per_minute)
+            self.updated = time.monotonic()
+
+    def _get_lock(self) -> asyncio.Lock:
+        # 실행 중인 이벤트 루프마다 새로 만듦 (benchmark/테스트가 asyncio.run을 여러 번 호출해도 이전 루프에 묶이지 않음)
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock, self._loop = asyncio.Lock(), loop
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            float(self.rate_per_minute),
+            self.tokens + (now - self.updated) * self.rate_per_minute / 60.0,
+        )
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """amount 만큼 소비할 수 있을 때까지 대기, 대기한 시간(초) 반환"""
+        if self.rate_per_minute <= 0 or amount <= 0:
+            return 0.0
+        amount = min(amount, self.rate_per_minute)
+        waited = 0.0
+        async with self._get_lock():
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) * 60.0 / self.rate_per_minute
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def adjust(self, amount: float):
+        """예상치와 실제 사용량의 차이 보정 (양수면 추가 소비, 음수면 환불)"""
+        if self.rate_per_minute <= 0:
+            return
+        self._refill()
+        self.tokens = min(float(self.rate_per_minute), self.tokens - amount)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 동시성 제한
+    - 성공(지연시간 정상): limit += 1/limit (가산 증가)
+    - 지연시간이 같은 종류(key, 예: 노드) 요청 평균의 2배 초과: limit *= 0.9
+      (짧은 키워드 요청과 긴 생성 요청을 한 평균으로 비교하지 않음)
+    - 429 응답: limit *= 0.5 (승산 감소)
+    """
+
+    def __init__(self, max_limit: int = 8, min_limit: int = 1):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.latency_avg = {}  # key → 지수 이동 평균 지연시간
+        self.samples = defaultdict(int)
+        self._cond = None
+        self._loop = None
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            # TokenBucket과 같이 루프마다 새로 만듦, 이전 루프에서 잡힌 슬롯은 그 루프와 함께 사라졌으므로 다시 셈
+            self._cond, self._loop = asyncio.Condition(), loop
+            self.in_flight = 0
+        return self._cond
+
+    def configure(self, max_limit: int):
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = min(self.limit, float(self.max_limit))
+
+    async def acquire(self):
+        cond = self._condition()
+        async with cond:
+            while self.in_flight >= max(self.min_limit, int(self.limit)):
+                await cond.wait()
+            self.in_flight += 1
+
+    async def release(self):
+        cond = self._condition()
+        async with cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            cond.notify_all()
+
+    def on_success(self, latency: float, key: str = "default"):
+        self.samples[key] += 1
+        avg = self.latency_avg.setdefault(key, latency)
+        slow = self.samples[key] >= 5 and latency > avg * 2
+        self.latency_avg[key] = avg * 0.8 + latency * 0.2
+        if slow:
+            self.limit = max(float(self.min_limit), self.limit * 0.9)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+
+    def on_throttle(self):
+        self.limit = max(float(self.min_limit), self.limit * 0.5)
+
+
+class ProviderLimiter:
+    """제공자 하나의 RPM/TPM 버킷 + 적응형 동시성 + Retry-After 일시정지"""
+
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, max_concurrency: int = 8):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def configure(self, rpm: float = 0, tpm: float = 0, max_concurrency: int = 8):
+        self.requests.configure(rpm)
+        self.tokens.configure(tpm)
+        self.concurrency.configure(max_concurrency)
+
+    async def _wait_pause(self):
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            self.wait_seconds += delay
+            await asyncio.sleep(delay)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tokens: float = 0, key: str = "default"):
+        """
+        요청 1건 실행 구간. 429는 RateLimitedError로 알려주면 동시성 축소 + 일시정지
+        key는 지연시간 평균을 따로 두는 요청 종류 (예: 노드 이름)
+        """
+        await self._wait_pause()
+        self.wait_seconds += await self.requests.acquire(1)
+        self.wait_seconds += await self.tokens.acquire(tokens)
+        await self.concurrency.acquire()
+        start = time.monotonic()
+        try:
+            yield self
+        except RateLimitedError as e:
+            self.throttle(e.retry_after)
+            raise
+        else:
+            self.concurrency.on_success(time.monotonic() - start, key)
+        finally:
+            await self.concurrency.release()
+
+    def throttle(self, retry_after: float | None = None):
+        self.throttled += 1
+        self.concurrency.on_throttle()
+        # Retry-After가 없으면 짧은 기본 대기
+        delay = retry_after if retry_after is not None else 2.0
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    async def run(self, factory, tokens: float = 0, attempts: int = 3, max_wait: float = 30.0, key: str = "default"):
+        """factory()를 슬롯 안에서 실행, 429면 Retry-After만큼 기다렸다가 재시도"""
+        for attempt in range(attempts):
+            try:
+                async with self.slot(tokens, key):
+                    return await factory()
+            except RateLimitedError as e:
+                if attempt == attempts - 1 or (e.retry_after or 0) > max_wait:
+                    raise
+        raise RateLimitedError(f"{self.name}: 재시도 횟수 초과")
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.concurrency.limit, 2),
+            "max_limit": self.concurrency.max_limit,
+            "in_flight": self.concurrency.in_flight,
+            "latency_avg": {key: round(avg, 3) for key, avg in self.concurrency.latency_avg.items()},
+            "throttled": self.throttled,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+class CircuitBreaker:
+    """
+    closed → (최근 window건 중 실패율 ≥ failure_rate, 최소 min_calls건) → open
+    open → (cooldown초 경과) → half_open: 시험 요청 probes건만 통과
+    half_open → 시험 요청 성공 시 closed, 실패 시 다시 open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 4,
+        window: int = 20,
+        cooldown: float = 30.0,
+        probes: int = 1,
+    ):
+        self.name = name
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)  # True = 실패
+        self.opened_at = 0.0
+        self.probing = 0
+        self.rejected = 0
+        self.trips = 0
+        self.configure(failure_rate, min_calls, window, cooldown, probes)
+
+    def configure(self, failure_rate: float, min_calls: int, window: int, cooldown: float, probes: int = 1):
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.cooldown = cooldown
+        self.probes = max(1, probes)
+        if self.outcomes.maxlen != window:
+            self.outcomes = deque(self.outcomes, maxlen=max(1, window))
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def _admit(self):
+        if self.state == self.OPEN:
+            if self.retry_in() > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.retry_in())
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self.probing >= self.probes:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.cooldown)
+            self.probing += 1
+            return True
+        return False
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+    def record(self, failed: bool, probe: bool = False):
+        if probe:
+            self.probing -= 1
+            if failed:
+                self._trip()
+            else:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+            return
+        if self.state != self.CLOSED:
+            return
+        self.outcomes.append(failed)
+        failures = sum(self.outcomes)
+        if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+            self._trip()
+
+    @contextlib.asynccontextmanager
+    async def guard(self, ignore: tuple = ()):
+        """
+        요청 1건 실행 구간. 열려 있으면 CircuitOpenError, 예외가 나면 실패로 기록
+        ignore 예외(잘못된 요청 등 제공자 상태와 무관한 오류)는 성공으로 봄
+        """
+        probe = self._admit()
+        try:
+            yield self
+        except asyncio.CancelledError:
+            # 헤징/마감 시간으로 취소된 요청은 제공자 상태와 무관
+            if probe:
+                self.probing -= 1
+            raise
+        except ignore:
+            self.record(False, probe)
+            raise
+        except Exception:
+            self.record(True, probe)
+            raise
+        else:
+            self.record(False, probe)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failure_rate": round(sum(self.outcomes) / len(self.outcomes), 3) if self.outcomes else 0.0,
+            "calls": len(self.outcomes),
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in": round(self.retry_in(), 1) if self.state == self.OPEN else 0.0,
+        }
@@ -0,0 +1,426 @@
+"""오프라인 참고문헌 색인 (로컬 BibTeX/RIS 라이브러리 + JSONL 메타데이터 덤프)
+
+- SQLite FTS5 역색인 + bm25() 순위 (디스크 파일을 mmap으로 읽어 수백만 건에서도 ms 단위 조회)
+- 파일별 (수정 시각, 크기)를 기록해 바뀐 파일만 다시 색인 (증분 갱신)
+- 검색 결과는 Semantic Scholar 응답(SS_FIELDS)과 같은 모양이라 services에서 API 결과와 함께 합치고 정렬
+
+사용법:
+    python refindex.py build library.bib papers.ris dump.jsonl ...
+    python refindex.py search "defect detection edge devices"
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from config import REFERENCE_INDEX_FILE
+
+INDEX_EXTENSIONS = (".bib", ".ris", ".jsonl")
+_BATCH = 5000
+_MMAP_BYTES = 1 << 30
+_QUERY_TERM = re.compile(r"\w+")
+
+
+# ========== 파서 (레코드 dict를 하나씩 yield) ==========
+# 레코드: title, authors(list), year, venue, doi, abstract, url, citations(None이면 모름), bibtex
+def _clean_bibtex_value(value: str) -> str:
+    value = re.sub(r"[{}]", "", value)
+    return " ".join(value.replace("\\&", "&").split())
+
+
+def _bibtex_fields(body: str) -> dict:
+    """`key = {value}` / `key = "value"` / `key = 123` 목록 파싱 (중첩 중괄호 허용)"""
+    fields = {}
+    i, n = 0, len(body)
+    while i < n:
+        match = re.compile(r"\s*,?\s*([A-Za-z][\w-]*)\s*=\s*").match(body, i)
+        if not match:
+            break
+        name = match.group(1).lower()
+        i = match.end()
+        if i >= n:
+            break
+        if body[i] == "{":
+            depth, start = 0, i
+            while i < n:
+                if body[i] == "{":
+                    depth += 1
+                elif body[i] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            value = body[start + 1:i]
+            i += 1
+        elif body[i] == '"':
+            end = body.find('"', i + 1)
+            end = n if end < 0 else end
+            value = body[i + 1:end]
+            i = end + 1
+        else:
+            end = i
+            while end < n and body[end] not in ",\n}":
+                end += 1
+            value = body[i:end]
+            i = end
+        fields[name] = _clean_bibtex_value(value)
+    return fields
+
+
+def _bibtex_entries(lines):
+    """@type{key, ...} 항목 단위로 원문을 모음 (@comment/@string/@preamble 제외)"""
+    buf, depth = [], 0
+    for line in lines:
+        if not buf:
+            start = line.find("@")
+            if start < 0:
+                continue
+            line = line[start:]
+        buf.append(line)
+        depth += line.count("{") - line.count("}")
+        if depth <= 0 and "{" in "".join(buf):
+            yield "".join(buf).strip()
+            buf, depth = [], 0
+    if buf:
+        yield "".join(buf).strip()
+
+
+def parse_bibtex(lines):
+    for raw in _bibtex_entries(lines):
+        match = re.match(r"@(\w+)\s*\{\s*([^,]*),(.*)\}\s*$", raw, re.S)
+        if not match or match.group(1).lower() in ("comment", "string", "preamble"):
+            continue
+        fields = _bibtex_fields(match.group(3))
+        if not fields.get("title"):
+            continue
+        authors = [a.strip() for a in re.split(r"\s+and\s+", fields.get("author", "")) if a.strip()]
+        # "Last, First" → "First Last"
+        authors = [" ".join(reversed([p.strip() for p in a.split(",", 1)])) if "," in a else a for a in authors]
+        yield {
+            "title": fields["title"],
+            "authors": authors,
+            "year": fields.get("year", ""),
+            "venue": fields.get("journal") or fields.get("booktitle") or fields.get("publisher", ""),
+            "doi": fields.get("doi", ""),
+            "abstract": fields.get("abstract", ""),
+            "url": fields.get("url", ""),
+            "citations": None,
+            "bibtex": raw,
+        }
+
+
+_RIS_LINE = re.compile(r"^([A-Z][A-Z0-9])  -\s?(.*)$")
+
+
+def parse_ris(lines):
+    record = {}
+    for line in lines:
+        match = _RIS_LINE.match(line.rstrip("\r\n"))
+        if not match:
+            continue
+        tag, value = match.group(1), match.group(2).strip()
+        if tag == "ER":
+            if record.get("TI") or record.get("T1"):
+                year = (record.get("PY") or record.get("Y1") or [""])[0][:4]
+                yield {
+                    "title": (record.get("TI") or record.get("T1"))[0],
+                    "authors": record.get("AU", []) + record.get("A1", []),
+                    "year": year,
+                    "venue": (record.get("JO") or record.get("JF") or record.get("T2") or [""])[0],
+                    "doi": (record.get("DO") or [""])[0],
+                    "abstract": (record.get("AB") or record.get("N2") or [""])[0],
+                    "url": (record.get("UR") or [""])[0],
+                    "citations": None,
+                    "bibtex": "",
+                }
+            record = {}
+        elif value:
+            # "Last, First" → "First Last"
+            if tag in ("AU", "A1") and "," in value:
+                value = " ".join(reversed([p.strip() for p in value.split(",", 1)]))
+            record.setdefault(tag, []).append(value)
+
+
+def parse_jsonl(lines):
+    """한 줄에 논문 하나 (Semantic Scholar 형식 또는 title/authors/doi 등 평평한 형식)"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            p = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(p, dict) or not p.get("title"):
+            continue
+        authors = [a.get("name", "") if isinstance(a, dict) else str(a) for a in p.get("authors") or []]
+        ids = p.get("externalIds") or {}
+        yield {
+            "title": p["title"],
+            "authors": [a for a in authors if a],
+            "year": str(p.get("year") or ""),
+            "venue": p.get("venue") or p.get("journal") or "",
+            "doi": ids.get("DOI") or p.get("doi") or "",
+            "abstract": p.get("abstract") or "",
+            "url": p.get("url") or "",
+            "citations": p.get("citationCount", p.get("citations")),
+            "bibtex": p.get("bibtex") or "",
+        }
+
+
+_PARSERS = {".bib": parse_bibtex, ".ris": parse_ris, ".jsonl": parse_jsonl}
+
+
+def _record_key(record: dict) -> str:
+    """중복 판정 키: DOI, 없으면 제목+연도"""
+    doi = (record.get("doi") or "").lower().strip()
+    if doi:
+        return f"doi:{doi}"
+    title = " ".join(re.findall(r"\w+", record["title"].lower()))
+    return "title:" + hashlib.sha1(f"{title}|{record.get('year', '')}".encode("utf-8")).hexdigest()
+
+
+# ========== 색인 ==========
+class ReferenceIndex:
+    def __init__(self, path: str = REFERENCE_INDEX_FILE):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(f"PRAGMA mmap_size = {_MMAP_BYTES}")
+            self._conn.executescript(
+                """CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT UNIQUE NOT NULL,
+                    source TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    authors TEXT NOT NULL,
+                    year TEXT,
+                    venue TEXT,
+                    doi TEXT,
+                    abstract TEXT,
+                    url TEXT,
+                    citations INTEGER,
+                    bibtex TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_records_source ON records(source);
+                CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+                    title, authors, venue, abstract,
+                    content='records', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+                    INSERT INTO records_fts(rowid, title, authors, venue, abstract)
+                    VALUES (new.id, new.title, new.authors, new.venue, new.abstract);
+                END;
+                CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+                    INSERT INTO records_fts(records_fts, rowid, title, authors, venue, abstract)
+                    VALUES ('delete', old.id, old.title, old.authors, old.venue, old.abstract);
+                END;
+                CREATE TABLE IF NOT EXISTS sources (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    records INTEGER NOT NULL,
+                    indexed REAL NOT NULL
+                );"""
+            )
+            # 예전 버전(INSERT OR REPLACE)이 남긴 고아 FTS 항목을 한 번 정리
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+                self._conn.execute("INSERT INTO records_fts(records_fts) VALUES ('rebuild')")
+                self._conn.execute("PRAGMA user_version = 1")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def expand_paths(paths: list) -> list:
+        """파일/폴더 목록 → 색인 대상 파일 (폴더는 하위의 .bib/.ris/.jsonl)"""
+        files = []
+        for path in paths:
+            path = os.path.abspath(os.path.expanduser(path))
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(
+                        os.path.join(root, name) for name in sorted(names)
+                        if name.lower().endswith(INDEX_EXTENSIONS)
+                    )
+            elif os.path.isfile(path) and path.lower().endswith(INDEX_EXTENSIONS):
+                files.append(path)
+        return files
+
+    def update(self, paths: list, prune: bool = False) -> dict:
+        """
+        바뀐 파일만 다시 색인 (파일 단위로 기존 레코드 삭제 후 스트리밍 삽입)
+        prune=True면 paths에 없는 파일의 레코드는 삭제
+        """
+        files = self.expand_paths(paths)
+        summary = {"indexed": 0, "skipped": 0, "removed": 0, "records": 0}
+        with self._lock:
+            db = self._db()
+            known = {row[0]: row[1:] for row in db.execute("SELECT path, mtime, size FROM sources")}
+            for path in files:
+                stat = os.stat(path)
+                if known.get(path) == (stat.st_mtime, stat.st_size):
+                    summary["skipped"] += 1
+                    continue
+                summary["records"] += self._index_file(db, path, stat)
+                summary["indexed"] += 1
+            if prune:
+                for path in set(known) - set(files):
+                    db.execute("DELETE FROM records WHERE source = ?", (path,))
+                    db.execute("DELETE FROM sources WHERE path = ?", (path,))
+                    summary["removed"] += 1
+            db.commit()
+        return summary
+
+    def _index_file(self, db: sqlite3.Connection, path: str, stat) -> int:
+        parser = _PARSERS[os.path.splitext(path)[1].lower()]
+        db.execute("DELETE FROM records WHERE source = ?", (path,))
+        displaced = set()
+        batch = []
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for record in parser(f):
+                batch.append((
+                    _record_key(record),
+                    path,
+                    record["title"],
+                    ", ".join(record["authors"]),
+                    record["year"],
+                    record["venue"],
+                    record["doi"],
+                    record["abstract"],
+                    record["url"],
+                    record["citations"],
+                    record["bibtex"],
+                ))
+                if len(batch) >= _BATCH:
+                    displaced |= self._insert(db, batch)
+                    batch = []
+        if batch:
+            displaced |= self._insert(db, batch)
+        count = db.execute("SELECT COUNT(*) FROM records WHERE source = ?", (path,)).fetchone()[0]
+        db.execute(
+            "INSERT OR REPLACE INTO sources (path, mtime, size, records, indexed) VALUES (?, ?, ?, ?, ?)",
+            (path, stat.st_mtime, stat.st_size, count, time.time()),
+        )
+        # 중복 논문을 빼앗긴 다른 파일의 레코드 수 갱신
+        for source in displaced - {path}:
+            db.execute(
+                "UPDATE sources SET records = (SELECT COUNT(*) FROM records WHERE source = ?) WHERE path = ?",
+                (source, source),
+            )
+        return count
+
+    @staticmethod
+    def _insert(db: sqlite3.Connection, batch: list) -> set:
+        """
+        배치 삽입 → 기존 레코드를 빼앗긴 파일 목록
+        같은 논문이 다른 파일에도 있으면 나중에 색인한 파일의 레코드로 교체
+        (INSERT OR REPLACE의 암묵적 삭제는 삭제 트리거를 실행하지 않아 records_fts에 고아 항목이 남으므로 직접 삭제)
+        """
+        rows = {row[0]: row for row in batch}  # 같은 배치 안의 중복은 마지막 것만
+        keys = json.dumps(list(rows))
+        displaced = {
+            source for (source,) in db.execute(
+                "SELECT DISTINCT source FROM records WHERE key IN (SELECT value FROM json_each(?))", (keys,)
+            )
+        }
+        db.execute("DELETE FROM records WHERE key IN (SELECT value FROM json_each(?))", (keys,))
+        db.executemany(
+            "INSERT INTO records (key, source, title, authors, year, venue, doi, abstract, url, "
+            "citations, bibtex) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            list(rows.values()),
+        )
+        return displaced
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """BM25 순(제목 가중) 검색 → Semantic Scholar 응답 모양의 논문 목록"""
+        terms = dict.fromkeys(t.lower() for t in _QUERY_TERM.findall(query or ""))
+        if not terms:
+            return []
+        quoted = [f'"{t}"' for t in terms]
+        rows = []
+        with self._lock:
+            db = self._db()
+            # 모든 단어를 포함하는 논문 먼저 (후보가 적어 빠름), 모자라면 일부만 포함하는 논문으로 채움
+            for match in dict.fromkeys((" ".join(quoted), " OR ".join(quoted))):
+                seen = {row[0] for row in rows}
+                rows += [
+                    row for row in db.execute(
+                        "SELECT r.id, r.title, r.authors, r.year, r.venue, r.doi, r.abstract, r.url, r.citations, "
+                        "r.bibtex FROM records_fts JOIN records r ON r.id = records_fts.rowid "
+                        "WHERE records_fts MATCH ? ORDER BY bm25(records_fts, 10.0, 2.0, 1.0, 1.0) LIMIT ?",
+                        (match, limit),
+                    ) if row[0] not in seen
+                ]
+                if len(rows) >= limit:
+                    break
+        return [
+            {
+                "paperId": f"local:{row[0]}",
+                "title": row[1],
+                "authors": [{"name": name} for name in row[2].split(", ") if name],
+                "year": int(row[3]) if (row[3] or "").isdigit() else row[3],
+                "venue": row[4],
+                "externalIds": {"DOI": row[5]} if row[5] else {},
+                "abstract": row[6],
+                "url": row[7],
+                "citationCount": row[8],
+                "bibtex": row[9],
+                "source": "local",
+            }
+            for row in rows[:limit]
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._db()
+            records = db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            sources = db.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+        return {"records": records, "sources": sources}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_index = None
+
+
+def get_reference_index() -> ReferenceIndex:
+    global _index
+    if _index is None:
+        _index = ReferenceIndex()
+    return _index
+
+
+def main(argv: list) -> int:
+    if len(argv) < 2 or argv[0] not in ("build", "search"):
+        print(__doc__)
+        return 1
+    index = get_reference_index()
+    if argv[0] == "build":
+        start = time.perf_counter()
+        summary = index.update(argv[1:])
+        print(f"{summary} ({time.perf_counter() - start:.1f}s, 전체 {index.stats()['records']}건)")
+    else:
+        start = time.perf_counter()
+        results = index.search(" ".join(argv[1:]))
+        elapsed = (time.perf_counter() - start) * 1000
+        for p in results:
+            print(f"- {p['title']} ({p['year']}) {p['externalIds'].get('DOI', '')}")
+        print(f"{len(results)}건, {elapsed:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,14 +1,42 @@
 """외부 API 서비스"""
 import asyncio
+import contextlib
+import contextvars
+import copy
+import hashlib
 import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
 import httpx
 import google.genai as genai
-from config import GEMINI_API_KEY, GEMINI_MODEL
+from google.genai import errors as genai_errors
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    LLM_CACHE_FILE,
+    LLM_CASSETTE_FILE,
+    MODEL_TIER_ORDER,
+    MODEL_TIERS,
+    NODE_GENERATION_PROFILES,
+    SS_CACHE_FILE,
+)
 from storage import get_settings
+from ratelimit import CircuitBreaker, CircuitOpenError, ProviderLimiter, RateLimitedError, parse_retry_after
+from backends import CassetteBackend, FakeBackend, GeminiBackend, LLMBackend
+from jsonrepair import parse_json_tolerant
+from prompts import JSON_REASK_SUFFIX, OUTPUT_SCHEMAS
+from refindex import get_reference_index
+
+logger = logging.getLogger(__name__)
 
 # ========== Gemini 2.5 Flash (google.genai) ==========
-_client = None
-_client_api_key = None
 _gen_config = {
     "temperature": 0.2, 
     "max_output_tokens": 4096,
@@ -23,77 +51,1604 @@ Always output valid JSON without markdown code blocks unless explicitly requeste
 }
 
 
-def _get_client():
-    """API 키 변경에 대응하는 Gemini 클라이언트 생성"""
-    global _client, _client_api_key
+def _node_config(node: str, gen_config: dict = None) -> dict:
+    """_gen_config + 노드별 생성 프로필(config.NODE_GENERATION_PROFILES) + 호출별 덮어쓰기"""
+    profile = NODE_GENERATION_PROFILES.get(node)
+    if not profile and not gen_config:
+        return _gen_config
+    return {**_gen_config, **(profile or {}), **(gen_config or {})}
+
+
+def _resolve_gemini_key() -> str:
     settings = get_settings()
     api_key = GEMINI_API_KEY or settings.get("gemini_api_key", "")
-
     if not api_key:
         raise ValueError("GEMINI_API_KEY가 설정되지 않았습니다. 설정에서 키를 입력하세요.")
+    return api_key
+
+
+class _GeminiClientManager:
+    """비동기 Gemini 클라이언트 관리자
+
+    - API 키나 커넥션 풀 크기가 바뀔 때만 클라이언트를 재생성 (keep-alive 커넥션 풀 재사용)
+    - 커넥션 풀 크기는 설정의 gemini_max_concurrency를 따름 (속도 제한기와 같은 값)
+    """
+
+    def __init__(self):
+        self._client = None
+        self._signature = None  # (API 키, 풀 크기)
+        self._lock = None
+
+    def _build(self, api_key: str, limit: int):
+        return genai.Client(
+            api_key=api_key,
+            http_options={
+                "async_client_args": {
+                    "limits": httpx.Limits(
+                        max_connections=limit,
+                        max_keepalive_connections=limit,
+                        keepalive_expiry=60,
+                    ),
+                },
+            },
+        )
+
+    def concurrency(self) -> int:
+        value = get_settings().get("gemini_max_concurrency", 8)
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return 8
+
+    async def get(self):
+        """현재 API 키에 맞는 비동기 클라이언트(client.aio) 반환"""
+        signature = (_resolve_gemini_key(), self.concurrency())
+        if self._client is not None and self._signature == signature:
+            return self._client.aio
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._client is None or self._signature != signature:
+                old = self._client
+                self._client = self._build(*signature)
+                self._signature = signature
+                if old is not None:
+                    try:
+                        await old.aio.aclose()
+                    except Exception as e:
+                        logger.debug(f"이전 Gemini 클라이언트 종료 실패: {e}")
+        return self._client.aio
+
+    async def prewarm(self, model: str = None):
+        """앱 시작 시 백그라운드에서 TLS 커넥션을 미리 열어둠 (실패해도 무시)"""
+        try:
+            aio = await self.get()
+            await aio.models.get(model=model or GEMINI_MODEL)
+            logger.debug("Gemini 커넥션 예열 완료")
+        except Exception as e:
+            logger.debug(f"Gemini 커넥션 예열 건너뜀: {e}")
+
+    async def aclose(self):
+        if self._client is not None:
+            try:
+                await self._client.aio.aclose()
+            finally:
+                self._client = None
+                self._signature = None
+
+
+_client_manager = _GeminiClientManager()
+
+
+# ========== 속도 제한 (제공자별 벌크헤드) ==========
+_gemini_limiter = ProviderLimiter("gemini")
+_ss_limiter = ProviderLimiter("semantic_scholar")
+
+
+def _gemini_slot_limiter() -> ProviderLimiter:
+    settings = get_settings()
+    _gemini_limiter.configure(
+        rpm=settings.get("gemini_rpm", 0),
+        tpm=settings.get("gemini_tpm", 0),
+        max_concurrency=_client_manager.concurrency(),
+    )
+    return _gemini_limiter
+
+
+def _ss_slot_limiter() -> ProviderLimiter:
+    settings = get_settings()
+    _ss_limiter.configure(
+        rpm=settings.get("ss_rpm", 60),
+        max_concurrency=settings.get("ss_max_concurrency", 2),
+    )
+    return _ss_limiter
+
+
+# 한글/한자/가나 1글자, 영문 단어, 숫자, 기호 단위로 나눔
+_TOKEN_PIECE = re.compile(r"[\uac00-\ud7a3\u3130-\u318f\u3040-\u30ff\u4e00-\u9fff]|[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """API 호출 없는 빠른 토큰 수 추정 (Gemini 토크나이저 대비 약간 보수적)
+
+    - 한글/CJK: 글자당 1토큰
+    - 영문 단어: 1토큰 + 8글자마다 1토큰 (긴 전문용어는 여러 토큰으로 쪼개짐)
+    - 숫자: 3자리당 1토큰, 기호: 1토큰
+    """
+    if not text:
+        return 0
+    count = 0
+    for piece in _TOKEN_PIECE.findall(text):
+        if piece.isascii() and piece.isalpha():
+            count += 1 + (len(piece) - 1) // 8
+        elif piece.isdigit():
+            count += (len(piece) + 2) // 3
+        else:
+            count += 1
+    return count
+
+
+def _estimate_prompt_tokens(prompt: str) -> int:
+    return estimate_tokens(prompt) + 1
+
+
+def _gemini_retry_after(e: Exception) -> float | None:
+    """Gemini 429 응답에서 Retry-After 헤더 또는 RetryInfo.retryDelay 추출"""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if headers is not None:
+        retry_after = parse_retry_after(headers.get("retry-after"))
+        if retry_after is not None:
+            return retry_after
+    match = re.search(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s", str(getattr(e, "details", "")))
+    return float(match.group(1)) if match else None
+
+
+def _as_rate_limited(e: Exception) -> Exception:
+    if isinstance(e, genai_errors.APIError) and e.code == 429:
+        return RateLimitedError(str(e), _gemini_retry_after(e))
+    return e
+
+
+def get_limiter_stats() -> dict:
+    """제공자별 현재 동시성 한도, 429 횟수, 대기 시간"""
+    return {
+        "gemini": _gemini_limiter.stats(),
+        "semantic_scholar": _ss_limiter.stats(),
+    }
+
+
+# ========== 회로 차단기 (제공자/엔드포인트별) ==========
+PROVIDER_UNAVAILABLE = "skipped: provider unavailable"
+# 분석 1회 동안 회로 차단으로 건너뛴 호출 기록 (graph.analyze가 리스트를 넣고 결과의 skipped로 노출)
+skipped_calls_var = contextvars.ContextVar("skipped_calls", default=None)
+_breakers = {}
+
+
+def _breaker(provider: str, endpoint: str):
+    """제공자:엔드포인트 회로 차단기 (설정 breaker_enabled가 꺼져 있으면 None)"""
+    settings = get_settings()
+    if not settings.get("breaker_enabled", True):
+        return None
+    name = f"{provider}:{endpoint}"
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    breaker.configure(
+        failure_rate=settings.get("breaker_failure_rate", 0.5),
+        min_calls=settings.get("breaker_min_calls", 4),
+        window=settings.get("breaker_window", 20),
+        cooldown=settings.get("breaker_cooldown_seconds", 30),
+    )
+    return breaker
+
+
+def _guard(provider: str, endpoint: str, ignore: tuple = ()):
+    breaker = _breaker(provider, endpoint)
+    return breaker.guard(ignore) if breaker is not None else contextlib.nullcontext()
+
+
+def _record_skip(node: str, e: CircuitOpenError):
+    """UI에 표시할 "건너뜀" 표시 (같은 노드/차단기는 한 번만)"""
+    skipped = skipped_calls_var.get()
+    if skipped is None or any(s["node"] == node and s["breaker"] == e.breaker for s in skipped):
+        return
+    skipped.append({
+        "node": node,
+        "breaker": e.breaker,
+        "status": PROVIDER_UNAVAILABLE,
+        "retry_in": round(e.retry_in, 1),
+    })
 
-    if _client is None or _client_api_key != api_key:
-        _client = genai.Client(api_key=api_key)
-        _client_api_key = api_key
-    return _client
 
+def get_breaker_stats() -> dict:
+    """차단기별 상태(closed/open/half_open), 최근 실패율, 차단 횟수"""
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
 
-async def ask_gemini(prompt: str, model: str = None) -> dict:
-    """Gemini 호출 → JSON 파싱 (LangGraph 밖에서도 사용 가능)"""
-    client = _get_client()
-    
-    target_model = model or GEMINI_MODEL
 
-    def _call():
-        return client.models.generate_content(
-            model=target_model,
-            contents={'text': prompt},
-            config=_gen_config,
+async def _get_client():
+    """API 키 변경에 대응하는 비동기 Gemini 클라이언트"""
+    return await _client_manager.get()
+
+
+async def prewarm_gemini():
+    """Gemini 커넥션 예열 (main.App 시작 시 백그라운드 실행)"""
+    if _uses_live_gemini():
+        await _client_manager.prewarm()
+
+
+async def close_gemini():
+    """Gemini 커넥션 풀 정리 (원격 프리픽스 캐시도 함께 삭제)"""
+    try:
+        await _prefix_cache.clear()
+    finally:
+        await _client_manager.aclose()
+
+
+# ========== LLM 백엔드 선택 ==========
+# llm_backend 설정: gemini(실제 API) / fake(가짜 응답+지연) / record(실제 호출을 녹화) / replay(녹화 재생)
+_backend = None
+_backend_signature = None
+_backend_override = None
+
+
+def _build_backend(settings: dict) -> LLMBackend:
+    name = settings.get("llm_backend", "gemini")
+    if name == "fake":
+        return FakeBackend(
+            latency_ms=settings.get("fake_latency_ms", 800),
+            sigma=settings.get("fake_latency_sigma", 0.5),
+            seed=settings.get("fake_seed", 0),
         )
+    live = GeminiBackend(_get_client)
+    if name == "record":
+        return CassetteBackend(LLM_CASSETTE_FILE, "record", inner=live)
+    if name == "replay":
+        return CassetteBackend(LLM_CASSETTE_FILE, "replay")
+    return live
+
+
+def get_llm_backend() -> LLMBackend:
+    """현재 LLM 백엔드 (set_llm_backend로 지정한 것이 있으면 우선)"""
+    global _backend, _backend_signature
+    if _backend_override is not None:
+        return _backend_override
+    settings = get_settings()
+    signature = tuple(
+        settings.get(k) for k in ("llm_backend", "fake_latency_ms", "fake_latency_sigma", "fake_seed")
+    )
+    if _backend is None or signature != _backend_signature:
+        _backend = _build_backend(settings)
+        _backend_signature = signature
+    return _backend
+
+
+def set_llm_backend(backend: LLMBackend | str | None):
+    """코드에서 백엔드를 직접 지정 (벤치마크/오프라인 실행용)
+
+    문자열이면 llm_backend 설정값과 같은 이름으로 생성, None이면 다시 설정을 따름
+    """
+    global _backend_override
+    if isinstance(backend, str):
+        backend = _build_backend({**get_settings(), "llm_backend": backend})
+    _backend_override = backend
+
+
+def _uses_live_gemini() -> bool:
+    return get_llm_backend().name in ("gemini", "record")
+
+
+def get_backend_stats() -> dict:
+    backend = get_llm_backend()
+    stats = {"backend": backend.name}
+    if hasattr(backend, "stats"):
+        stats.update(backend.stats())
+    return stats
+
+
+# ========== Gemini 응답 캐시 (콘텐츠 주소 기반, 디스크 영속) ==========
+# 분석 단위로 캐시를 끌 수 있도록 contextvar 사용 (LangGraph 노드 태스크로 전파됨)
+cache_enabled_var = contextvars.ContextVar("llm_cache_enabled", default=True)
+
+
+class _ResponseCache:
+    """(model, _gen_config, prompt) 해시 → 파싱된 응답 JSON
+
+    - SQLite 파일 하나에 저장 (재시작 후에도 유지)
+    - llm_cache_max_entries 초과 시 마지막 접근 시각 기준 LRU 제거
+    - llm_cache_ttl_hours > 0 이면 만료된 항목은 미스로 처리
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, config: dict, prompt: str) -> str:
+        payload = json.dumps(
+            {"model": model, "config": config, "prompt": prompt},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        settings = get_settings()
+        ttl_hours = settings.get("llm_cache_ttl_hours", 0) or 0
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if ttl_hours > 0 and now - row[1] > ttl_hours * 3600:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                db.commit()
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict, overwrite: bool = True):
+        max_entries = get_settings().get("llm_cache_max_entries", 2000)
+        now = time.time()
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        with self._lock:
+            db = self._db()
+            db.execute(
+                f"{verb} INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response, ensure_ascii=False), now, now),
+            )
+            count = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if max_entries and count > max_entries:
+                db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                    (count - max_entries,),
+                )
+            db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM responses")
+            self._db().commit()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_response_cache = _ResponseCache(LLM_CACHE_FILE)
 
+
+def _cache_key(prompt: str, model: str = None, config: dict = None, journal: dict = None) -> str:
+    config = config or _gen_config
+    if not _uses_live_gemini():
+        # 가짜/재생 응답이 실제 응답 캐시와 섞이지 않도록 분리
+        config = {**config, "llm_backend": get_llm_backend().name}
+    if journal:
+        # 프리픽스 캐시 사용 시 프롬프트에 Aims & Scope가 없으므로 저널 프로필을 키에 포함
+        config = {**config, "journal_context": journal_context(journal)}
+    return _response_cache.make_key(model or GEMINI_MODEL, config, prompt)
+
+
+def cache_response(
+    prompt: str,
+    response: dict,
+    model: str = None,
+    overwrite: bool = True,
+    journal: dict = None,
+    node: str = "default",
+    schema: dict = None,
+):
+    """프롬프트에 대한 응답을 캐시에 직접 등록 (히스토리 기반 예열용, 인자는 ask_gemini와 같게)"""
+    config = _structured_config(_node_config(node), schema)
+    key = _cache_key(prompt, resolve_model(node, model), config, journal)
+    _response_cache.put(key, response, overwrite=overwrite)
+
+
+def get_cache_stats() -> dict:
+    """응답 캐시 적중/미스 통계"""
+    return _response_cache.stats()
+
+
+def clear_response_cache():
+    _response_cache.clear()
+
+
+def _cache_active(use_cache: bool | None) -> bool:
+    if use_cache is None:
+        use_cache = cache_enabled_var.get()
+    return bool(use_cache) and get_settings().get("llm_cache_enabled", True)
+
+
+# ========== 프리픽스(컨텍스트) 캐시 ==========
+def journal_context(journal: dict) -> str:
+    """저널 프로필 블록 (프리픽스 캐시에 올리는 고정 컨텍스트)"""
+    lines = [
+        "[Target Journal Profile]",
+        f"Journal: {journal.get('full_name') or journal.get('name', '')}",
+        f"Aims & Scope:\n{journal.get('aims_scope', '')}",
+    ]
+    if journal.get("criteria"):
+        lines.append("Evaluation criteria:\n" + "\n".join(f"- {c}" for c in journal["criteria"]))
+    if journal.get("style"):
+        lines.append(f"Preferred style: {journal['style']}")
+    if journal.get("audience"):
+        lines.append(f"Target audience: {journal['audience']}")
+    return "\n".join(lines)
+
+
+class _PrefixCache:
+    """(model, system_instruction, 저널 프로필)별 캐시 컨텍스트 관리
+
+    prefix_cache_backend 설정:
+    - "off": 사용 안 함 (노드가 Aims & Scope를 프롬프트에 직접 넣음)
+    - "gemini": Gemini 명시적 캐시(caches.create)에 올리고 cached_content로 참조
+    - "fake": 원격 호출 없이 프로필을 프롬프트 앞에 붙이고 절감 토큰만 집계 (오프라인 검증용)
+    캐시 생성이 불가능하면(최소 토큰 미달, API 오류) 프로필을 프롬프트 앞에 붙여 보냄
+    """
+
+    def __init__(self):
+        self._entries = {}   # key -> {"name", "journal", "tokens", "expires"}
+        self._locks = defaultdict(asyncio.Lock)
+        self.created = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.invalidated = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def backend() -> str:
+        backend = get_settings().get("prefix_cache_backend", "off")
+        return backend if backend in ("gemini", "fake") else "off"
+
+    @staticmethod
+    def make_key(backend: str, model: str, system_instruction: str, context: str) -> str:
+        payload = json.dumps([backend, model, system_instruction, context], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def apply(self, prompt: str, model: str, config: dict, journal: dict) -> tuple[str, dict]:
+        """프롬프트/생성 옵션에 저널 컨텍스트를 반영 → (prompt, config)"""
+        context = journal_context(journal)
+        backend = self.backend()
+        entry = await self._ensure(backend, model, config.get("system_instruction", ""), context, journal)
+        if entry is None:
+            self.fallbacks += 1
+            return f"{context}\n\n{prompt}", config
+        if entry.pop("fresh", False):
+            self.created += 1
+        else:
+            # 캐시를 만든 첫 호출은 절감이 없고, 재사용부터 프리픽스 토큰을 아낌
+            self.hits += 1
+            self.tokens_saved += entry["tokens"]
+        if backend == "fake":
+            return f"{context}\n\n{prompt}", config
+        # 캐시 컨텍스트에 system_instruction이 포함되어 있으므로 중복 전달 금지
+        config = {k: v for k, v in config.items() if k != "system_instruction"}
+        config["cached_content"] = entry["name"]
+        return prompt, config
+
+    async def _ensure(self, backend: str, model: str, system_instruction: str, context: str, journal: dict):
+        if backend == "off":
+            return None
+        settings = get_settings()
+        ttl = max(60, int(settings.get("prefix_cache_ttl_minutes", 60) * 60))
+        tokens = _estimate_prompt_tokens(system_instruction + context)
+        if tokens < settings.get("prefix_cache_min_tokens", 1024):
+            return None
+
+        # 재생/가짜 LLM 백엔드에서 만든 로컬 참조가 실제 호출에 섞이지 않도록 구분
+        scope = backend if _uses_live_gemini() else f"{backend}:offline"
+        key = self.make_key(scope, model, system_instruction, context)
+        async with self._locks[key]:
+            entry = self._entries.get(key)
+            # 만료 직전 항목은 재생성 (요청 도중 만료 방지)
+            if entry is not None and entry["expires"] - 30 > time.monotonic():
+                return entry
+            name = f"fake/{key[:16]}"
+            if backend == "gemini" and not _uses_live_gemini():
+                # 재생/가짜 백엔드: 녹화 당시와 같은 요청 모양(cached_content 참조)만 흉내냄
+                name = f"local/{key[:16]}"
+            elif backend == "gemini":
+                try:
+                    client = await _get_client()
+                    cached = await client.caches.create(
+                        model=model,
+                        config={
+                            "system_instruction": system_instruction,
+                            "contents": [{"role": "user", "parts": [{"text": context}]}],
+                            "ttl": f"{ttl}s",
+                            "display_name": f"journal:{journal.get('name', '')}"[:120],
+                        },
+                    )
+                    name = cached.name
+                    usage = getattr(cached, "usage_metadata", None)
+                    tokens = getattr(usage, "total_token_count", None) or tokens
+                except Exception as e:
+                    logger.warning(f"프리픽스 캐시 생성 실패, 프롬프트에 직접 포함: {e}")
+                    return None
+            entry = {
+                "name": name,
+                "journal": journal.get("name", ""),
+                "tokens": tokens,
+                "expires": time.monotonic() + ttl,
+                "fresh": True,
+            }
+            self._entries[key] = entry
+            return entry
+
+    async def _delete(self, entries: list):
+        remote = [e["name"] for e in entries if not e["name"].startswith(("fake/", "local/"))]
+        if not remote:
+            return
+        try:
+            client = await _get_client()
+        except Exception:
+            return
+        for name in remote:
+            try:
+                await client.caches.delete(name=name)
+            except Exception as e:
+                logger.debug(f"프리픽스 캐시 삭제 실패 ({name}): {e}")
+
+    async def invalidate(self, journal_name: str):
+        stale = [k for k, e in self._entries.items() if e["journal"] == journal_name]
+        entries = [self._entries.pop(k) for k in stale]
+        self.invalidated += len(entries)
+        await self._delete(entries)
+
+    async def clear(self):
+        entries = list(self._entries.values())
+        self._entries.clear()
+        await self._delete(entries)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend(),
+            "entries": len(self._entries),
+            "created": self.created,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "invalidated": self.invalidated,
+            "prefix_tokens_saved": self.tokens_saved,
+        }
+
+
+_prefix_cache = _PrefixCache()
+
+
+def prefix_cache_active() -> bool:
+    """노드가 Aims & Scope를 프롬프트 대신 프리픽스 캐시로 보낼지 여부"""
+    return _PrefixCache.backend() != "off"
+
+
+async def invalidate_prefix_cache(journal_name: str):
+    """저널이 재등록/삭제되면 해당 저널의 캐시 컨텍스트 폐기"""
+    await _prefix_cache.invalidate(journal_name)
+
+
+def get_prefix_cache_stats() -> dict:
+    """프리픽스 캐시 생성/재사용 횟수와 절감된 입력 토큰 (추정)"""
+    return _prefix_cache.stats()
+
+
+# ========== 토큰 사용량 집계 ==========
+_usage = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0}
+
+
+def _record_usage(response):
+    meta = getattr(response, "usage_metadata", None)
+    _usage["calls"] += 1
+    if meta is not None:
+        _usage["prompt_tokens"] += getattr(meta, "prompt_token_count", 0) or 0
+        _usage["output_tokens"] += getattr(meta, "candidates_token_count", 0) or 0
+
+
+def get_usage_stats() -> dict:
+    """실제 API 호출 수와 입력/출력 토큰 합계 (캐시 적중은 제외)"""
+    return dict(_usage)
+
+
+def reset_usage_stats():
+    for k in _usage:
+        _usage[k] = 0
+
+
+# ========== 출력 잘림 (max_output_tokens 도달) 감지 ==========
+# 분석 1회 동안 잘린 노드 기록 (graph.analyze가 리스트를 넣고 결과의 output_truncations로 노출)
+output_truncations_var = contextvars.ContextVar("output_truncations", default=None)
+_truncations = defaultdict(int)
+
+
+def _record_truncation(response, node: str, config: dict):
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    if getattr(reason, "name", reason) != "MAX_TOKENS":
+        return
+    _truncations[node] += 1
+    entry = {"node": node, "max_output_tokens": config.get("max_output_tokens")}
+    logger.warning(f"출력이 max_output_tokens에서 잘림: {entry}")
+    truncations = output_truncations_var.get()
+    if truncations is not None:
+        truncations.append(entry)
+
+
+def get_truncation_stats() -> dict:
+    """노드별 출력 잘림 횟수 (생성 프로필의 max_output_tokens 조정 근거)"""
+    return dict(_truncations)
+
+
+# ========== 동일 요청 합치기 (single-flight) ==========
+class _SingleFlight:
+    """
+    같은 키로 동시에 들어온 요청은 첫 요청(leader)의 결과 하나를 함께 기다림
+    leader가 취소되면(마감 시간, 헤징에서 진 요청, 닫힌 탭) 대기자 중 하나가 factory를 다시 실행
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.leaders = 0
+        self.absorbed = 0
+
+    async def do(self, key: str, factory):
+        while (fut := self._inflight.get(key)) is not None:
+            self.absorbed += 1
+            try:
+                # 호출자마다 결과를 수정하므로 복사본 전달
+                return copy.deepcopy(await asyncio.shield(fut))
+            except asyncio.CancelledError:
+                # 이 호출자가 취소된 게 아니라 leader가 취소된 경우에만 다시 시도
+                # (먼저 깨어난 대기자가 새 leader가 되고 나머지는 그 결과를 기다림)
+                if not fut.cancelled() or getattr(asyncio.current_task(), "cancelling", lambda: 0)():
+                    raise
+                self.absorbed -= 1
+
+        fut = asyncio.get_running_loop().create_future()
+        # 대기자가 없어도 "exception was never retrieved" 경고가 나지 않도록 소비
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = fut
+        self.leaders += 1
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "absorbed": self.absorbed,
+            "in_flight": len(self._inflight),
+        }
+
+
+_gemini_flight = _SingleFlight()
+_ss_flight = _SingleFlight()
+
+
+def get_coalesce_stats() -> dict:
+    """합쳐진(중복 제거된) 호출 수 통계"""
+    return {
+        "gemini": _gemini_flight.stats(),
+        "semantic_scholar": _ss_flight.stats(),
+    }
+
+
+# ========== 모델 라우팅 (노드별 등급, 승격/대체) ==========
+def _route_tier(node: str) -> str:
+    routes = get_settings().get("model_routes") or {}
+    tier = routes.get(node, routes.get("default", "lite"))
+    return tier if tier in MODEL_TIERS else "lite"
+
+
+def resolve_model(node: str, model: str = None) -> str:
+    """호출할 모델: 직접 지정한 모델 > 설정 model_routes의 노드 등급 > default 등급"""
+    return model or MODEL_TIERS[_route_tier(node)]
+
+
+def _neighbor_model(model: str, step: int) -> str | None:
+    """등급 순서(MODEL_TIER_ORDER)에서 한 단계 강한(step=1) / 빠른(step=-1) 모델, 없으면 None"""
+    models = [MODEL_TIERS[tier] for tier in MODEL_TIER_ORDER]
+    if model not in models:
+        return None
+    idx = models.index(model) + step
+    return models[idx] if 0 <= idx < len(models) else None
+
+
+class _RouteStats:
+    """(노드, 모델) 경로별 지연시간과 승격/대체 횟수 — model_routes 조정 근거"""
+
+    def __init__(self):
+        self.latencies = defaultdict(lambda: deque(maxlen=200))
+        self.events = defaultdict(lambda: defaultdict(int))
+
+    def record(self, node: str, model: str, latency: float):
+        self.latencies[(node, model)].append(latency)
+
+    def count(self, node: str, model: str, event: str):
+        self.events[(node, model)][event] += 1
+
+    @staticmethod
+    def _percentile(samples: list, percentile: float) -> float:
+        idx = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return round(samples[idx], 3)
+
+    def stats(self) -> dict:
+        result = {}
+        for route in set(self.latencies) | set(self.events):
+            samples = sorted(self.latencies.get(route, ()))
+            entry = {"calls": len(samples), **self.events.get(route, {})}
+            if samples:
+                entry["mean_s"] = round(sum(samples) / len(samples), 3)
+                entry["p50_s"] = self._percentile(samples, 50)
+                entry["p95_s"] = self._percentile(samples, 95)
+            result[f"{route[0]}@{route[1]}"] = entry
+        return result
+
+
+_routes = _RouteStats()
+
+
+def get_route_stats() -> dict:
+    """경로("노드@모델")별 호출 수, 평균/p50/p95 지연시간, escalated/fallback/timeout 횟수"""
+    return _routes.stats()
+
+
+def _fallback_timeout(config: dict) -> float:
+    """
+    대체 전 대기 시간 (0이면 대체 안 함)
+    설정값은 기본 출력 길이(_gen_config max_output_tokens) 기준 — 더 긴 출력을 허용한 노드
+    (예: pro로 라우팅되는 register_journal 8192토큰)는 그 비율만큼 더 기다림
+    """
+    timeout = get_settings().get("model_fallback_timeout_seconds", 0)
+    if not timeout:
+        return 0
+    reference = _gen_config["max_output_tokens"]
+    return timeout * max(1.0, (config.get("max_output_tokens") or reference) / reference)
+
+
+async def _generate_routed(
+    prompt: str, target_model: str, config: dict, node: str, journal: dict = None, on_event=None
+) -> dict:
+    """_generate_hedged + 시간 초과 시 한 단계 빠른 모델로 대체 (설정 model_fallback_timeout_seconds, 출력 길이에 비례)"""
+    timeout = _fallback_timeout(config)
+    faster = _neighbor_model(target_model, -1) if timeout else None
+    start = time.monotonic()
     try:
-        response = await asyncio.to_thread(_call)
+        if faster:
+            result = await asyncio.wait_for(
+                _generate_hedged(prompt, target_model, config, node, journal, on_event), timeout
+            )
+        else:
+            result = await _generate_hedged(prompt, target_model, config, node, journal, on_event)
+    except asyncio.TimeoutError:
+        _routes.count(node, target_model, "timeout")
+        logger.warning(f"{node}: {target_model} 응답이 {timeout:g}초를 넘어 {faster}로 대체")
+        _routes.count(node, faster, "fallback")
+        return await _generate_routed(prompt, faster, config, node, journal, on_event)
+    except Exception:
+        _routes.count(node, target_model, "error")
+        raise
+    _routes.record(node, target_model, time.monotonic() - start)
+    return result
+
+
+async def _escalate(
+    parsed: dict, prompt: str, target_model: str, config: dict, node: str, journal: dict, accept, on_event=None
+) -> dict:
+    """파싱 실패 또는 accept(결과)가 False(낮은 신뢰도)일 때만 한 단계 강한 모델로 다시 생성 (설정 model_escalation)"""
+    if not get_settings().get("model_escalation", True):
+        return parsed
+    stronger = _neighbor_model(target_model, 1)
+    if stronger is None:
+        return parsed
+    if parsed.get("error") != "parse_failed" and (accept is None or accept(parsed)):
+        return parsed
+    _routes.count(node, target_model, "escalated")
+    logger.info(f"{node}: {target_model} 결과가 불충분하여 {stronger}로 승격")
+    try:
+        better = await _generate_routed(prompt, stronger, config, node, journal, on_event)
+    except Exception as e:
+        logger.warning(f"{node}: 승격 호출 실패, 기존 결과 사용: {e}")
+        return parsed
+    return parsed if better.get("error") == "parse_failed" else better
+
+
+# ========== JSON 응답 파싱 / 재요청 ==========
+# 분석 1회 동안 남은 재요청 횟수 ([남은 횟수] 리스트, graph.analyze가 설정) — None이면 제한 없음
+reask_budget_var = contextvars.ContextVar("json_reask_budget", default=None)
+_parse_stats = {"ok": 0, "repaired": 0, "failed": 0, "reasked": 0, "reask_recovered": 0}
+
+
+def _parse_response(text: str) -> dict:
+    """응답 텍스트 → dict (관대한 복구 포함), 복구 불가면 parse_failed dict"""
+    parsed, repaired = parse_json_tolerant(text)
+    if parsed is not None:
+        _parse_stats["repaired" if repaired else "ok"] += 1
+        return parsed
+    _parse_stats["failed"] += 1
+    return {
+        # 원본 응답을 더 많이 저장 (최대 1000자)
+        "raw": text[:1000],
+        "error": "parse_failed",
+        "error_detail": "JSON 파싱 실패: 복구할 수 없는 응답",
+    }
+
+
+def _take_reask() -> bool:
+    """이번 분석의 재요청 예산에서 1회 차감 (남아 있으면 True)"""
+    budget = reask_budget_var.get()
+    if budget is None:
+        return True
+    if budget[0] <= 0:
+        return False
+    budget[0] -= 1
+    return True
+
+
+def get_parse_stats() -> dict:
+    """JSON 응답 파싱 결과 (정상/복구/실패/재요청 횟수)"""
+    return dict(_parse_stats)
+
+
+def _structured_config(config: dict, schema: dict | None) -> dict:
+    """설정 structured_output이 켜져 있으면 응답 스키마를 생성 옵션에 추가 (Gemini가 스키마에 맞는 JSON만 생성)"""
+    if not schema or not get_settings().get("structured_output", True):
+        return config
+    return {**config, "response_mime_type": "application/json", "response_schema": schema}
+
+
+async def ask_gemini(
+    prompt: str,
+    model: str = None,
+    use_cache: bool = None,
+    gen_config: dict = None,
+    node: str = "default",
+    journal: dict = None,
+    schema: dict = None,
+    accept=None,
+    on_event=None,
+) -> dict:
+    """Gemini 호출 → JSON 파싱 (LangGraph 밖에서도 사용 가능)
+
+    use_cache=False 이면 캐시를 건너뛰고 새로 생성 (None이면 cache_enabled_var 따름)
+    gen_config는 노드 생성 프로필 위에 덮어쓸 생성 옵션 (예: max_output_tokens)
+    node는 호출한 분석 노드 이름 (생성 프로필 선택, 지연시간 통계/헤징, 잘림 보고에 사용)
+    journal을 주면 저널 프로필을 프리픽스 캐시 컨텍스트로 전달 (prefix_cache_active() 참고)
+    schema는 응답 JSON 스키마 (prompts.RESPONSE_SCHEMAS 형식, 설정 structured_output)
+    파싱이 끝내 실패하면 이 노드만 한 번 더 요청 (설정 parse_retry_attempts, 분석당 parse_retry_budget)
+    model을 생략하면 설정 model_routes에서 노드별 모델을 고름 — 그래도 파싱에 실패하거나
+    accept(결과)가 False(낮은 신뢰도)이면 한 단계 강한 모델로 승격, 시간 초과 시 빠른 모델로 대체
+    동일 프롬프트가 이미 호출 중이면 그 결과를 함께 기다림
+    on_event(경로, 값)를 주면 스트리밍으로 생성하며 JSON 필드가 닫힐 때마다 호출 (짧은 키 그대로)
+    대체/재요청/승격으로 다시 생성하면 같은 경로가 새 값으로 다시 올 수 있음,
+    캐시 적중이나 다른 호출의 결과를 함께 기다린 경우에는 호출되지 않음
+    """
+    target_model = resolve_model(node, model)
+    config = _structured_config(_node_config(node, gen_config), schema)
+    caching = _cache_active(use_cache)
+    key = _cache_key(prompt, target_model, config, journal)
+    if caching:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    async def _leader():
+        parsed = await _generate_routed(prompt, target_model, config, node, journal, on_event)
+        attempts = get_settings().get("parse_retry_attempts", 1)
+        while parsed.get("error") == "parse_failed" and attempts > 0 and _take_reask():
+            attempts -= 1
+            _parse_stats["reasked"] += 1
+            logger.warning(f"JSON 파싱 실패 → 재요청: node={node}")
+            parsed = await _generate_routed(prompt + JSON_REASK_SUFFIX, target_model, config, node, journal, on_event)
+            if parsed.get("error") != "parse_failed":
+                _parse_stats["reask_recovered"] += 1
+        parsed = await _escalate(parsed, prompt, target_model, config, node, journal, accept, on_event)
+        if caching and parsed.get("error") != "parse_failed":
+            _response_cache.put(key, parsed)
+        return parsed
+
+    return await _gemini_flight.do(key, _leader)
+
+
+# ========== 요청 헤징 (꼬리 지연시간 단축) ==========
+class _HedgePolicy:
+    """
+    노드별 최근 지연시간으로 p90/p95 임계값을 구하고,
+    그 시간 안에 응답이 없으면 같은 요청을 하나 더 보내 먼저 끝난 쪽을 채택
+    전체 호출 대비 헤지 비율은 hedge_max_ratio로 제한
+    """
+
+    MIN_SAMPLES = 10
+
+    def __init__(self):
+        self.latencies = defaultdict(lambda: deque(maxlen=100))
+        # 임계값을 넘겼지만 끝까지 기다려 본 원래 요청의 지연시간 (절감 시간 추정용)
+        self.stragglers = defaultdict(lambda: deque(maxlen=50))
+        self.calls = 0
+        self.fired = 0
+        self.hedge_won = 0
+        self.saved_seconds = 0.0
+
+    def threshold(self, node: str, percentile: float) -> float | None:
+        samples = sorted(self.latencies[node])
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        idx = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[idx]
+
+    def tail_mean(self, node: str, threshold: float) -> float:
+        tail = list(self.stragglers[node]) or [x for x in self.latencies[node] if x >= threshold]
+        return sum(tail) / len(tail) if tail else threshold
+
+    def allow(self, max_ratio: float) -> bool:
+        return self.fired < max_ratio * max(self.calls, 1)
+
+    def record(self, node: str, latency: float):
+        self.latencies[node].append(latency)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "fired": self.fired,
+            "hedge_won": self.hedge_won,
+            "hedge_ratio": self.fired / self.calls if self.calls else 0.0,
+            "saved_seconds_est": round(self.saved_seconds, 3),
+            "thresholds": {
+                node: self.threshold(node, 95) for node in self.latencies
+            },
+        }
+
+
+_hedge = _HedgePolicy()
+
+
+def get_hedge_stats() -> dict:
+    """헤징 발동 횟수, 헤지 요청이 이긴 횟수, 추정 절감 시간"""
+    return _hedge.stats()
+
+
+async def _generate_hedged(
+    prompt: str, target_model: str, config: dict, node: str, journal: dict = None, on_event=None
+) -> dict:
+    """_generate + 선택적 헤징 (설정 hedge_enabled) — 스트리밍 이벤트는 원래 요청에서만 전달"""
+    settings = get_settings()
+    _hedge.calls += 1
+    delay = None
+    if settings.get("hedge_enabled", False):
+        delay = _hedge.threshold(node, settings.get("hedge_percentile", 95))
+
+    start = time.monotonic()
+    primary = asyncio.ensure_future(_generate(prompt, target_model, config, journal, node, on_event))
+    tasks = {primary}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and _hedge.allow(settings.get("hedge_max_ratio", 0.1)):
+                _hedge.fired += 1
+                hedge_start = time.monotonic()
+                hedge = asyncio.ensure_future(_generate(prompt, target_model, config, journal, node))
+                tasks.add(hedge)
+                winner = None
+                pending = set(tasks)
+                while pending and winner is None:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    winner = next((t for t in done if not t.cancelled() and t.exception() is None), None)
+                if winner is None:
+                    return primary.result()  # 둘 다 실패 → 원래 요청의 예외 전달
+                now = time.monotonic()
+                if winner is hedge:
+                    _hedge.hedge_won += 1
+                    _hedge.saved_seconds += max(0.0, _hedge.tail_mean(node, delay) - (now - start))
+                    _hedge.record(node, now - hedge_start)
+                else:
+                    _hedge.record(node, now - start)
+                    _hedge.stragglers[node].append(now - start)
+                return winner.result()
+
+        result = await primary
+        latency = time.monotonic() - start
+        _hedge.record(node, latency)
+        if delay is not None and latency > delay:
+            _hedge.stragglers[node].append(latency)
+        return result
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+
+
+async def _generate(
+    prompt: str,
+    target_model: str,
+    config: dict,
+    journal: dict = None,
+    node: str = "default",
+    on_event=None,
+) -> dict:
+    """LLM 백엔드 호출 + JSON 파싱 (on_event가 있으면 스트리밍으로 받으며 닫힌 필드마다 호출)"""
+    backend = get_llm_backend()
+    if journal:
+        prompt, config = await _prefix_cache.apply(prompt, target_model, config, journal)
+
+    async def _call():
+        try:
+            if on_event is None:
+                return await backend.generate(target_model, prompt, config)
+            return await _collect_stream(backend.generate_stream(target_model, prompt, config), on_event)
+        except Exception as e:
+            raise _as_rate_limited(e) from e
+
+    try:
+        limiter = _gemini_slot_limiter()
+        estimate = _estimate_prompt_tokens(prompt)
+        # 잘못된 요청(4xx, 키 없음)은 제공자 장애가 아니므로 차단기 실패로 세지 않음
+        async with _guard("gemini", target_model, ignore=(genai_errors.ClientError, ValueError)):
+            response = await limiter.run(_call, tokens=estimate, key=node)
+        actual = getattr(getattr(response, "usage_metadata", None), "prompt_token_count", None)
+        if actual:
+            limiter.tokens.adjust(actual - estimate)
+        _record_usage(response)
+        _record_truncation(response, node, config)
         text = (getattr(response, "text", "") or "").strip()
 
         if not text:
             raise Exception("Gemini API가 빈 응답을 반환했습니다.")
 
-        # 마크다운 코드블록 제거
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            parts = text.split("```")
-            if len(parts) >= 3:
-                text = parts[1].strip()
-                if text.startswith("json"):
-                    text = text[4:].strip()
+        # 코드블록/머리말, trailing comma, 잘린 응답 등은 jsonrepair에서 복구
+        return _parse_response(text)
+    except CircuitOpenError as e:
+        _record_skip(node, e)
+        raise
+    except Exception as e:
+        raise Exception(f"Gemini API 오류: {str(e)}")
+
 
-        try:
-            parsed = json.loads(text)
-            if not isinstance(parsed, dict):
-                raise json.JSONDecodeError("JSON이 dict가 아님", text, 0)
-            return parsed
-        except json.JSONDecodeError as je:
-            error_msg = f"JSON 파싱 실패: {str(je)}"
-            # 원본 응답을 더 많이 저장 (최대 1000자)
-            raw_text = text[:1000] if len(text) > 1000 else text
-            return {
-                "raw": raw_text,
-                "error": "parse_failed",
-                "error_detail": error_msg,
-            }
+# ========== 스트리밍 (토큰 단위 + 점진적 JSON 파싱) ==========
+class IncrementalJSONParser:
+    """
+    스트리밍으로 들어오는 JSON 텍스트를 한 글자씩 훑으며, 값이 닫히는 즉시 (경로, 값)을 내보냄
+    예: styles 배열의 i번째 항목이 닫히면 (("styles", i), {...}),
+        translation 문자열이 닫히면 (("translation",), "...")
+    루트 객체가 닫히면 ((), 전체 dict)가 마지막 이벤트로 나오며 result에 저장됨
+    첫 '{' 또는 '[' 이전의 텍스트(```json 등)는 무시
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.scalar_start = None
+        self.done = False
+        self.result = None
+
+    def _path(self) -> tuple:
+        path = []
+        for frame in self.stack:
+            path.append(frame["key"] if frame["type"] == "obj" else frame["index"])
+        return tuple(path)
+
+    def _emit(self, events: list, value):
+        events.append((self._path(), value))
+
+    def feed(self, chunk: str) -> list:
+        """텍스트 조각을 추가하고 새로 완성된 (경로, 값) 목록 반환"""
+        events = []
+        if self.done:
+            return events
+        self.buf += chunk
+        buf = self.buf
+        i = self.pos
+        while i < len(buf):
+            c = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    value = json.loads(buf[self.string_start:i + 1])
+                    frame = self.stack[-1]
+                    if frame["type"] == "obj" and frame["expect"] == "key":
+                        frame["key"] = value
+                        frame["expect"] = "colon"
+                    else:
+                        self._emit(events, value)
+                i += 1
+                continue
+
+            if self.scalar_start is not None and (c in ",}]" or c.isspace()):
+                self._emit(events, json.loads(buf[self.scalar_start:i]))
+                self.scalar_start = None
+
+            if not self.stack:
+                if c in "{[":
+                    self.stack.append({"type": "obj" if c == "{" else "arr", "start": i, "key": None, "index": 0, "expect": "key"})
+                i += 1
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+            elif c in "{[":
+                self.stack.append({"type": "obj" if c == "{" else "arr", "start": i, "key": None, "index": 0, "expect": "key"})
+            elif c in "}]":
+                frame = self.stack.pop()
+                value = json.loads(buf[frame["start"]:i + 1])
+                self._emit(events, value)
+                if not self.stack:
+                    self.done = True
+                    self.result = value
+                    self.pos = i + 1
+                    return events
+            elif c == ":":
+                self.stack[-1]["expect"] = "value"
+            elif c == ",":
+                frame = self.stack[-1]
+                if frame["type"] == "obj":
+                    frame["expect"] = "key"
+                    frame["key"] = None
+                else:
+                    frame["index"] += 1
+            elif not c.isspace() and self.scalar_start is None:
+                self.scalar_start = i
+            i += 1
+        self.pos = i
+        return events
+
+
+async def _collect_stream(stream, on_event) -> SimpleNamespace:
+    """스트림 조각을 모으며 닫힌 JSON 필드마다 on_event(경로, 값) 호출 → 일반 응답과 같은 모양"""
+    parser = IncrementalJSONParser()
+    parts = []
+    last = None
+    async for chunk in stream:
+        last = chunk
+        text = getattr(chunk, "text", "") or ""
+        if text:
+            parts.append(text)
+            for path, value in parser.feed(text):
+                if path:
+                    on_event(path, value)
+    return SimpleNamespace(
+        text="".join(parts),
+        usage_metadata=getattr(last, "usage_metadata", None),
+        candidates=getattr(last, "candidates", None),
+    )
+
+
+async def ask_gemini_stream(prompt: str, model: str = None, gen_config: dict = None, node: str = "default"):
+    """Gemini 스트리밍 호출 → 텍스트 조각(토큰)을 도착 즉시 yield"""
+    backend = get_llm_backend()
+    target_model = resolve_model(node, model)
+    config = _node_config(node, gen_config)
+
+    try:
+        async with (
+            _guard("gemini", target_model, ignore=(genai_errors.ClientError, ValueError)),
+            _gemini_slot_limiter().slot(_estimate_prompt_tokens(prompt), node),
+        ):
+            stream = backend.generate_stream(target_model, prompt, config)
+            last = None
+            try:
+                async for chunk in stream:
+                    last = chunk
+                    text = getattr(chunk, "text", "") or ""
+                    if text:
+                        yield text
+            except Exception as e:
+                raise _as_rate_limited(e) from e
+            if last is not None:
+                _record_usage(last)
+                _record_truncation(last, node, config)
+    except CircuitOpenError as e:
+        _record_skip(node, e)
+        raise
     except Exception as e:
         raise Exception(f"Gemini API 오류: {str(e)}")
 
 
+def _restore_event(path: tuple, value, keys: dict) -> tuple:
+    """스트리밍 이벤트의 짧은 키(OUTPUT_SCHEMAS keys)를 경로와 값 모두 원래 키로 복원"""
+    def _value(v):
+        if isinstance(v, dict):
+            return {keys.get(k, k): _value(x) for k, x in v.items()}
+        if isinstance(v, list):
+            return [_value(x) for x in v]
+        return v
+
+    return tuple(keys.get(p, p) if isinstance(p, str) else p for p in path), _value(value)
+
+
+async def ask_gemini_stream_json(
+    prompt: str,
+    model: str = None,
+    use_cache: bool = None,
+    gen_config: dict = None,
+    node: str = "default",
+    journal: dict = None,
+    schema: dict = None,
+    accept=None,
+):
+    """
+    스트리밍 + 점진적 JSON 파싱: 필드가 닫힐 때마다 (경로, 값)을 yield, 마지막 이벤트는 ((), 전체 dict)
+    생성은 ask_gemini(on_event=)와 같은 경로 (캐시, single-flight, 헤징, 시간 초과 대체, 재요청, 승격)
+    캐시 적중이나 다른 호출의 결과를 함께 기다려 스트리밍 이벤트가 없었으면 최종 결과를 같은 순서로 재생
+    경로와 값의 짧은 키는 OUTPUT_SCHEMAS[node]["keys"]로 원래 키로 복원해서 내보냄
+    """
+    keys = OUTPUT_SCHEMAS.get(node, {}).get("keys", {})
+    queue = asyncio.Queue()
+    task = asyncio.ensure_future(
+        ask_gemini(prompt, model, use_cache, gen_config, node, journal, schema, accept, on_event=lambda *e: queue.put_nowait(e))
+    )
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    streamed = False
+    try:
+        while (event := await queue.get()) is not None:
+            streamed = True
+            yield _restore_event(*event, keys)
+        result = task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
+    if not streamed:
+        for path, value in IncrementalJSONParser().feed(json.dumps(result, ensure_ascii=False)):
+            if path:
+                yield _restore_event(path, value, keys)
+    yield _restore_event((), result, keys)
+
+
 # ========== Semantic Scholar (선택적) ==========
 SS_BASE = "https://api.semanticscholar.org/graph/v1"
 SS_FIELDS = "title,authors,year,citationCount,venue,abstract,url,externalIds"
 
 
-async def search_papers(query: str) -> list:
+class _SemanticScholarClientManager:
+    """Semantic Scholar 공용 httpx 클라이언트 (모든 SS 엔드포인트가 공유)
+
+    - keep-alive 커넥션 풀을 재사용하여 호출마다 TCP/TLS 핸드셰이크를 하지 않음
+    - 풀 크기/keep-alive/HTTP2 설정(ss_max_connections, ss_keepalive_expiry, ss_http2)이 바뀌거나
+      다른 이벤트 루프에서 호출되면 재생성
+    """
+
+    def __init__(self):
+        self._client = None
+        self._signature = None
+        self._loop = None
+        self._lock = None
+
+    @staticmethod
+    def _options() -> tuple:
+        settings = get_settings()
+        try:
+            connections = max(1, int(settings.get("ss_max_connections", 4)))
+        except (TypeError, ValueError):
+            connections = 4
+        http2 = bool(settings.get("ss_http2", False))
+        if http2:
+            try:
+                import h2  # noqa: F401  (httpx[http2] 선택 의존성)
+            except ImportError:
+                logger.debug("h2 패키지가 없어 Semantic Scholar HTTP/2를 사용하지 않습니다.")
+                http2 = False
+        return connections, settings.get("ss_keepalive_expiry", 60), http2
+
+    def _build(self, options: tuple) -> httpx.AsyncClient:
+        connections, keepalive_expiry, http2 = options
+        return httpx.AsyncClient(
+            base_url=SS_BASE,
+            timeout=15,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+
+    async def get(self) -> httpx.AsyncClient:
+        options = self._options()
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._signature == options and self._loop is loop:
+            return self._client
+
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._client is None or self._signature != options or self._loop is not loop:
+                old, old_loop = self._client, self._loop
+                self._client = self._build(options)
+                self._signature = options
+                self._loop = loop
+                # 다른 루프에서 만든 클라이언트의 커넥션은 그 루프와 함께 사라지므로 닫지 않음
+                if old is not None and old_loop is loop:
+                    try:
+                        await old.aclose()
+                    except Exception as e:
+                        logger.debug(f"이전 Semantic Scholar 클라이언트 종료 실패: {e}")
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            try:
+                if self._loop is asyncio.get_running_loop():
+                    await self._client.aclose()
+            finally:
+                self._client = None
+                self._signature = None
+
+
+_ss_client = _SemanticScholarClientManager()
+
+
+async def _ss_request(method: str, path: str, api_key: str = "", **kwargs) -> httpx.Response:
+    """
+    Semantic Scholar 요청 공통 경로 (공용 커넥션 풀 + 회로 차단기 + 속도 제한 + 429 재시도)
+    path는 SS_BASE 기준 상대 경로 (예: "/paper/search", "/paper/batch")
+    """
+    headers = kwargs.pop("headers", {})
+    if api_key:
+        headers["x-api-key"] = api_key
+    client = await _ss_client.get()
+
+    async def _send():
+        resp = await client.request(method, path, headers=headers, **kwargs)
+        if resp.status_code == 429:
+            raise RateLimitedError(
+                "Semantic Scholar 429",
+                parse_retry_after(resp.headers.get("Retry-After")),
+            )
+        if resp.status_code >= 500:
+            resp.raise_for_status()
+        return resp
+
+    try:
+        async with _guard("semantic_scholar", path):
+            return await _ss_slot_limiter().run(_send)
+    except CircuitOpenError as e:
+        _record_skip("refs", e)
+        raise
+
+
+async def close_semantic_scholar():
+    """Semantic Scholar 커넥션 풀 정리"""
+    await _ss_client.aclose()
+
+
+async def close_clients():
+    """앱 종료 시 외부 API 커넥션을 모두 정리 (main.App 창 닫기에서 호출)"""
+    try:
+        await close_gemini()
+    except Exception as e:
+        logger.debug(f"Gemini 클라이언트 정리 실패: {e}")
+    await close_semantic_scholar()
+
+
+class _PaperCache:
+    """Semantic Scholar 검색 결과 캐시 (SQLite, 재시작 후에도 유지)
+
+    - queries / query_papers: 정규화된 검색어 → 결과 paperId 목록 (ss_cache_ttl_hours 지나면 stale)
+    - papers: paperId → SS_FIELDS 전체 응답 (DOI 색인 포함, 이후 배치 조회 등에서도 재사용)
+    인용수 필터/개수 제한은 읽을 때 적용하므로 설정이 달라도 같은 검색 결과를 공유
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(
+                """CREATE TABLE IF NOT EXISTS queries (
+                    key TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS query_papers (
+                    key TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    paper_id TEXT NOT NULL,
+                    PRIMARY KEY (key, rank)
+                );
+                CREATE TABLE IF NOT EXISTS papers (
+                    paper_id TEXT PRIMARY KEY,
+                    doi TEXT,
+                    payload TEXT NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_queries_accessed ON queries(accessed);
+                CREATE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi);"""
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def get_query(self, key: str) -> tuple[list, bool] | None:
+        """(논문 응답 목록, stale 여부), 없으면 None"""
+        ttl_hours = get_settings().get("ss_cache_ttl_hours", 168) or 0
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT created FROM queries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            rows = db.execute(
+                "SELECT p.payload FROM query_papers q JOIN papers p ON p.paper_id = q.paper_id "
+                "WHERE q.key = ? ORDER BY q.rank",
+                (key,),
+            ).fetchall()
+            db.execute("UPDATE queries SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+            stale = ttl_hours > 0 and now - row[0] > ttl_hours * 3600
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        return [json.loads(r[0]) for r in rows], stale
+
+    def put_query(self, key: str, query: str, papers: list):
+        max_queries = get_settings().get("ss_cache_max_queries", 1000)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            self._put_papers(db, papers, now)
+            db.execute(
+                "INSERT OR REPLACE INTO queries (key, query, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, query, now, now),
+            )
+            db.execute("DELETE FROM query_papers WHERE key = ?", (key,))
+            db.executemany(
+                "INSERT INTO query_papers (key, rank, paper_id) VALUES (?, ?, ?)",
+                [(key, rank, p["paperId"]) for rank, p in enumerate(papers) if p.get("paperId")],
+            )
+            count = db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+            if max_queries and count > max_queries:
+                db.execute(
+                    "DELETE FROM queries WHERE key IN (SELECT key FROM queries ORDER BY accessed ASC LIMIT ?)",
+                    (count - max_queries,),
+                )
+                db.execute("DELETE FROM query_papers WHERE key NOT IN (SELECT key FROM queries)")
+                db.execute("DELETE FROM papers WHERE paper_id NOT IN (SELECT paper_id FROM query_papers)")
+            db.commit()
+
+    @staticmethod
+    def _put_papers(db: sqlite3.Connection, papers: list, now: float):
+        db.executemany(
+            "INSERT OR REPLACE INTO papers (paper_id, doi, payload, updated) VALUES (?, ?, ?, ?)",
+            [
+                (
+                    p["paperId"],
+                    ((p.get("externalIds") or {}).get("DOI") or "").lower() or None,
+                    json.dumps(p, ensure_ascii=False),
+                    now,
+                )
+                for p in papers
+                if p.get("paperId")
+            ],
+        )
+
+    def get_paper(self, paper_id: str = None, doi: str = None) -> dict | None:
+        """paperId 또는 DOI로 저장된 논문 응답 조회"""
+        with self._lock:
+            db = self._db()
+            if paper_id:
+                row = db.execute("SELECT payload FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+            elif doi:
+                row = db.execute("SELECT payload FROM papers WHERE doi = ?", (doi.lower(),)).fetchone()
+            else:
+                row = None
+        return json.loads(row[0]) if row else None
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.executescript("DELETE FROM queries; DELETE FROM query_papers; DELETE FROM papers;")
+            db.commit()
+        self.hits = self.stale_hits = self.misses = self.refreshes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._db()
+            queries = db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+            papers = db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+        served = self.hits + self.stale_hits
+        total = served + self.misses
+        return {
+            "queries": queries,
+            "papers": papers,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_rate": served / total if total else 0.0,
+        }
+
+
+_paper_cache = _PaperCache(SS_CACHE_FILE)
+_ss_refreshing = set()  # 백그라운드 갱신 중인 검색어 키 (중복 방지)
+_ss_background = set()  # 백그라운드 태스크 참조 유지 (가비지 컬렉션 방지)
+
+
+def get_ss_cache_stats() -> dict:
+    """Semantic Scholar 캐시 적중률 (stale 응답도 적중으로 계산)"""
+    return _paper_cache.stats()
+
+
+def get_cached_paper(paper_id: str = None, doi: str = None) -> dict | None:
+    """캐시에 저장된 논문 메타데이터 (SS_FIELDS 원본 응답)"""
+    return _paper_cache.get_paper(paper_id, doi)
+
+
+def clear_ss_cache():
+    _paper_cache.clear()
+
+
+async def search_papers(query: str | list) -> list:
     """
     참고문헌 검색 - 설정에서 ON일 때만 호출됨
+    query에 검색어 여러 개(list)를 주면 동시에 검색하고, paperId/DOI 기준으로 합친 뒤
+    관련도(검색 순위)+인용수 점수로 정렬하여 ss_min_citations/ss_result_limit을 한 번만 적용
+    전체가 ss_search_deadline_seconds 안에 끝나도록 늦은 검색은 기다리지 않음 (결과는 캐시에 저장됨)
+    캐시에 있으면 바로 응답하고, 만료(stale)된 항목은 백그라운드에서 새로 받아 갱신
+    reference_sources에 따라 로컬 라이브러리 색인(refindex) 결과도 함께 합침
     """
     settings = get_settings()
 
@@ -106,63 +1661,209 @@ async def search_papers(query: str) -> list:
     min_citations = settings.get("ss_min_citations", 30)
     limit = settings.get("ss_result_limit", 3)
 
-    headers = {}
-    if api_key:
-        headers["x-api-key"] = api_key
+    queries = [query] if isinstance(query, str) else list(query)
+    queries = [q for q in dict.fromkeys(q.strip() for q in queries) if q]
+    if not queries:
+        return []
+
+    # 로컬 색인은 검색어마다 ms 단위라 API 검색과 함께 같은 마감 시간 안에서 실행
+    sources = settings.get("reference_sources", "both")
+    tasks = []
+    if sources in ("api", "both"):
+        tasks += [asyncio.ensure_future(_query_papers(q, api_key, settings)) for q in queries]
+    if sources in ("local", "both"):
+        tasks += [asyncio.ensure_future(_query_local(q)) for q in queries]
+    if not tasks:
+        return []
+    deadline = settings.get("ss_search_deadline_seconds", 6) or None
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    if pending:
+        logger.info(f"참고문헌 검색 마감 시간 초과: {len(pending)}/{len(tasks)}개 검색어는 결과 없이 진행")
+        # 취소하지 않고 계속 실행시켜 결과를 캐시에 남김 (다음 분석에서 적중)
+        for task in pending:
+            _ss_background.add(task)
+            task.add_done_callback(_ss_background.discard)
+
+    # 입력 순서(넓은 검색어 먼저)대로 합침
+    results = [t.result() for t in tasks if t in done and not t.cancelled() and t.exception() is None]
+    return _select_papers(_merge_results(results, settings), min_citations, limit)
 
+
+async def _query_papers(query: str, api_key: str, settings: dict) -> list:
+    """검색어 하나 → 논문 응답 목록 (캐시 우선, 실패 시 빈 목록)"""
+    caching = settings.get("ss_cache_enabled", True)
+    key = _paper_cache.make_key(query)
+    if caching and cache_enabled_var.get():
+        cached = _paper_cache.get_query(key)
+        if cached is not None:
+            papers, stale = cached
+            if stale:
+                _refresh_in_background(key, query, api_key)
+            return papers
+
+    papers = await _fetch_search(key, query, api_key)
+    if papers is None:
+        return []
+    if caching:
+        _paper_cache.put_query(key, query, papers)
+    return papers
+
+
+async def _query_local(query: str) -> list:
+    """검색어 하나 → 로컬 색인 BM25 결과 (Semantic Scholar 응답과 같은 모양, 실패 시 빈 목록)"""
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            resp = await client.get(
-                f"{SS_BASE}/paper/search",
-                params={"query": query, "limit": 20, "fields": SS_FIELDS},
-                headers=headers,
-            )
+        return await asyncio.to_thread(get_reference_index().search, query, 20)
+    except sqlite3.Error as e:
+        logger.warning(f"로컬 참고문헌 색인 검색 실패: {e}")
+        return []
 
-            if resp.status_code != 200:
-                return []
-
-            papers = resp.json().get("data", [])
-
-            # 인용수 필터 + 정렬
-            filtered = [p for p in papers if p.get("citationCount", 0) >= min_citations]
-            filtered.sort(key=lambda x: x.get("citationCount", 0), reverse=True)
-
-            results = []
-            for p in filtered[:limit]:
-                authors = p.get("authors", [])
-                author_str = ", ".join([a["name"] for a in authors[:3]])
-                if len(authors) > 3:
-                    author_str += " et al."
-
-                ext_ids = p.get("externalIds", {})
-                doi = ext_ids.get("DOI", "")
-
-                results.append(
-                    {
-                        "title": p.get("title", ""),
-                        "authors": author_str,
-                        "year": p.get("year", ""),
-                        "venue": p.get("venue", ""),
-                        "citations": p.get("citationCount", 0),
-                        "doi": doi,
-                        "doi_url": f"https://doi.org/{doi}" if doi else "",
-                        "ss_url": p.get("url", ""),
-                        "abstract": (p.get("abstract", "") or "")[:200],
-                        "apa": f"{author_str} ({p.get('year', '')}). {p.get('title', '')}. {p.get('venue', '')}."
-                        + (f" https://doi.org/{doi}" if doi else ""),
-                        "bibtex": _make_bibtex(p, doi),
-                    }
-                )
 
-            return results
+async def refresh_reference_index() -> dict | None:
+    """설정의 reference_libraries 중 바뀐 파일만 다시 색인 (main.App 시작 시 백그라운드 실행)"""
+    libraries = get_settings().get("reference_libraries") or []
+    if not libraries:
+        return None
+    try:
+        summary = await asyncio.to_thread(get_reference_index().update, libraries, True)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"로컬 참고문헌 색인 갱신 실패: {e}")
+        return None
+    if summary["indexed"] or summary["removed"]:
+        logger.info(f"로컬 참고문헌 색인 갱신: {summary}")
+    return summary
+
+
+def _paper_identity(p: dict) -> str:
+    doi = ((p.get("externalIds") or {}).get("DOI") or "").lower()
+    if doi:
+        return f"doi:{doi}"
+    if p.get("paperId"):
+        return f"id:{p['paperId']}"
+    return "title:" + " ".join((p.get("title") or "").lower().split())
+
+
+def _merge_results(results: list, settings: dict) -> list:
+    """
+    검색어별 결과 목록을 paperId/DOI 기준으로 합치고 점수 순으로 정렬
+    점수 = w × 관련도(검색어별 순위의 역수 합, 정규화) + (1-w) × log 인용수(정규화), w = ss_relevance_weight
+    """
+    relevance = defaultdict(float)
+    papers = {}
+    for papers_for_query in results:
+        for rank, p in enumerate(papers_for_query):
+            identity = _paper_identity(p)
+            papers.setdefault(identity, p)
+            relevance[identity] += 1.0 / (rank + 1)
+    if not papers:
+        return []
+
+    weight = settings.get("ss_relevance_weight", 0.6)
+    top_relevance = max(relevance.values())
+    top_citations = max(math.log1p(p.get("citationCount") or 0) for p in papers.values()) or 1.0
+
+    def _score(identity: str) -> float:
+        citations = math.log1p(papers[identity].get("citationCount") or 0) / top_citations
+        return weight * relevance[identity] / top_relevance + (1 - weight) * citations
+
+    return [papers[i] for i in sorted(papers, key=_score, reverse=True)]
+
+
+def _refresh_in_background(key: str, query: str, api_key: str):
+    if key in _ss_refreshing:
+        return
+
+    async def _refresh():
+        try:
+            papers = await _fetch_search(key, query, api_key)
+            if papers is not None:
+                _paper_cache.put_query(key, query, papers)
+                _paper_cache.refreshes += 1
+        finally:
+            _ss_refreshing.discard(key)
+
+    def _done(task: asyncio.Task):
+        _ss_background.discard(task)
+        # 기다리는 호출자가 없으므로 여기서 예외를 소비하고 기록 ("exception was never retrieved" 방지)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Semantic Scholar 백그라운드 갱신 실패 ({query!r}): {task.exception()}")
+
+    _ss_refreshing.add(key)
+    task = asyncio.get_running_loop().create_task(_refresh())
+    _ss_background.add(task)
+    task.add_done_callback(_done)
+
+
+async def _fetch_search(key: str, query: str, api_key: str) -> list | None:
+    """검색 API 호출 (동일 검색어는 합침) → 논문 응답 목록, 실패 시 None"""
+    flight_key = json.dumps([key, bool(api_key)], ensure_ascii=False)
+    return await _ss_flight.do(flight_key, lambda: _search_papers(query, api_key))
+
+
+async def _search_papers(query: str, api_key: str) -> list | None:
+    try:
+        resp = await _ss_request(
+            "GET",
+            "/paper/search",
+            api_key,
+            params={"query": query, "limit": 20, "fields": SS_FIELDS},
+        )
+
+        if resp.status_code != 200:
+            return None
+
+        return resp.json().get("data", []) or []
+    except CircuitOpenError:
+        # 회로 차단 중에는 바로 포기 (skipped_calls_var에 기록됨)
+        return None
+    except RateLimitedError as e:
+        print(f"SS API Rate limit (재시도 후에도 429): {e}")
+        return None
     except httpx.HTTPStatusError as e:
-        if e.response.status_code == 429:
-            return []  # Rate limit - 조용히 실패
         print(f"SS API HTTP Error: {e}")
-        return []
+        return None
     except Exception as e:
         print(f"SS API Error: {e}")
-        return []
+        return None
+
+
+def _select_papers(papers: list, min_citations: int, limit: int) -> list:
+    """
+    (정렬된) 논문 목록에 인용수 필터를 적용하고 상위 limit개를 참고문헌 항목으로 변환
+    인용수를 모르는 로컬 라이브러리 논문(citationCount=None)은 사용자가 모아 둔 것이므로 필터하지 않음
+    """
+    filtered = [
+        p for p in papers
+        if (p.get("source") == "local" and p.get("citationCount") is None)
+        or (p.get("citationCount") or 0) >= min_citations
+    ]
+    return [_format_paper(p) for p in filtered[:limit]]
+
+
+def _format_paper(p: dict) -> dict:
+    """Semantic Scholar 논문 응답(SS_FIELDS) 또는 로컬 색인 결과 → 참고문헌 항목"""
+    authors = p.get("authors", [])
+    author_str = ", ".join([a["name"] for a in authors[:3]])
+    if len(authors) > 3:
+        author_str += " et al."
+
+    ext_ids = p.get("externalIds", {})
+    doi = ext_ids.get("DOI", "")
+
+    return {
+        "title": p.get("title", ""),
+        "authors": author_str,
+        "year": p.get("year", ""),
+        "venue": p.get("venue", ""),
+        "citations": p.get("citationCount") if p.get("source") == "local" else p.get("citationCount", 0),
+        "doi": doi,
+        "doi_url": f"https://doi.org/{doi}" if doi else "",
+        "ss_url": p.get("url", ""),
+        "abstract": (p.get("abstract", "") or "")[:200],
+        "apa": f"{author_str} ({p.get('year', '')}). {p.get('title', '')}. {p.get('venue', '')}."
+        + (f" https://doi.org/{doi}" if doi else ""),
+        "bibtex": p.get("bibtex") or _make_bibtex(p, doi),
+        "source": p.get("source", "semantic_scholar"),
+    }
 
 
 def _make_bibtex(p: dict, doi: str) -> str:
@@ -1,175 +1,892 @@
-"""JSON 저장소 관리"""
+"""로컬 저장소 관리 (설정, 저널 카탈로그, 히스토리)"""
+import atexit
+import contextlib
+import copy
+import hashlib
 import json
 import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import Future
 from datetime import datetime
-from config import DATA_DIR, JOURNALS_FILE, SETTINGS_FILE, HISTORY_FILE, DEFAULT_SETTINGS
+from types import MappingProxyType
+from config import (
+    DATA_DIR,
+    DEFAULT_SETTINGS,
+    HISTORY_DB_FILE,
+    HISTORY_FILE,
+    JOURNAL_INDEX_FILE,
+    JOURNALS_DIR,
+    JOURNALS_FILE,
+    LOCK_FILE,
+    SETTINGS_FILE,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 def _ensure_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-# ========== 설정 ==========
-def get_settings() -> dict:
+# ========== 백그라운드 쓰기 (write-behind) ==========
+# 모든 저장은 한 개의 쓰기 스레드가 처리하고 호출자는 Future를 받음 (기다리려면 asyncio.wrap_future, 아니면 무시)
+# - 같은 파일에 대한 쓰기가 아직 대기 중이면 마지막 내용만 씀 (연속 저장을 한 번으로 합침)
+# - 파일은 임시 파일 + fsync + 원자적 교체로 써서, 쓰는 도중 중단돼도 이전 파일이 남음
+# - 한 묶음을 쓰는 동안 data/.lock 파일 잠금을 잡아 배치 실행기와 UI가 data/를 함께 써도 안전
+# - 대기 중인 파일 내용은 _read_json_file이 바로 돌려주므로 저장 직후 읽어도 새 내용을 봄
+_WRITE_BEHIND_DELAY = 0.05  # 첫 쓰기 후 이만큼 기다렸다가 모인 쓰기를 한 번에 처리
+_REMOVED = object()
+
+
+_lock_owner = threading.local()
+
+
+@contextlib.contextmanager
+def _interprocess_lock():
+    """
+    data/ 쓰기용 프로세스 간 배타 잠금 (POSIX fcntl / Windows msvcrt)
+    같은 스레드에서 다시 잡으면 그대로 통과 (쓰기 스레드가 잠금을 잡은 채 히스토리 DB를 처음 열 때 등)
+    """
+    if getattr(_lock_owner, "held", False):
+        yield
+        return
     _ensure_dir()
-    if not os.path.exists(SETTINGS_FILE):
-        save_settings(DEFAULT_SETTINGS)
-    with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-        settings = json.load(f)
+    with open(LOCK_FILE, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK은 10초 재시도 후 실패하므로 다른 프로세스가 놓을 때까지 계속 시도
+                    time.sleep(0.05)
+        _lock_owner.held = True
+        try:
+            yield
+        finally:
+            _lock_owner.held = False
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _atomic_write_text(path: str, text: str):
+    """임시 파일에 쓰고 fsync 후 원자적으로 교체"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    if os.name != "nt":
+        # 이름 교체 자체도 디스크에 남도록 디렉터리 fsync
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class _WriteBehind:
+    def __init__(self, delay: float = _WRITE_BEHIND_DELAY):
+        self.delay = delay
+        self._pending = {}  # key → 작업 (입력 순서대로 실행)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._seq = 0
+
+    def submit(self, fn, key=None, value=None) -> Future:
+        """
+        fn을 쓰기 스레드에서 실행 → Future(fn의 반환값)
+        key가 같은 작업이 아직 시작 전이면 그 자리에서 fn/value만 교체 (Future도 공유)
+        value는 대기 중인 내용 (pending()으로 조회)
+        """
+        with self._cond:
+            if key is None:
+                self._seq += 1
+                key = ("seq", self._seq)
+            job = self._pending.get(key)
+            if job is not None and not job["started"]:
+                job["fn"], job["value"] = fn, value
+            else:
+                job = {"fn": fn, "value": value, "future": Future(), "started": False}
+                self._pending[key] = job
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return job["future"]
+
+    def pending(self, key):
+        """아직 디스크에 반영되지 않은 key의 value (없으면 None)"""
+        with self._cond:
+            job = self._pending.get(key)
+            return job["value"] if job is not None else None
+
+    def flush(self, timeout: float = None) -> bool:
+        """대기 중인 쓰기가 모두 끝날 때까지 기다림 → 다 끝났으면 True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.delay)
+            with self._cond:
+                batch = list(self._pending.items())
+                for _, job in batch:
+                    job["started"] = True
+            try:
+                with _interprocess_lock():
+                    for key, job in batch:
+                        try:
+                            result = job["fn"]()
+                        except Exception as e:
+                            print(f"저장 오류 ({key}): {e}")
+                            job["future"].set_exception(e)
+                        else:
+                            job["future"].set_result(result)
+                        self._done(key, job)
+            except Exception as e:
+                # 잠금 획득/해제 실패 → 남은 작업을 실패로 끝내고 스레드는 계속 실행
+                print(f"저장 잠금 오류: {e}")
+                for key, job in batch:
+                    if not job["future"].done():
+                        job["future"].set_exception(e)
+                    self._done(key, job)
+
+    def _done(self, key, job):
+        with self._cond:
+            if self._pending.get(key) is job:
+                del self._pending[key]
+            self._cond.notify_all()
 
-    # 새 필드가 추가된 경우 기본값으로 채워서 저장
-    changed = False
+
+_writer = _WriteBehind()
+
+
+def _write_json_later(path: str, data, indent=None, on_done=None) -> Future:
+    """JSON 파일 쓰기 예약 (내용은 지금 직렬화하므로 호출 후 data를 바꿔도 됨)"""
+    text = json.dumps(data, ensure_ascii=False, indent=indent)
+
+    def _write():
+        _atomic_write_text(path, text)
+        if on_done is not None:
+            on_done()
+
+    return _writer.submit(_write, key=("file", os.path.abspath(path)), value=text)
+
+
+def _remove_later(path: str) -> Future:
+    def _remove():
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+    return _writer.submit(_remove, key=("file", os.path.abspath(path)), value=_REMOVED)
+
+
+def _write_pending(path: str) -> bool:
+    return _writer.pending(("file", os.path.abspath(path))) is not None
+
+
+def _read_json_file(path: str):
+    """JSON 파일 읽기 (쓰기 대기 중이면 대기 중인 내용)"""
+    pending = _writer.pending(("file", os.path.abspath(path)))
+    if pending is _REMOVED:
+        raise FileNotFoundError(path)
+    if pending is not None:
+        return json.loads(pending)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def flush_writes(timeout: float = None) -> bool:
+    """대기 중인 저장을 모두 디스크에 반영 (앱 종료, 배치 실행 끝에서 호출)"""
+    return _writer.flush(timeout)
+
+
+atexit.register(flush_writes, 10)
+
+
+# ========== 설정 ==========
+# 프로세스 전체에서 한 번 읽어 메모리에 두고, 파일이 바뀐 경우(mtime/크기)에만 다시 읽음
+# 핫 패스에서는 최대 _SETTINGS_CHECK_INTERVAL초에 한 번 stat만 하고, 읽기는 절대 파일에 쓰지 않음
+_SETTINGS_CHECK_INTERVAL = 1.0
+_settings_lock = threading.RLock()
+_settings_cache = None  # 읽기 전용 뷰 (_freeze) — get_settings가 복사 없이 그대로 반환
+_settings_signature = None
+_settings_checked = 0.0
+_settings_subscribers = []
+
+
+def _settings_file_signature():
+    try:
+        stat = os.stat(SETTINGS_FILE)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _with_defaults(settings: dict) -> dict:
+    """새 필드가 추가된 경우 기본값으로 채움 (메모리에서만, 파일은 save_settings 때 기록)"""
+    settings = dict(settings)
     for key, value in DEFAULT_SETTINGS.items():
         if key not in settings:
-            settings[key] = value
-            changed = True
-    if changed:
-        save_settings(settings)
+            settings[key] = copy.deepcopy(value)
     return settings
 
 
-def save_settings(settings: dict):
-    _ensure_dir()
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(settings, f, ensure_ascii=False, indent=2)
+def _freeze(value):
+    """읽기 전용 뷰: dict → MappingProxyType, list → tuple (중첩 값까지)"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    """_freeze의 반대: 고쳐 쓸 수 있는 dict/list 깊은 복사본 (JSON 직렬화 가능)"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _notify_settings(settings):
+    for callback in list(_settings_subscribers):
+        try:
+            callback(_thaw(settings))
+        except Exception as e:
+            print(f"설정 변경 알림 오류: {e}")
 
 
-def update_setting(key: str, value):
-    settings = get_settings()
-    settings[key] = value
-    save_settings(settings)
+def get_settings() -> MappingProxyType:
+    """
+    현재 설정 (프로세스 공용 캐시의 읽기 전용 뷰 — 호출마다 복사하지 않음)
+    model_routes 같은 중첩 값도 읽기 전용(dict → 매핑 뷰, list → tuple)이므로
+    바꾸려면 update_settings를 쓰거나 dict({**get_settings(), ...})로 새로 만들어 save_settings에 넘김
+    """
+    global _settings_cache, _settings_signature, _settings_checked
+    now = time.monotonic()
+    if _settings_cache is not None and now - _settings_checked < _SETTINGS_CHECK_INTERVAL:
+        return _settings_cache
+
+    changed = None
+    with _settings_lock:
+        signature = _settings_file_signature()
+        _settings_checked = now
+        # 이 프로세스의 저장이 아직 대기 중이면 디스크가 캐시보다 오래된 것이므로 다시 읽지 않음
+        if _settings_cache is None or (signature != _settings_signature and not _write_pending(SETTINGS_FILE)):
+            try:
+                if signature is None:
+                    loaded = {}
+                else:
+                    loaded = _read_json_file(SETTINGS_FILE)
+            except (json.JSONDecodeError, IOError) as e:
+                # 다른 프로세스가 쓰는 중일 수 있음: 기존 캐시를 유지하고 다음 확인 때 다시 읽음
+                if _settings_cache is None:
+                    raise
+                print(f"설정 파일 로드 오류 (이전 설정 유지): {e}")
+            else:
+                previous = _settings_cache
+                _settings_cache = _freeze(_with_defaults(loaded))
+                _settings_signature = signature
+                if previous is not None and previous != _settings_cache:
+                    changed = _settings_cache
+        settings = _settings_cache
+    if changed is not None:
+        _notify_settings(changed)
+    return settings
+
+
+def _settings_written():
+    # 쓰기 스레드에서 파일 잠금을 잡은 채 호출되므로 다른 잠금은 잡지 않음 (대입만)
+    global _settings_signature
+    _settings_signature = _settings_file_signature()
+
+
+def save_settings(settings) -> Future:
+    """
+    설정 저장 (설정 파일을 쓰는 유일한 경로)
+    캐시는 바로 갱신하고 구독자에게 알린 뒤, 파일 쓰기는 백그라운드에서 처리 → 쓰기 완료 Future
+    넘긴 값은 깊은 복사해 두므로 저장 후 호출자가 고쳐도 캐시에는 영향 없음
+    """
+    global _settings_cache
+    settings = _thaw(settings)
+    with _settings_lock:
+        previous = _settings_cache
+        _settings_cache = _freeze(_with_defaults(settings))
+        current = _settings_cache
+        future = _write_json_later(SETTINGS_FILE, settings, indent=2, on_done=_settings_written)
+    if previous != current:
+        _notify_settings(current)
+    return future
+
+
+def update_setting(key: str, value) -> Future:
+    return update_settings({key: value})
+
+
+def update_settings(values: dict) -> Future:
+    """여러 설정을 한 번에 변경 (파일 쓰기 1회)"""
+    with _settings_lock:
+        return save_settings({**get_settings(), **values})
+
+
+def subscribe_settings(callback):
+    """설정이 바뀌면(save_settings 또는 파일 외부 수정 감지) callback(새 설정)을 호출"""
+    if callback not in _settings_subscribers:
+        _settings_subscribers.append(callback)
+
+
+def unsubscribe_settings(callback):
+    if callback in _settings_subscribers:
+        _settings_subscribers.remove(callback)
 
 
 # ========== 저널 ==========
-def get_journals() -> list:
-    """저널 목록을 JSON 파일에서 로드"""
-    _ensure_dir()
+# 카탈로그 형식: data/journals/index.json(이름, 전체 이름, 키워드만 담은 가벼운 색인)
+# + data/journals/<해시>.json(Aims & Scope, 생성된 프롬프트 등 전체 레코드, 필요할 때만 로드)
+# 예전 단일 파일(journals.json)은 처음 사용할 때(또는 파일이 교체되면) 카탈로그로 옮겨 옴
+_JOURNAL_INDEX_FIELDS = ("name", "full_name", "keywords")
+_journal_lock = threading.RLock()
+_journal_index = None  # 이름 → 색인 항목 (삽입 순서 = 목록 순서)
+_journal_index_signature = None
+
+
+def _journal_blob_path(blob: str) -> str:
+    return os.path.join(JOURNALS_DIR, blob)
+
+
+def _journal_blob_name(name: str) -> str:
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:20] + ".json"
+
+
+def _file_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _index_entry(journal: dict) -> dict:
+    entry = {key: journal.get(key, "" if key != "keywords" else []) for key in _JOURNAL_INDEX_FIELDS}
+    entry["blob"] = _journal_blob_name(journal["name"])
+    return entry
+
+
+def _journal_index_written():
+    # 쓰기 스레드에서 파일 잠금을 잡은 채 호출되므로 다른 잠금은 잡지 않음 (대입만)
+    global _journal_index_signature
+    _journal_index_signature = _file_signature(JOURNAL_INDEX_FILE)
+
+
+def _journal_index_data(index: dict) -> dict:
+    return {"journals": list(index.values())}
+
+
+def _write_journal_index(index: dict) -> Future:
+    """메모리 색인은 바로 교체하고 파일 쓰기는 백그라운드로 (레코드 파일 쓰기보다 나중에 실행됨)"""
+    global _journal_index
+    _journal_index = index
+    return _write_json_later(JOURNAL_INDEX_FILE, _journal_index_data(index), on_done=_journal_index_written)
+
+
+def _read_journal_index() -> dict:
+    try:
+        data = _read_json_file(JOURNAL_INDEX_FILE)
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"저널 색인 로드 오류 (다시 생성): {e}")
+        return {}
+    return {entry["name"]: entry for entry in data.get("journals", [])}
+
+
+def _load_journal_index() -> dict:
+    """색인 로드 (파일이 바뀌었을 때만 다시 읽음, 예전 journals.json이 있으면 먼저 옮겨 옴)"""
+    global _journal_index, _journal_index_signature
+    with _journal_lock:
+        if os.path.exists(JOURNALS_FILE):
+            # 이미 대기 중인 색인 쓰기가 먼저 반영되도록 쓰기 스레드에서 옮김 (파일 잠금도 거기서 잡음)
+            _writer.submit(_migrate_legacy_journals).result()
+        signature = _file_signature(JOURNAL_INDEX_FILE)
+        if _journal_index is not None and (signature == _journal_index_signature or _write_pending(JOURNAL_INDEX_FILE)):
+            return _journal_index
+        _journal_index = _read_journal_index() if signature is not None else {}
+        _journal_index_signature = signature
+        return _journal_index
+
+
+def _migrate_legacy_journals():
+    """
+    예전 journals.json을 카탈로그로 옮기고 journals.json.migrated로 이름을 바꿈 (history.json과 같은 방식)
+    색인이 이미 있으면 합침 — 같은 이름은 색인 쪽을 유지하므로 백업 복원 등으로 파일이 다시 생겨도
+    그 뒤에 등록한 저널을 잃지 않음
+    쓰기 스레드에서 파일 잠금을 잡은 채 실행 (_journal_lock을 잡은 호출자가 끝나기를 기다림)
+    """
+    global _journal_index, _journal_index_signature
+    # 다른 프로세스가 먼저 옮겼으면 파일이 없음
     if not os.path.exists(JOURNALS_FILE):
-        save_journals([])
-        return []
+        return
     try:
         with open(JOURNALS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
+            journals = list(_iter_json_array(f))
+    except (json.JSONDecodeError, IOError, ValueError) as e:
+        # 손상된 파일은 옮기지 않고 남겨 둠 (다음 실행에서 다시 시도)
         print(f"저널 파일 로드 오류: {e}")
-        # 백업 후 빈 리스트 반환
-        if os.path.exists(JOURNALS_FILE):
-            backup_path = f"{JOURNALS_FILE}.backup"
-            os.rename(JOURNALS_FILE, backup_path)
-        return []
+        return
+    index = _read_journal_index()
+    added = 0
+    for journal in journals:
+        if isinstance(journal, dict) and journal.get("name") and journal["name"] not in index:
+            index[journal["name"]] = _write_journal_blob(journal, defer=False)
+            added += 1
+    # 색인을 먼저 디스크에 쓴 뒤 이름을 바꿔서, 중간에 멈춰도 저널을 잃지 않음
+    _atomic_write_text(JOURNAL_INDEX_FILE, json.dumps(_journal_index_data(index), ensure_ascii=False))
+    os.replace(JOURNALS_FILE, f"{JOURNALS_FILE}.migrated")
+    _journal_index = index
+    _journal_index_signature = _file_signature(JOURNAL_INDEX_FILE)
+    print(f"저널 카탈로그 이전: {added}개 추가 ({JOURNALS_FILE} → {JOURNALS_DIR})")
 
 
-def save_journals(journals: list):
-    """저널 목록을 JSON 파일에 저장 (스왑 가능한 형식)"""
+def _write_journal_blob(journal: dict, defer: bool = True) -> dict:
+    """
+    저널 레코드 파일 쓰기 → 색인 항목
+    대량 가져오기(defer=False)는 대기열에 내용을 쌓지 않도록 호출한 스레드에서 바로 씀
+    """
+    entry = _index_entry(journal)
+    path = _journal_blob_path(entry["blob"])
+    if defer:
+        _write_json_later(path, journal, indent=2)
+    else:
+        _atomic_write_text(path, json.dumps(journal, ensure_ascii=False, indent=2))
+    return entry
+
+
+def _iter_json_array(f, chunk_size: int = 1 << 16):
+    """JSON 배열 파일을 전체를 메모리에 올리지 않고 항목 단위로 읽음"""
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    started = False
+    eof = False
+    while True:
+        # 공백/쉼표/여는 괄호 건너뛰기
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or (started and buf[pos] == ",")):
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+        if pos >= len(buf):
+            if started:
+                raise ValueError("JSON 배열이 닫히지 않았습니다.")
+            raise ValueError("JSON 파일은 저널 배열이어야 합니다.")
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("JSON 파일은 저널 배열이어야 합니다.")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                break
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buf, pos = buf[pos:] + chunk, 0
+        yield item
+        buf, pos = buf[end:], 0
+
+
+def list_journals() -> list:
+    """저널 목록 (색인 항목: name, full_name, keywords만, 프롬프트는 로드하지 않음)"""
     _ensure_dir()
-    try:
-        with open(JOURNALS_FILE, "w", encoding="utf-8") as f:
-            json.dump(journals, f, ensure_ascii=False, indent=2)
-    except IOError as e:
-        raise Exception(f"저널 파일 저장 오류: {e}")
+    return [{key: entry[key] for key in _JOURNAL_INDEX_FIELDS} for entry in _load_journal_index().values()]
+
+
+def get_journals() -> list:
+    """전체 저널 레코드 목록 (모든 프롬프트를 읽으므로 내보내기 등에만 사용)"""
+    return [journal for journal in (get_journal(name) for name in list(_load_journal_index())) if journal]
+
 
+def save_journals(journals: list) -> Future:
+    """저널 목록 전체를 교체 → 쓰기 완료 Future"""
+    _ensure_dir()
+    with _journal_lock:
+        old_blobs = {entry["blob"] for entry in _load_journal_index().values()}
+        index = {}
+        for journal in journals:
+            index[journal["name"]] = _write_journal_blob(journal)
+        for blob in old_blobs - {entry["blob"] for entry in index.values()}:
+            _remove_later(_journal_blob_path(blob))
+        return _write_journal_index(index)
 
-def save_journal(journal_data: dict):
-    """단일 저널 추가/업데이트 (JSON 스왑 가능)"""
+
+def save_journal(journal_data: dict) -> Future:
+    """단일 저널 추가/업데이트 (해당 레코드 파일과 색인만 다시 씀) → 쓰기 완료 Future"""
     try:
-        journals = get_journals()
-        if not isinstance(journals, list):
-            journals = []
-        
         # 필수 필드 확인
         if "name" not in journal_data:
             raise ValueError("저널 데이터에 'name' 필드가 없습니다.")
-        
-        idx = next((i for i, j in enumerate(journals) if j.get("name") == journal_data["name"]), None)
-        if idx is not None:
-            journals[idx] = journal_data
-            print(f"저널 업데이트: {journal_data['name']}")
-        else:
-            journals.append(journal_data)
-            print(f"저널 추가: {journal_data['name']}")
-        
-        save_journals(journals)
-        print(f"저널 저장 완료: 총 {len(journals)}개")
+
+        _ensure_dir()
+        with _journal_lock:
+            index = dict(_load_journal_index())
+            updated = journal_data["name"] in index
+            index[journal_data["name"]] = _write_journal_blob(journal_data)
+            future = _write_journal_index(index)
+        print(f"저널 {'업데이트' if updated else '추가'}: {journal_data['name']}")
+        print(f"저널 저장 완료: 총 {len(index)}개")
+        return future
     except Exception as e:
         print(f"저널 저장 오류: {e}")
         raise
 
 
 def get_journal(name: str) -> dict | None:
-    """이름으로 저널 조회"""
-    journals = get_journals()
-    return next((j for j in journals if j["name"] == name), None)
+    """이름으로 저널 조회 (색인에서 O(1)로 찾고 해당 레코드 파일만 로드)"""
+    if not name:
+        return None
+    entry = _load_journal_index().get(name)
+    if entry is None:
+        return None
+    try:
+        return _read_json_file(_journal_blob_path(entry["blob"]))
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"저널 레코드 로드 오류 ({name}): {e}")
+        return None
 
 
-def delete_journal(name: str):
-    """저널 삭제"""
-    journals = [j for j in get_journals() if j["name"] != name]
-    save_journals(journals)
+def delete_journal(name: str) -> Future | None:
+    """저널 삭제 → 쓰기 완료 Future (없는 저널이면 None)"""
+    with _journal_lock:
+        index = dict(_load_journal_index())
+        entry = index.pop(name, None)
+        if entry is None:
+            return None
+        future = _write_journal_index(index)
+        _remove_later(_journal_blob_path(entry["blob"]))
+        return future
 
 
 def export_journals_to_json(file_path: str = None) -> str:
-    """저널 데이터를 JSON 파일로 내보내기 (스왑 가능)"""
-    journals = get_journals()
+    """저널 데이터를 JSON 파일로 내보내기 (스왑 가능, 한 저널씩 기록)"""
     if file_path is None:
         file_path = f"{DATA_DIR}/journals_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
     with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(journals, f, ensure_ascii=False, indent=2)
+        f.write("[")
+        first = True
+        for name in list(_load_journal_index()):
+            journal = get_journal(name)
+            if journal is None:
+                continue
+            f.write("\n" if first else ",\n")
+            json.dump(journal, f, ensure_ascii=False)
+            first = False
+        f.write("\n]\n")
     return file_path
 
 
 def import_journals_from_json(file_path: str, merge: bool = False):
-    """JSON 파일에서 저널 데이터 가져오기 (스왑 가능)
+    """JSON 파일에서 저널 데이터 가져오기 (스왑 가능, 큰 파일도 한 저널씩 스트리밍)
     
     Args:
         file_path: 가져올 JSON 파일 경로
         merge: True면 기존 데이터와 병합, False면 교체
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            imported = json.load(f)
-        
-        if not isinstance(imported, list):
-            raise ValueError("JSON 파일은 저널 배열이어야 합니다.")
-        
-        if merge:
-            existing = get_journals()
-            existing_names = {j["name"] for j in existing}
-            for journal in imported:
-                if journal.get("name") not in existing_names:
-                    existing.append(journal)
-            save_journals(existing)
-        else:
-            save_journals(imported)
+        _ensure_dir()
+        # 앞서 예약된 레코드 쓰기가 가져온 파일을 덮어쓰지 않도록 먼저 비움
+        flush_writes()
+        with _journal_lock, open(file_path, "r", encoding="utf-8") as f:
+            existing = _load_journal_index()
+            index = dict(existing) if merge else {}
+            with _interprocess_lock():
+                for journal in _iter_json_array(f):
+                    if not isinstance(journal, dict) or not journal.get("name"):
+                        continue
+                    if merge and journal["name"] in existing:
+                        continue
+                    index[journal["name"]] = _write_journal_blob(journal, defer=False)
+            if not merge:
+                for blob in {e["blob"] for e in existing.values()} - {e["blob"] for e in index.values()}:
+                    _remove_later(_journal_blob_path(blob))
+            _write_journal_index(index)
     except (json.JSONDecodeError, IOError, ValueError) as e:
         raise Exception(f"저널 파일 가져오기 오류: {e}")
 
 
 # ========== 히스토리 ==========
-def save_history(text: str, result: dict):
-    _ensure_dir()
-    history = get_history()
-    history.insert(
-        0,
-        {
-            "time": datetime.now().isoformat(),
-            "text": text[:100],
-            "result": result,
-        },
-    )
-    history = history[:30]
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False)
-
-
-def get_history() -> list:
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+# SQLite 저장소: analyses(메타데이터 + 입력 전문) / payloads(zlib 압축 결과) / history_fts(입력+출력 전문 검색)
+# 저장은 행 추가(O(1)) + 보존 개수(history_max_items) 초과분 삭제, 목록은 페이지 단위로 조회
+# 예전 history.json은 처음 사용할 때 옮기고 history.json.migrated로 이름을 바꿈
+_HISTORY_PREVIEW_CHARS = 100
+_HISTORY_SKIP_KEYS = ("text",)  # 출력 검색 색인에서 제외할 최상위 키 (입력 원문)
 
 
-def save_history_list(history: list):
-    """히스토리 리스트 전체 저장"""
-    _ensure_dir()
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+def _history_output_text(value) -> str:
+    """결과 dict의 문자열 값을 모아 전문 검색용 텍스트로 만듦"""
+    parts = []
+
+    def _walk(v):
+        if isinstance(v, str):
+            parts.append(v)
+        elif isinstance(v, dict):
+            for item in v.values():
+                _walk(item)
+        elif isinstance(v, list):
+            for item in v:
+                _walk(item)
+
+    _walk({k: v for k, v in value.items() if k not in _HISTORY_SKIP_KEYS})
+    return "\n".join(parts)
+
+
+class _HistoryStore:
+    def __init__(self, path: str, legacy_path: str):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._conn = None
+        self._lock = threading.RLock()
+        self._legacy_checked = False
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(
+                """PRAGMA journal_mode = WAL;
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    time TEXT NOT NULL,
+                    journal_name TEXT,
+                    preview TEXT NOT NULL,
+                    text TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS payloads (
+                    id INTEGER PRIMARY KEY,
+                    result BLOB NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(input, output);"""
+            )
+            self._conn.commit()
+        return self._conn
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """self._lock을 잡고 DB 연결 사용 (처음 한 번은 잠금 전에 예전 history.json부터 옮김)"""
+        self._migrate_legacy()
+        with self._lock:
+            yield self._db()
+
+    def _migrate_legacy(self):
+        if self._legacy_checked:
+            return
+        if os.path.exists(self.legacy_path):
+            # 잠금 순서는 쓰기 스레드와 같게 (파일 잠금 → self._lock)
+            # 다른 프로세스가 동시에 옮기지 않도록 잠금 안에서 다시 확인 (먼저 옮긴 쪽이 파일 이름을 바꿈)
+            with _interprocess_lock(), self._lock:
+                if os.path.exists(self.legacy_path):
+                    self._db()
+                    self._import_legacy()
+        self._legacy_checked = True
+
+    def _import_legacy(self):
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"히스토리 파일 로드 오류: {e}")
+            return
+        # 파일은 최신순이므로 오래된 것부터 추가
+        for item in reversed(legacy if isinstance(legacy, list) else []):
+            result = item.get("result") if isinstance(item, dict) else None
+            if isinstance(result, dict):
+                text = result.get("text") or item.get("text", "")
+                self._insert(text, result, item.get("time") or datetime.now().isoformat())
+        self._conn.commit()
+        os.replace(self.legacy_path, f"{self.legacy_path}.migrated")
+        print(f"히스토리 이전: {len(legacy)}개 ({self.legacy_path} → {self.path})")
+
+    @staticmethod
+    def _payload(result: dict) -> dict:
+        """저장할 결과: 저널 데이터(Aims & Scope, 맞춤 프롬프트)는 빼고 이름만 남김 — 필요하면 카탈로그에서 다시 읽음"""
+        stored = {k: v for k, v in result.items() if k != "journal_data"}
+        if not stored.get("journal_name") and isinstance(result.get("journal_data"), dict):
+            stored["journal_name"] = result["journal_data"].get("name")
+        return stored
+
+    def _insert(self, text: str, result: dict, time_str: str) -> int:
+        db = self._conn
+        result = self._payload(result)
+        cur = db.execute(
+            "INSERT INTO analyses (time, journal_name, preview, text) VALUES (?, ?, ?, ?)",
+            (time_str, result.get("journal_name"), text[:_HISTORY_PREVIEW_CHARS], text),
+        )
+        row_id = cur.lastrowid
+        payload = zlib.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+        db.execute("INSERT INTO payloads (id, result) VALUES (?, ?)", (row_id, payload))
+        db.execute(
+            "INSERT INTO history_fts (rowid, input, output) VALUES (?, ?, ?)",
+            (row_id, text, _history_output_text(result)),
+        )
+        return row_id
+
+    def add(self, text: str, result: dict, max_items: int = 0) -> int:
+        with self._locked() as db:
+            row_id = self._insert(text, result, datetime.now().isoformat())
+            if max_items:
+                cutoff = db.execute(
+                    "SELECT id FROM analyses ORDER BY id DESC LIMIT 1 OFFSET ?", (max_items,)
+                ).fetchone()
+                if cutoff:
+                    self._delete_where("id <= ?", (cutoff[0],))
+            db.commit()
+        return row_id
+
+    def _delete_where(self, condition: str, params: tuple):
+        db = self._conn
+        ids = [row[0] for row in db.execute(f"SELECT id FROM analyses WHERE {condition}", params)]
+        for table, column in (("analyses", "id"), ("payloads", "id"), ("history_fts", "rowid")):
+            db.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(i,) for i in ids])
+
+    @staticmethod
+    def _match(query: str) -> str:
+        # 사용자가 입력한 단어를 모두 포함 (FTS 문법 문자는 따옴표로 무력화)
+        return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+    def list(self, limit: int = 50, offset: int = 0, query: str = "") -> list:
+        """최신순 메타데이터 목록 (결과 payload는 읽지 않음)"""
+        with self._locked() as db:
+            if query.strip():
+                rows = db.execute(
+                    "SELECT a.id, a.time, a.journal_name, a.preview FROM history_fts f "
+                    "JOIN analyses a ON a.id = f.rowid WHERE history_fts MATCH ? "
+                    "ORDER BY a.id DESC LIMIT ? OFFSET ?",
+                    (self._match(query), limit, offset),
+                ).fetchall()
+            else:
+                rows = db.execute(
+                    "SELECT id, time, journal_name, preview FROM analyses ORDER BY id DESC LIMIT ? OFFSET ?",
+                    (limit, offset),
+                ).fetchall()
+        return [{"id": r[0], "time": r[1], "journal_name": r[2], "text": r[3]} for r in rows]
+
+    def count(self, query: str = "") -> int:
+        with self._locked() as db:
+            if query.strip():
+                return db.execute(
+                    "SELECT COUNT(*) FROM history_fts WHERE history_fts MATCH ?", (self._match(query),)
+                ).fetchone()[0]
+            return db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def get(self, history_id: int) -> dict | None:
+        with self._locked() as db:
+            row = db.execute(
+                "SELECT a.time, a.text, p.result FROM analyses a JOIN payloads p ON p.id = a.id WHERE a.id = ?",
+                (history_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": history_id,
+            "time": row[0],
+            "text": row[1],
+            "result": json.loads(zlib.decompress(row[2]).decode("utf-8")),
+        }
+
+    def delete(self, history_id: int):
+        with self._locked():
+            self._delete_where("id = ?", (history_id,))
+            self._conn.commit()
+
+    def replace_all(self, history: list):
+        with self._locked() as db:
+            db.executescript("DELETE FROM analyses; DELETE FROM payloads; DELETE FROM history_fts;")
+            for item in reversed(history):
+                result = item.get("result") or {}
+                text = result.get("text") or item.get("text", "")
+                self._insert(text, result, item.get("time") or datetime.now().isoformat())
+            db.commit()
+
+
+_history_store = _HistoryStore(HISTORY_DB_FILE, HISTORY_FILE)
+
+
+def save_history(text: str, result: dict) -> Future:
+    """
+    분석 결과 추가 (입력 전문 보존, history_max_items 초과분은 오래된 것부터 삭제)
+    백그라운드에서 저장 → 히스토리 id Future
+    """
+    result = copy.deepcopy(result)
+    max_items = get_settings().get("history_max_items", 1000) or 0
+    return _writer.submit(lambda: _history_store.add(text, result, max_items))
+
+
+def list_history(limit: int = 50, offset: int = 0, query: str = "") -> list:
+    """히스토리 목록 한 페이지 (id, time, journal_name, text 앞부분), query가 있으면 입력/출력 전문 검색"""
+    return _history_store.list(limit, offset, query)
+
+
+def count_history(query: str = "") -> int:
+    return _history_store.count(query)
+
+
+def get_history_item(history_id: int) -> dict | None:
+    """히스토리 항목 하나 (결과 포함)"""
+    return _history_store.get(history_id)
+
+
+def delete_history(history_id: int) -> Future:
+    """히스토리 항목 삭제 (다른 히스토리 쓰기와 같은 쓰기 스레드에서) → 삭제 완료 Future"""
+    return _writer.submit(lambda: _history_store.delete(history_id))
+
+
+def get_history(limit: int = None) -> list:
+    """최신순 히스토리 (결과 포함) - 모든 결과를 풀어야 하므로 limit으로 개수를 제한해서 사용"""
+    items = list_history(limit if limit is not None else -1)
+    return [item for item in (get_history_item(i["id"]) for i in items) if item]
+
+
+def save_history_list(history: list) -> Future:
+    """히스토리 리스트 전체 저장 (최신순 목록으로 교체) → 쓰기 완료 Future"""
+    history = copy.deepcopy(history)
+    return _writer.submit(lambda: _history_store.replace_all(history), key="history_list")
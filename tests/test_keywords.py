@@ -0,0 +1,18 @@
+"""keywords 회귀 테스트"""
+import pytest
+
+from keywords import keyword_query, keyword_variants
+
+
+@pytest.mark.parametrize("text", [
+    "We propose a lightweight convolutional neural network for surface defect detection on edge devices.",
+    "Deep learning improves protein structure prediction accuracy substantially.",
+    "Transformer-based models outperform recurrent baselines in low-resource machine translation tasks.",
+    # 세 번째 구가 단어 예산을 넘어도 뒤의 짧은 구로 채우는 경우 (keyword_query와 달라지던 입력)
+    "Lidar point cloud segmentation. Thermal imaging. Sensor fusion. Robustness.",
+    "본 연구는 엣지 디바이스에서의 표면 결함 검출을 위한 경량 신경망을 제안한다.",
+])
+def test_first_variant_is_keyword_query(text):
+    variants = keyword_variants(text)
+    assert variants[0] == keyword_query(text)
+    assert len(variants) == len(set(variants))
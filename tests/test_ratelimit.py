@@ -0,0 +1,30 @@
+"""ratelimit 회귀 테스트"""
+import asyncio
+
+from ratelimit import AdaptiveConcurrency, ProviderLimiter
+
+
+def test_limiter_works_across_event_loops():
+    limiter = ProviderLimiter("test", rpm=600, tpm=0, max_concurrency=1)
+
+    async def burst():
+        async def one():
+            async with limiter.slot():
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(one() for _ in range(3)))
+
+    # 첫 루프에서 경합한 잠금/조건 변수가 다음 asyncio.run에 묶여 있으면 RuntimeError
+    asyncio.run(burst())
+    asyncio.run(burst())
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_long_node_latency_does_not_shrink_limit():
+    concurrency = AdaptiveConcurrency(max_limit=8)
+    for _ in range(10):
+        concurrency.on_success(0.2, "search_query")
+        concurrency.on_success(6.0, "paraphrase")
+    assert concurrency.limit == 8.0
+    concurrency.on_success(20.0, "paraphrase")
+    assert concurrency.limit < 8.0
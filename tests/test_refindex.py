@@ -0,0 +1,73 @@
+"""refindex 회귀 테스트"""
+import json
+import sqlite3
+
+import pytest
+
+from refindex import ReferenceIndex
+
+
+def _integrity_check(index: ReferenceIndex):
+    with index._lock:
+        index._db().execute("INSERT INTO records_fts(records_fts, rank) VALUES ('integrity-check', 1)")
+
+
+@pytest.fixture
+def library(tmp_path):
+    bib = tmp_path / "a.bib"
+    bib.write_text(
+        "@article{smith2020,\n"
+        "  title = {Deep Learning for Surface Defect Detection on Edge Devices},\n"
+        "  author = {Smith, John},\n"
+        "  year = {2020},\n"
+        "  doi = {10.1109/TII.2020.1}\n"
+        "}\n",
+        encoding="utf-8",
+    )
+    jsonl = tmp_path / "b.jsonl"
+    jsonl.write_text(
+        json.dumps({
+            "title": "Deep learning for surface defect detection on edge devices",
+            "authors": [{"name": "John Smith"}],
+            "year": 2020,
+            "externalIds": {"DOI": "10.1109/TII.2020.1"},
+        }) + "\n"
+        + json.dumps({"title": "Protein folding with transformers", "year": 2021, "doi": "10.1/protein"}) + "\n",
+        encoding="utf-8",
+    )
+    return tmp_path, bib, jsonl
+
+
+def test_duplicate_doi_across_files_keeps_fts_consistent(library):
+    tmp_path, bib, jsonl = library
+    index = ReferenceIndex(str(tmp_path / "index.sqlite3"))
+    index.update([str(bib), str(jsonl)])
+    _integrity_check(index)
+
+    assert index.stats() == {"records": 2, "sources": 2}
+    with index._lock:
+        counts = dict(index._db().execute("SELECT path, records FROM sources"))
+    assert counts == {str(bib): 0, str(jsonl): 2}
+
+    # 중복 논문을 가진 파일을 빼고 다시 색인해도 검색 결과가 다른 논문을 가리키지 않아야 함
+    index.update([str(jsonl)], prune=True)
+    bib.write_text("@article{lee2021, title={Crack segmentation on bridges}, year={2021}}\n", encoding="utf-8")
+    index.update([str(bib), str(jsonl)])
+    _integrity_check(index)
+    titles = [p["title"] for p in index.search("defect detection edge")]
+    assert titles and all("defect" in t.lower() for t in titles)
+    index.close()
+
+
+def test_integrity_check_detects_corruption(library):
+    tmp_path, bib, _ = library
+    index = ReferenceIndex(str(tmp_path / "index.sqlite3"))
+    index.update([str(bib)])
+    with index._lock:
+        # 트리거를 거치지 않은 삭제는 고아 FTS 항목을 남김
+        index._db().execute("PRAGMA recursive_triggers = OFF")
+        index._db().execute("DROP TRIGGER records_ad")
+        index._db().execute("DELETE FROM records")
+    with pytest.raises(sqlite3.DatabaseError):
+        _integrity_check(index)
+    index.close()
@@ -0,0 +1,20 @@
+"""Semantic Scholar 검색 회귀 테스트"""
+import asyncio
+
+import services
+
+
+def test_background_refresh_failure_is_logged(monkeypatch, caplog):
+    async def _boom(*args):
+        raise RuntimeError("network down")
+
+    monkeypatch.setattr(services, "_fetch_search", _boom)
+
+    async def main():
+        services._refresh_in_background("k", "query", "")
+        await asyncio.gather(*services._ss_background, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert "network down" in caplog.text
+    assert not services._ss_background and "k" not in services._ss_refreshing
@@ -0,0 +1,53 @@
+"""single-flight 회귀 테스트"""
+import asyncio
+
+from services import _SingleFlight
+
+
+def test_follower_survives_cancelled_leader():
+    async def main():
+        flight = _SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def factory():
+            calls.append(1)
+            await release.wait()
+            return {"n": len(calls)}
+
+        leader = asyncio.create_task(flight.do("k", factory))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", factory))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        # 대기자는 취소를 물려받지 않고 factory를 다시 실행한 결과를 받음
+        assert await follower == {"n": 2}
+        assert leader.cancelled()
+        assert len(calls) == 2
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    async def main():
+        flight = _SingleFlight()
+        release = asyncio.Event()
+
+        async def factory():
+            await release.wait()
+            return "ok"
+
+        leader = asyncio.create_task(flight.do("k", factory))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", factory))
+        await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await leader == "ok"
+        assert follower.cancelled()
+
+    asyncio.run(main())
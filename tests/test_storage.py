@@ -0,0 +1,91 @@
+"""storage 쓰기 스레드 회귀 테스트"""
+import contextlib
+
+import pytest
+
+import storage
+
+
+def test_writer_survives_lock_failure(monkeypatch):
+    writer = storage._WriteBehind(delay=0)
+
+    @contextlib.contextmanager
+    def _broken_lock():
+        raise OSError("lock unavailable")
+        yield
+
+    monkeypatch.setattr(storage, "_interprocess_lock", _broken_lock)
+    failed = writer.submit(lambda: "first")
+    with pytest.raises(OSError):
+        failed.result(timeout=5)
+    assert writer.flush(timeout=5)
+
+    monkeypatch.setattr(storage, "_interprocess_lock", contextlib.nullcontext)
+    assert writer.submit(lambda: "second").result(timeout=5) == "second"
+
+
+def test_get_settings_is_read_only_view():
+    settings = storage.get_settings()
+    assert storage.get_settings() is settings
+    with pytest.raises(TypeError):
+        settings["model_routes"]["paraphrase"] = "pro"
+    with pytest.raises(TypeError):
+        settings["fast_mode"] = True
+
+    thawed = storage._thaw(settings)
+    thawed["model_routes"]["paraphrase"] = "pro"
+    assert storage.get_settings()["model_routes"].get("paraphrase") != "pro"
+    assert storage._freeze(thawed) != settings
+
+
+def test_history_stores_journal_name_not_journal_data(tmp_path):
+    store = storage._HistoryStore(str(tmp_path / "history.db"), str(tmp_path / "history.json"))
+    journal = {"name": "IEEE TII", "aims_scope": "industrial informatics " * 200, "prompts": {"paraphrase": "..."}}
+    row_id = store.add("some text", {"text": "some text", "journal_name": "IEEE TII", "journal_data": journal})
+    result = store.get(row_id)["result"]
+    assert "journal_data" not in result
+    assert result["journal_name"] == "IEEE TII"
+    assert store.count("industrial") == 0
+
+
+def test_legacy_history_migrates_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "LOCK_FILE", str(tmp_path / ".lock"))
+    legacy = tmp_path / "history.json"
+    legacy.write_text(
+        '[{"time": "2025-01-01T00:00:00", "result": {"text": "legacy text", "journal_name": null}}]',
+        encoding="utf-8",
+    )
+    db = str(tmp_path / "history.db")
+    first = storage._HistoryStore(db, str(legacy))
+    second = storage._HistoryStore(db, str(legacy))
+    with storage._interprocess_lock():  # 쓰기 스레드처럼 잠금을 잡은 채 열어도 멈추지 않아야 함
+        assert first.count() == 1
+    assert second.count() == 1
+    assert not legacy.exists()
+
+
+@pytest.fixture
+def journal_dir(tmp_path, monkeypatch):
+    journals_dir = tmp_path / "journals"
+    journals_dir.mkdir()
+    monkeypatch.setattr(storage, "LOCK_FILE", str(tmp_path / ".lock"))
+    monkeypatch.setattr(storage, "JOURNALS_FILE", str(tmp_path / "journals.json"))
+    monkeypatch.setattr(storage, "JOURNALS_DIR", str(journals_dir))
+    monkeypatch.setattr(storage, "JOURNAL_INDEX_FILE", str(journals_dir / "index.json"))
+    monkeypatch.setattr(storage, "_journal_index", None)
+    monkeypatch.setattr(storage, "_journal_index_signature", None)
+    return tmp_path
+
+
+def test_restored_legacy_journals_merge_into_catalog(journal_dir):
+    legacy = journal_dir / "journals.json"
+    legacy.write_text('[{"name": "A", "full_name": "Journal A"}]', encoding="utf-8")
+    assert [j["name"] for j in storage.list_journals()] == ["A"]
+    assert not legacy.exists()
+
+    storage.save_journal({"name": "B", "full_name": "Journal B"}).result(timeout=5)
+    # 백업 복원 등으로 예전 파일이 다시 생겨도 그 뒤에 등록한 저널은 남아야 함
+    legacy.write_text('[{"name": "A", "full_name": "Old A"}, {"name": "C"}]', encoding="utf-8")
+    assert sorted(j["name"] for j in storage.list_journals()) == ["A", "B", "C"]
+    assert storage.get_journal("A")["full_name"] == "Journal A"
+    assert not legacy.exists()
@@ -0,0 +1,60 @@
+"""스트리밍 JSON 경로 회귀 테스트"""
+import asyncio
+
+import pytest
+
+import services
+from backends import FakeBackend
+
+COMPACT = {"sec": "Results", "s": [{"n": "Assertive", "t": "We show X.", "tr": "X를 보인다."}]}
+
+
+@pytest.fixture
+def fake(monkeypatch, tmp_path):
+    monkeypatch.setattr(services, "_response_cache", services._ResponseCache(str(tmp_path / "llm_cache.db")))
+    services.set_llm_backend(FakeBackend(latency_ms=0, responder=lambda prompt: COMPACT))
+    yield
+    services.set_llm_backend(None)
+
+
+async def _collect(**kwargs):
+    return [e async for e in services.ask_gemini_stream_json("paraphrase this", node="paraphrase", **kwargs)]
+
+
+def test_stream_events_use_full_keys(fake):
+    for events in (asyncio.run(_collect()), asyncio.run(_collect())):  # 두 번째는 캐시 재생
+        paths = [path for path, _ in events]
+        assert ("styles", 0) in paths
+        assert ("section",) in paths
+        assert all(p not in ("s", "sec", "n", "t") for path in paths for p in path)
+        item = dict(events)[("styles", 0)]
+        assert item == {"name": "Assertive", "text": "We show X.", "translation": "X를 보인다."}
+        assert events[-1] == ((), {"section": "Results", "styles": [item]})
+
+
+def test_rejected_stream_escalates_without_regenerating(fake):
+    calls = []
+    backend = FakeBackend(latency_ms=0, responder=lambda prompt: COMPACT)
+    generate_stream = backend.generate_stream
+
+    def _counting(model, prompt, config):
+        calls.append(model)
+        return generate_stream(model, prompt, config)
+
+    backend.generate_stream = _counting
+    services.set_llm_backend(backend)
+    events = asyncio.run(_collect(accept=lambda result: False))
+    # 낮은 신뢰도 → 같은 모델로 다시 생성하지 않고 한 단계 강한 모델로 한 번만 승격
+    assert len(calls) == 2
+    assert calls[1] == services._neighbor_model(calls[0], 1)
+    assert events[-1][0] == ()
+
+
+def test_prompt_builder_schema_matches_prompt_keys(monkeypatch):
+    import nodes
+
+    for compact in (True, False):
+        monkeypatch.setattr(nodes, "get_settings", lambda: {"compact_schemas": compact})
+        prompt, schema = nodes._paraphrase_prompt("We propose X.")
+        assert ("sec=section" in prompt) is compact
+        assert set(schema["properties"]) == ({"sec", "s"} if compact else {"section", "styles"})